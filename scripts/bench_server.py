@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+服务器压测脚本 - 模拟多个并发客户端，统计接口延迟分位数
+
+用法:
+    python3 scripts/bench_server.py --clients 20 --requests 200
+    python3 scripts/bench_server.py --path /api/data/month --path /api/system
+    python3 scripts/bench_server.py --etag          # 客户端带 If-None-Match，对比流量和解析开销
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = ['/api/data/today', '/api/data/month', '/api/system']
+
+
+def percentile(values, pct):
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# 每个客户端线程记住各URL上次的 ETag（模拟浏览器的条件请求）
+_client = threading.local()
+
+
+def fetch(url, use_etag=False):
+    """请求一次，返回 (耗时秒, 状态码, 响应体字节数, 客户端解析JSON耗时秒)"""
+    etags = getattr(_client, 'etags', None)
+    if etags is None:
+        etags = _client.etags = {}
+
+    request = urllib.request.Request(url)
+    if use_etag and url in etags:
+        request.add_header('If-None-Match', etags[url])
+
+    start = time.perf_counter()
+    body = b''
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            body = response.read()
+            status = response.status
+            if response.headers.get('ETag'):
+                etags[url] = response.headers['ETag']
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    latency = time.perf_counter() - start
+
+    # 客户端收到完整数据时需要解析JSON，304 则直接复用已有数据
+    parse_start = time.perf_counter()
+    if status == 200:
+        try:
+            json.loads(body)
+        except ValueError:
+            pass
+    return latency, status, len(body), time.perf_counter() - parse_start
+
+
+def run(base_url, paths, clients, total_requests, use_etag=False):
+    """以固定并发数轮流请求各个路径"""
+    urls = [base_url.rstrip('/') + paths[i % len(paths)] for i in range(total_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda url: fetch(url, use_etag), urls))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r[1] in (200, 304)]
+    latencies = [r[0] * 1000 for r in ok]
+    errors = len(results) - len(ok)
+
+    return {
+        "clients": clients,
+        "requests": total_requests,
+        "etag": use_etag,
+        "errors": errors,
+        "not_modified": sum(1 for r in results if r[1] == 304),
+        "body_bytes": sum(r[2] for r in results),
+        "client_parse_ms": round(sum(r[3] for r in results) * 1000, 1),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total_requests / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daily Report 服务器压测')
+    parser.add_argument('--url', default='http://localhost:8080', help='服务器地址')
+    parser.add_argument('--clients', type=int, default=20, help='并发客户端数')
+    parser.add_argument('--requests', type=int, default=200, help='总请求数')
+    parser.add_argument('--path', action='append', dest='paths', help='请求路径（可重复）')
+    parser.add_argument('--etag', action='store_true',
+                        help='先不带、再带 If-None-Match 各跑一轮，对比流量和客户端解析开销')
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"🚀 压测 {args.url}  并发={args.clients}  请求数={args.requests}")
+    print(f"   路径: {', '.join(paths)}")
+
+    if not args.etag:
+        result = run(args.url, paths, args.clients, args.requests)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    plain = run(args.url, paths, args.clients, args.requests)
+    conditional = run(args.url, paths, args.clients, args.requests, use_etag=True)
+    print(json.dumps({"plain": plain, "etag": conditional}, indent=2, ensure_ascii=False))
+    if plain['body_bytes']:
+        saved = 1 - conditional['body_bytes'] / plain['body_bytes']
+        print(f"📉 响应体流量减少 {saved:.0%}，304 占比 "
+              f"{conditional['not_modified'] / conditional['requests']:.0%}")
+
+
+if __name__ == '__main__':
+    main()
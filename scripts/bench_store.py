@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+存储压测脚本 - 历史任务逐步增长时，测量按ID更新、按状态筛选的延迟
+
+用法:
+    python3 scripts/bench_store.py
+    python3 scripts/bench_store.py --backend sqlite --sizes 1000,10000,100000 --updates 500
+
+在临时目录中创建存储，不影响 data/ 下的数据。延迟应基本不随任务总数增长。
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加src目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from store import EventLogStore, JsonStore, SQLiteStore
+
+
+def percentile(values, pct):
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_task(n, base):
+    created = (base + timedelta(seconds=n)).isoformat()
+    return {
+        "id": f"task_{n}",
+        "description": f"压测任务 {n}",
+        "status": "completed",
+        "created_at": created,
+        "start_time": created,
+        "duration": 1.0,
+        "task_type": "user_task"
+    }
+
+
+def open_backend(backend, directory):
+    if backend == 'sqlite':
+        return SQLiteStore(Path(directory) / 'bench.db')
+    if backend == 'eventlog':
+        # 压测期间不压缩，只测量增量写入
+        return EventLogStore(directory, compact_bytes=1 << 40, compact_interval=3600)
+    return JsonStore(directory)
+
+
+def bench(backend, sizes, updates, batch):
+    print(f"\n📊 {backend}")
+    print(f"  {'任务数':>8}  {'更新 p50':>10}  {'更新 p99':>10}  {'筛选running':>12}")
+    base = datetime.now() - timedelta(days=365)
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_backend(backend, directory)
+        count = 0
+        for size in sizes:
+            # 补齐到目标数量（批量写入）
+            while count < size:
+                chunk = [make_task(n, base) for n in range(count, min(size, count + batch))]
+                store.upsert('user_tasks', chunk)
+                count += len(chunk)
+            # 一部分任务处于 running，模拟僵尸任务检查
+            running = random.sample(range(count), min(20, count))
+            for n in running:
+                store.update('user_tasks', f"task_{n}", {"status": "running"})
+
+            latencies = []
+            for _ in range(updates):
+                task_id = f"task_{random.randrange(count)}"
+                started = time.perf_counter()
+                store.update('user_tasks', task_id, {"status": "completed", "result": "ok"})
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            store.list('user_tasks', status='running')
+            list_ms = (time.perf_counter() - started) * 1000
+
+            print(f"  {count:>8}  {percentile(latencies, 50):>8.3f}ms  {percentile(latencies, 99):>8.3f}ms"
+                  f"  {list_ms:>10.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储按ID更新延迟压测')
+    parser.add_argument('--backend', action='append', choices=['sqlite', 'eventlog', 'json'],
+                        help='要测试的后端（可重复），默认 sqlite 和 eventlog')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='逐步增长到的任务数，逗号分隔')
+    parser.add_argument('--updates', type=int, default=500, help='每个规模下的更新次数')
+    parser.add_argument('--batch', type=int, default=5000, help='灌入数据时每批写入的条数')
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(',') if s.strip())
+    for backend in args.backend or ['sqlite', 'eventlog']:
+        if backend == 'json':
+            print(f"\nℹ️  json 后端每个文件最多保留 {JsonStore.MAX_RECORDS} 条记录，按 {JsonStore.MAX_RECORDS} 条测试")
+            bench(backend, [JsonStore.MAX_RECORDS], args.updates, args.batch)
+            continue
+        bench(backend, sizes, args.updates, args.batch)
+
+
+if __name__ == '__main__':
+    main()
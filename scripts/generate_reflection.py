@@ -8,11 +8,17 @@
 import json
 import os
 import subprocess
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
 class ReflectionGenerator:
-    def __init__(self):
+    def __init__(self, collector=None):
+        """
+        Args:
+            collector: DataCollector 实例，用于直接创建计划任务；
+                       为 None 时按配置文件自行创建
+        """
         # 项目路径
         self.project_root = Path(__file__).parent.parent
         self.data_dir = self.project_root / 'data'
@@ -24,21 +30,24 @@ class ReflectionGenerator:
         self.heartbeat_file = self.workspace_dir / 'HEARTBEAT.md'
         self.reflection_file = self.data_dir / 'reflection.json'
 
+        if collector is None:
+            sys.path.insert(0, str(self.project_root / 'src'))
+            from data_collector import DataCollector
+            collector = DataCollector(self.project_root / 'config.json')
+        self.collector = collector
+
     def load_today_data(self):
-        """加载今天的数据"""
+        """加载今天的数据（按 data.timezone 的今天，只读取该区间内的记录）"""
+        from timeutil import filter_range
+
+        store = self.collector.store
+        start, end = filter_range('today', self.collector.tz)
+
         # 读取任务
-        tasks = []
-        tasks_file = self.data_dir / 'user_tasks.json'
-        if tasks_file.exists():
-            with open(tasks_file, 'r', encoding='utf-8') as f:
-                tasks = json.load(f)
+        tasks = store.range('user_tasks', start, end)
 
         # 读取互动
-        interactions = []
-        interactions_file = self.data_dir / 'interactions.json'
-        if interactions_file.exists():
-            with open(interactions_file, 'r', encoding='utf-8') as f:
-                interactions = json.load(f)
+        interactions = store.range('interactions', start, end)
 
         return tasks, interactions
 
@@ -281,17 +290,20 @@ class ReflectionGenerator:
             script_path = self.project_root / 'scripts' / 'generate_reflection.py'
             cron_entry = f"0 17 * * * /usr/bin/python3 {script_path}\n"
 
-            # 读取当前 crontab
-            result = subprocess.run(['crontab', '-l'], capture_output=True, text=True)
-            current_cron = result.stdout if result.returncode == 0 else ''
-
-            # 检查是否已经存在反思脚本调度
-            if 'generate_reflection.py' not in current_cron:
-                current_cron += cron_entry
-                subprocess.run(['crontab', '-'], input=current_cron, text=True)
-                print("✅ 已添加每日下午5点自动运行反思脚本到 crontab")
-            else:
-                print("✅ 反思脚本调度已存在于 crontab")
+            # 读取当前 crontab（crontab 不可用时不影响后续计划任务的创建）
+            try:
+                result = subprocess.run(['crontab', '-l'], capture_output=True, text=True, timeout=10)
+                current_cron = result.stdout if result.returncode == 0 else ''
+
+                # 检查是否已经存在反思脚本调度
+                if 'generate_reflection.py' not in current_cron:
+                    current_cron += cron_entry
+                    subprocess.run(['crontab', '-'], input=current_cron, text=True, timeout=10)
+                    print("✅ 已添加每日下午5点自动运行反思脚本到 crontab")
+                else:
+                    print("✅ 反思脚本调度已存在于 crontab")
+            except Exception as e:
+                print(f"⚠️  无法更新 crontab: {e}")
 
             # 2. 为明日计划的每个任务创建 scheduled 任务记录和定时任务
             scheduled_tasks = []
@@ -300,40 +312,27 @@ class ReflectionGenerator:
             tomorrow_midnight_iso = tomorrow_midnight.isoformat()
 
             for plan in reflection['tomorrow']:
-                # 先创建任务记录（状态为 scheduled）
+                # 直接通过数据收集器创建任务记录（状态为 scheduled）
                 try:
-                    create_result = subprocess.run([
-                        'curl', '-s', '-X', 'POST',
-                        'http://localhost:8080/api/task/create',
-                        '-H', 'Content-Type: application/json',
-                        '-d', json.dumps({
-                            "description": plan,
-                            "user_message": f"📅 明日计划: {plan}",
-                            "status": "scheduled",
-                            "scheduled_time": tomorrow_midnight_iso
-                        })
-                    ], capture_output=True, text=True, timeout=10)
-
-                    if create_result.returncode == 0:
-                        task_data = json.loads(create_result.stdout)
-                        task_id = task_data.get('task_id')
-                        print(f"  ✅ 创建计划任务: {plan[:30]}... (ID: {task_id[-8:]})")
-                        
-                        # 保存任务ID，用于后续更新
-                        scheduled_tasks.append({
-                            "plan": plan,
-                            "task_id": task_id,
-                            "scheduled_time": tomorrow_midnight_iso
-                        })
-                    else:
-                        print(f"  ⚠️  创建任务失败: {plan[:30]}...")
+                    task_id = self.collector.create_task(
+                        plan,
+                        user_message=f"📅 明日计划: {plan}",
+                        status='scheduled',
+                        scheduled_time=tomorrow_midnight_iso
+                    )
+                    print(f"  ✅ 创建计划任务: {plan[:30]}... (ID: {task_id[-8:]})")
+
+                    # 保存任务ID，用于后续更新
+                    scheduled_tasks.append({
+                        "plan": plan,
+                        "task_id": task_id,
+                        "scheduled_time": tomorrow_midnight_iso
+                    })
                 except Exception as e:
                     print(f"  ❌ 创建任务异常: {plan[:30]}... - {e}")
 
             # 保存 scheduled 任务配置记录
-            cron_file = self.data_dir / 'scheduled_tasks.json'
-            with open(cron_file, 'w', encoding='utf-8') as f:
-                json.dump(scheduled_tasks, f, indent=2, ensure_ascii=False)
+            self.collector.store.replace_all('scheduled_tasks', scheduled_tasks)
 
             print(f"✅ 已为 {len(scheduled_tasks)} 个明日计划创建定时任务")
             return scheduled_tasks
@@ -348,8 +347,25 @@ class ReflectionGenerator:
             json.dump(reflection, f, indent=2, ensure_ascii=False)
         print(f"✅ 已保存反思到 {self.reflection_file}")
 
-    def generate(self):
-        """生成完整的反思系统"""
+    def generate(self, progress=None):
+        """生成完整的反思系统
+
+        Args:
+            progress: 可选回调 progress(step, total, message)，每完成一步调用一次
+        """
+        steps = [
+            ("update_soul_md", self.update_soul_md),
+            ("update_memory_md", self.update_memory_md),
+            ("update_heartbeat_md", self.update_heartbeat_md),
+            ("apply_improvements_to_tools_md", self.apply_improvements_to_tools_md),
+            ("create_cron_jobs", self.create_cron_jobs),
+        ]
+        total = 3 + len(steps)
+
+        def report(step, message):
+            if progress:
+                progress(step, total, message)
+
         print("=" * 60)
         print("🤖 开始生成每日反思...")
         print("=" * 60)
@@ -357,21 +373,22 @@ class ReflectionGenerator:
         # 1. 加载数据
         tasks, interactions = self.load_today_data()
         print(f"\n📊 加载数据: {len(tasks)} 个任务, {len(interactions)} 条互动")
+        report(1, "load_today_data")
 
         # 2. 生成反思
         reflection = self.generate_reflection(tasks, interactions)
         print(f"\n💭 反思生成完成")
+        report(2, "generate_reflection")
 
         # 3. 保存反思
         self.save_reflection(reflection)
+        report(3, "save_reflection")
 
         # 4. 应用到各个系统
         print(f"\n🔄 应用反思到各个系统...")
-        self.update_soul_md(reflection)
-        self.update_memory_md(reflection)
-        self.update_heartbeat_md(reflection)
-        self.apply_improvements_to_tools_md(reflection)  # 新增：应用改进建议
-        cron_commands = self.create_cron_jobs(reflection)
+        for i, (name, apply) in enumerate(steps, start=4):
+            apply(reflection)
+            report(i, name)
 
         print("\n" + "=" * 60)
         print("✅ 反思系统生成完成！")
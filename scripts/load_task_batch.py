@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+批量任务接口压测 - 模拟并行子任务突发地创建和更新任务，统计吞吐量并检查ID是否重复
+
+用法:
+    python3 scripts/load_task_batch.py --url http://localhost:8080
+    python3 scripts/load_task_batch.py --clients 8 --batches 50 --batch-size 100
+    python3 scripts/load_task_batch.py --single      # 对比逐个调用 /api/task/create 和 /api/task/update
+
+每个客户端先批量创建任务，再在下一批中把它们更新为 completed/failed，创建和更新混在同一批次里。
+"""
+import argparse
+import json
+import random
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def percentile(values, pct):
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_batch_client(base_url, client, batches, batch_size):
+    """一个客户端：每批创建 batch_size/2 个任务，并更新上一批创建的任务"""
+    created_ids, latencies, failures = [], [], 0
+    previous = []
+    for n in range(batches):
+        operations = [{"op": "update", "task_id": task_id, "status": random.choice(['completed', 'failed']),
+                       "result": "load test"} for task_id in previous]
+        creates = batch_size - len(operations)
+        operations += [{"op": "create", "description": f"压测子任务 c{client}-b{n}-{i}"} for i in range(creates)]
+        random.shuffle(operations)
+
+        started = time.perf_counter()
+        response = post(base_url + '/api/task/batch', {"operations": operations})
+        latencies.append(time.perf_counter() - started)
+
+        previous = []
+        for operation, result in zip(operations, response['results']):
+            if not result['success']:
+                failures += 1
+            elif operation['op'] == 'create':
+                created_ids.append(result['task_id'])
+                previous.append(result['task_id'])
+    return created_ids, latencies, failures
+
+
+def run_single_client(base_url, client, batches, batch_size):
+    """对照组：同样的操作逐个请求"""
+    created_ids, latencies, failures = [], [], 0
+    previous = []
+    for n in range(batches):
+        started = time.perf_counter()
+        for task_id in previous:
+            result = post(base_url + '/api/task/update',
+                          {"task_id": task_id, "status": "completed", "result": "load test"})
+            failures += 0 if result.get('success') else 1
+        creates = batch_size - len(previous)
+        previous = []
+        for i in range(creates):
+            result = post(base_url + '/api/task/create', {"description": f"压测任务 c{client}-b{n}-{i}"})
+            if result.get('success'):
+                created_ids.append(result['task_id'])
+                previous.append(result['task_id'])
+            else:
+                failures += 1
+        latencies.append(time.perf_counter() - started)
+    return created_ids, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量任务接口压测')
+    parser.add_argument('--url', default='http://localhost:8080', help='服务器地址')
+    parser.add_argument('--clients', type=int, default=4, help='并发客户端数')
+    parser.add_argument('--batches', type=int, default=25, help='每个客户端发送的批次数')
+    parser.add_argument('--batch-size', type=int, default=100, help='每批的操作数（创建+更新）')
+    parser.add_argument('--single', action='store_true', help='逐个调用 create/update 接口作为对照')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    worker = run_single_client if args.single else run_batch_client
+    mode = '逐个请求' if args.single else '批量接口'
+    print(f"🚀 {mode}: {args.clients} 个客户端 × {args.batches} 批 × {args.batch_size} 个操作")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        outcomes = list(pool.map(lambda c: worker(base_url, c, args.batches, args.batch_size),
+                                 range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    created = [task_id for ids, _, _ in outcomes for task_id in ids]
+    latencies = [value for _, values, _ in outcomes for value in values]
+    failures = sum(f for _, _, f in outcomes)
+    total_ops = args.clients * args.batches * args.batch_size
+
+    print(f"✅ 完成 {total_ops} 个操作，用时 {elapsed:.2f}s → {total_ops / elapsed:.0f} 操作/秒")
+    print(f"  每批延迟 p50={percentile(latencies, 50) * 1000:.1f}ms  p99={percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"  创建任务 {len(created)} 个，ID重复 {len(created) - len(set(created))} 个，失败操作 {failures} 个")
+
+
+if __name__ == '__main__':
+    main()
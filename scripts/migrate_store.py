@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+数据迁移 - 把 data/ 下的 JSON 文件导入到配置的存储后端（默认 SQLite）
+
+用法:
+    python3 scripts/migrate_store.py
+    python3 scripts/migrate_store.py --data-dir /path/to/old/data
+
+按记录ID覆盖写入，可重复执行。
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# 添加src目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from store import load_config, migrate_json, open_store
+
+
+def main():
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='把 JSON 数据文件导入到存储后端')
+    parser.add_argument('--config', default=str(project_root / 'config.json'), help='配置文件路径')
+    parser.add_argument('--data-dir', default=str(project_root / 'data'), help='JSON 文件所在目录')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    backend = config.get('storage', {}).get('backend', 'sqlite')
+    if backend == 'json':
+        print("ℹ️  当前配置使用 JSON 存储，无需迁移")
+        return
+
+    store = open_store(config)
+    counts = migrate_json(args.data_dir, store)
+
+    print(f"✅ 迁移完成 → {backend}")
+    for kind, count in counts.items():
+        print(f"  {kind}: {count} 条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+重建每日汇总 - 从全部任务记录重新计算按 (日期, task_type) 的汇总行
+
+用法:
+    python3 scripts/rebuild_rollups.py
+
+修改 data.timezone 后 SQLite 库会在启动时自动重算；
+手动修改过数据库或怀疑汇总不一致时执行本脚本，可重复执行。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加src目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from rollups import ROLLUP_KINDS, summarize
+from store import load_config, open_store
+
+
+def main():
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='从任务记录重建每日汇总')
+    parser.add_argument('--config', default=str(project_root / 'config.json'), help='配置文件路径')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    store = open_store(config)
+
+    for kind in ROLLUP_KINDS:
+        started = time.time()
+        count = store.rebuild_rollups(kind)
+        elapsed = (time.time() - started) * 1000
+        rows = store.rollups(kind)
+        days = len({row['day'] for row in rows})
+        total = sum(row['total'] for row in rows)
+        print(f"✅ {kind}: {total} 条任务 → {count} 行汇总（{days} 天，{elapsed:.0f}ms）")
+        print(f"  全部: {summarize(rows)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+重建索引 - 多进程重新解析全部会话历史，按消息ID合并写入存储
+
+用法:
+    python3 scripts/reindex.py                       # ~/.openclaw/agents/*/sessions 下的全部会话文件
+    python3 scripts/reindex.py --sessions-dir ~/.openclaw/agents/main/sessions
+    python3 scripts/reindex.py --workers 8 --chunk-size 2000
+
+升级或修改解析规则（src/session_parser.py）后执行。会话文件分配到 ProcessPoolExecutor 的各个进程中解析，
+每个进程按块（chunk-size 条派生记录）把结果发回主进程，主进程按批写入存储：
+互动、互动任务、工具调用按ID覆盖，存储中没有的用户任务重新创建，已存在的不覆盖（保留状态和 LLM 总结），
+可以重复执行，也可以恢复到新建或更换后端的存储中。token 用量从零重新累计（用单独的已处理索引
+data/checkpoints/reindex.* 去重，完成后并入入库服务的索引）；只处理 --sessions-dir 且存储中已有用量时，
+按入库服务的索引只补计没有计入的消息。完成后更新入库服务的检查点，之后只读取新追加的内容。
+
+需要先停止服务器和任务监听器（入库服务持有 data/ingest.lock 时退出）。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# 添加src目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from processed_index import ProcessedIndex
+from session_parser import Derived, SessionParser
+
+
+def parse_file(path, results, chunk_size):
+    """子进程：从头解析一个会话文件，每累计 chunk_size 条派生记录发回一块
+
+    发回 (path, 已读取的字节数, 本块的记录数, Derived, 解析状态)；解析状态只在最后一块中不为None。
+    """
+    parser = SessionParser()
+    derived = Derived()
+    offset = 0
+    records = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            # 未写完的半行留给入库服务
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            records += 1
+            parser.feed([record], derived)
+            if len(derived) >= chunk_size:
+                results.put((path, offset, records, derived, None))
+                derived = Derived()
+                records = 0
+    results.put((path, offset, records, derived, parser.state()))
+
+
+def main():
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='多进程重新解析会话历史并写入存储')
+    parser.add_argument('--config', default=str(project_root / 'config.json'), help='配置文件路径')
+    parser.add_argument('--sessions-dir', help='只处理该目录下的 *.jsonl（默认 ~/.openclaw/agents/*/sessions）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='解析进程数（默认CPU核数）')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='每块发回的派生记录数')
+    parser.add_argument('--progress-interval', type=float, default=2.0, help='进度输出间隔（秒）')
+    args = parser.parse_args()
+
+    from data_collector import DataCollector
+    from ingestor import TOKEN_USAGE_KEY, SessionIngestor
+    from session_watcher import SessionWatcher
+
+    collector = DataCollector(args.config)
+    watcher = SessionWatcher(use_inotify=False)
+    if args.sessions_dir:
+        sessions_dir = Path(args.sessions_dir).expanduser()
+        session_files = sorted(p for p in sessions_dir.glob('*.jsonl') if p.is_file())
+    else:
+        session_files = watcher.session_files()
+    sizes = {str(p): p.stat().st_size for p in session_files}
+    total_bytes = sum(sizes.values())
+    if not session_files:
+        print("⚠️  没有找到会话文件")
+        return 0
+
+    ingestor = SessionIngestor(collector, watcher=watcher, summarize=False)
+    if not ingestor.acquire():
+        print(f"❌ 另一个入库实例正在运行（{ingestor.lock_path}），请先停止服务器和任务监听器")
+        return 1
+
+    # token 用量只有累计值，没有逐条记录：重建全部历史（或存储中还没有用量）时从零重新累计，
+    # 用单独的已处理索引去重，不受入库服务索引中已有ID的影响
+    live_index = ingestor.processed
+    rebuild_usage = not args.sessions_dir or collector.store.get_meta(TOKEN_USAGE_KEY) is None
+    if rebuild_usage:
+        ingestor.processed = ProcessedIndex('reindex', collector.data_dir)
+        ingestor.processed.clear()
+        collector.store.set_meta(TOKEN_USAGE_KEY, {"total": 0, "days": {}})
+
+    print(f"🔄 重建索引: {len(session_files)} 个文件，{total_bytes / 1e6:.1f} MB，{args.workers} 个进程")
+    started = time.monotonic()
+    read = {}
+    records = written = failed = 0
+    finished = set()
+    last_report = started
+    completed = False
+
+    def report(final=False):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        done_bytes = sum(read.values())
+        print(f"{'✅' if final else '📊'} {len(finished)}/{len(session_files)} 文件  "
+              f"{done_bytes / 1e6:.1f}/{total_bytes / 1e6:.1f} MB  {records} 条记录  写入 {written} 条  "
+              f"{done_bytes / 1e6 / elapsed:.1f} MB/s  {records / elapsed:.0f} 条/秒  {elapsed:.1f}s")
+
+    try:
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(args.workers) as pool:
+            # 有界队列：写入跟不上解析时子进程等待，内存占用有上限
+            results = manager.Queue(maxsize=args.workers * 4)
+            # 大文件先开始，各进程的负载更均衡
+            futures = {pool.submit(parse_file, path, results, args.chunk_size): path
+                       for path in sorted(sizes, key=sizes.get, reverse=True)}
+
+            while len(finished) < len(session_files):
+                try:
+                    path, offset, count, derived, state = results.get(timeout=0.5)
+                except queue.Empty:
+                    # 子进程异常时不会发回最后一块
+                    for future, path in futures.items():
+                        if path not in finished and future.done() and future.exception() is not None:
+                            print(f"❌ 解析失败 {path}: {future.exception()}")
+                            finished.add(path)
+                            failed += 1
+                    continue
+
+                written += ingestor.write(derived)
+                read[path] = offset
+                records += count
+                if state is not None:
+                    # 入库服务之后从这里继续，并接着配对最后一条未回复的消息
+                    ingestor.checkpoints.set(path, offset, state=state)
+                    finished.add(path)
+
+                if time.monotonic() - last_report >= args.progress_interval:
+                    report()
+                    last_report = time.monotonic()
+            completed = not failed
+        # 历史中没有回复的任务超时后标记为失败，不会一直显示为运行中
+        collector.check_stale_tasks()
+    finally:
+        if ingestor.processed is not live_index:
+            # 重新累计过的消息并入入库服务的索引，之后重读这些文件时不会再次累计
+            live_index.merge(ingestor.processed)
+            ingestor.processed.clear()
+            ingestor.processed = live_index
+            if not completed:
+                print("⚠️  token 用量没有重建完成，请重新执行")
+        ingestor.release()
+
+    report(final=True)
+    if failed:
+        print(f"⚠️  {failed} 个文件解析失败")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,95 +6,232 @@ Daily Report Web Server - 无依赖版本
 import json
 import sys
 import os
+import signal
 from pathlib import Path
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import HTTPServer, ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import parse_qs
 import datetime
+import queue
 
 # 添加src目录到路径
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+from compression import GzipCache, accepts_gzip
+from data_collector import VALID_STATUSES
+
+# 批量任务接口单次请求最多的操作数
+MAX_BATCH_OPERATIONS = 1000
+
 class APIHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        self.data_collector = None
-        super().__init__(*args, **kwargs)
+    # 数据收集器和系统监控由服务器在启动时创建一次，所有请求线程共享
+    @property
+    def data_collector(self):
+        return self.server.data_collector
 
-    def do_GET(self):
-        # 初始化数据收集器
-        if self.data_collector is None:
-            from data_collector import DataCollector
-            from system_monitor import SystemMonitor
-            config_path = Path(__file__).parent / 'config.json'
-            self.data_collector = DataCollector(config_path)
-            self.monitor = SystemMonitor(config_path)
+    @property
+    def monitor(self):
+        return self.server.monitor
 
+    @property
+    def reflection_jobs(self):
+        return self.server.reflection_jobs
+
+    def do_GET(self):
         # API路由
-        if self.path == '/api/data' or self.path.startswith('/api/data/'):
+        if self.path == '/api/data' or self.path.startswith(('/api/data/', '/api/data?')):
             self.handle_api_request()
+        elif self.path == '/api/stream' or self.path.startswith('/api/stream?'):
+            self.handle_stream_request()
+        elif self.path == '/api/tasks' or self.path.startswith('/api/tasks?'):
+            self.handle_page_request(self.data_collector.page_tasks)
+        elif self.path == '/api/interactions' or self.path.startswith('/api/interactions?'):
+            self.handle_page_request(self.data_collector.page_interactions)
         elif self.path == '/api/system':
             self.handle_system_request()
+        elif self.path == '/api/system/history' or self.path.startswith('/api/system/history?'):
+            self.handle_system_history_request()
+        elif self.path == '/api/reflection':
+            self.handle_reflection_request()
+        elif self.path.startswith('/api/reflection/jobs/'):
+            self.handle_reflection_job_request()
         elif self.path == '/api/health':
             self.handle_api_health_request()
         elif self.path == '/health':
             self.handle_health_request()
         else:
-            # 静态文件
-            super().do_GET()
+            # 静态文件：启动时已读入内存（含预压缩版本），未缓存的文件退回从磁盘读取
+            asset = self.server.static_assets.get(self.path)
+            if asset is not None:
+                self.send_static_asset(asset)
+            else:
+                super().do_GET()
 
-    def do_POST(self):
-        # 初始化数据收集器
-        if self.data_collector is None:
-            from data_collector import DataCollector
-            from system_monitor import SystemMonitor
-            config_path = Path(__file__).parent / 'config.json'
-            self.data_collector = DataCollector(config_path)
-            self.monitor = SystemMonitor(config_path)
+    def do_HEAD(self):
+        asset = self.server.static_assets.get(self.path)
+        if asset is not None:
+            self.send_static_asset(asset, head_only=True)
+        else:
+            super().do_HEAD()
 
+    def do_POST(self):
         # POST API路由
         if self.path == '/api/task/create':
             self.handle_create_task()
         elif self.path == '/api/task/update':
             self.handle_update_task()
+        elif self.path == '/api/task/batch':
+            self.handle_batch_tasks()
         elif self.path == '/api/reflection/generate':
             self.handle_generate_reflection()
         else:
             self.send_error_response("Unknown API endpoint")
 
     def handle_api_request(self):
-        """处理API数据请求"""
+        """处理API数据请求
+
+        /api/data/<filter>?sections=stats,system&fields=tasks.id,tasks.status
+        /api/data?from=2026-02-01&to=2026-02-08&tz=Asia/Shanghai
+        """
+        from response_cache import parse_selection
+
+        path, _, query_string = self.path.partition('?')
+        query = parse_qs(query_string)
+        # 解析时间筛选
+        time_filter = 'today'
+        if path.startswith('/api/data/'):
+            time_filter = path.split('/')[-1]
+            valid_filters = ['today', 'week', 'month', 'all']
+            if time_filter not in valid_filters:
+                time_filter = 'today'
+
         try:
-            # 解析时间筛选
-            time_filter = 'today'
-            if self.path.startswith('/api/data/'):
-                time_filter = self.path.split('/')[-1]
-                valid_filters = ['today', 'week', 'month', 'all']
-                if time_filter not in valid_filters:
-                    time_filter = 'today'
-
-            # 收集数据
-            system = self.data_collector.get_system_status()
-            self.monitor.update_status(system)
-
-            data = {
-                "system": system,
-                "stats": self.data_collector.get_stats(time_filter),
-                "tasks": self.data_collector.get_tasks(time_filter, include_user_tasks=True),
-                "interactions": self.data_collector.get_interactions(time_filter),
-                "reflection": self.data_collector.get_reflection()
-            }
+            sections, fields = parse_selection(query.get('sections', [''])[0],
+                                               query.get('fields', [''])[0])
+            time_range = self._time_range(query, time_filter)
+        except ValueError as e:
+            self.send_error_response(str(e), status=400)
+            return
 
-            self.send_json_response(data)
+        try:
+            # 各部分的 JSON 片段按输入版本缓存，未变化的部分不重新计算，未请求的部分不计算；
+            # 缓存以毫秒区间为键，日期变化时 today/week/month 自然对应新的区间
+            etag, body, versions = self.server.response_cache.dashboard_response(
+                time_range, sections, fields)
+            # 各部分的内容版本，客户端据此跳过未变化部分的重新渲染
+            section_versions = ','.join(f"{name}={v}" for name, v in versions.items())
+            # 任务列表的条数上限（data.max_tasks_display），Dashboard 合并推送的新任务后按它截断
+            self.send_json_bytes(body, etag=etag,
+                                 extra_headers={'X-Content-Versions': section_versions,
+                                                'X-Max-Tasks': str(self.server.data_collector.max_tasks)})
+        except Exception as e:
+            self.send_error_response(str(e))
+
+    def handle_page_request(self, page):
+        """游标分页：?before=<上一页的 next_before>&limit=N，可选 from/to/tz 限定时间范围"""
+        query = parse_qs(self.path.partition('?')[2])
+        try:
+            start, end = self._time_range(query, 'all')
+        except ValueError as e:
+            self.send_error_response(str(e), status=400)
+            return
+
+        try:
+            items, next_before = page(query.get('before', [None])[0], query.get('limit', [None])[0],
+                                      start=start, end=end)
+            self.send_json_response({"items": items, "next_before": next_before})
+        except ValueError as e:
+            self.send_error_response(str(e), status=400)
         except Exception as e:
             self.send_error_response(str(e))
 
+    def _time_range(self, query, time_filter):
+        """from/to/tz 参数 → (start_ms, end_ms)；没有 from/to 时按 time_filter 在 tz 时区计算
+
+        Raises:
+            ValueError: 参数无法解析
+        """
+        from timeutil import filter_range, parse_time_param, parse_tz
+
+        tz_name = query.get('tz', [''])[0]
+        tz = parse_tz(tz_name) if tz_name else self.data_collector.tz
+        start = parse_time_param(query.get('from', [''])[0], tz)
+        end = parse_time_param(query.get('to', [''])[0], tz)
+        if start is not None or end is not None:
+            return (start, end)
+        return filter_range(time_filter, tz)
+
     def handle_system_request(self):
         """仅返回系统状态"""
         try:
-            system = self.data_collector.get_system_status()
-            self.send_json_response(system)
+            etag, body = self.server.response_cache.section_response('system')
+            self.send_json_bytes(body, etag=etag)
+        except Exception as e:
+            self.send_error_response(str(e))
+
+    def handle_reflection_request(self):
+        """仅返回今日反思"""
+        try:
+            etag, body = self.server.response_cache.section_response('reflection')
+            self.send_json_bytes(body, etag=etag)
         except Exception as e:
             self.send_error_response(str(e))
 
+    def handle_system_history_request(self):
+        """系统状态历史（内存中的时间序列），参数 range=1h&step=1m"""
+        from system_monitor import parse_duration
+
+        query = parse_qs(self.path.partition('?')[2])
+        try:
+            range_seconds = parse_duration(query.get('range', [''])[0], 3600)
+            step_seconds = parse_duration(query.get('step', [''])[0], None)
+        except ValueError as e:
+            self.send_error_response(str(e), status=400)
+            return
+
+        try:
+            self.send_json_response(self.monitor.history(range_seconds, step_seconds))
+        except Exception as e:
+            self.send_error_response(str(e))
+
+    def handle_stream_request(self):
+        """Server-Sent Events：推送任务新建/更新、统计变化和系统状态"""
+        # 单线程模式下长连接会阻塞整个服务器，让客户端退回轮询
+        if not self.server.stream_enabled:
+            self.send_error_response("Stream unavailable in single-threaded mode", status=503)
+            return
+
+        query = parse_qs(self.path.partition('?')[2])
+        time_filter = query.get('filter', ['today'])[0]
+        if time_filter not in ['today', 'week', 'month', 'all']:
+            time_filter = 'today'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        events = self.server.events.subscribe(time_filter)
+        try:
+            # 告诉客户端断线后的重连间隔
+            self.wfile.write(b'retry: 5000\n\n')
+            self.wfile.flush()
+            while True:
+                try:
+                    event_type, data = events.get(timeout=self.server.stream_keepalive)
+                except queue.Empty:
+                    # 心跳，保持连接并及时发现断开的客户端
+                    self.wfile.write(b': keepalive\n\n')
+                else:
+                    payload = json.dumps(data, ensure_ascii=False)
+                    self.wfile.write(f"event: {event_type}\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.events.unsubscribe(events)
+            self.close_connection = True
+
     def handle_health_request(self):
         """健康检查"""
         self.send_json_response({
@@ -110,7 +247,8 @@ class APIHandler(SimpleHTTPRequestHandler):
                 "status": "ok",
                 "service": "dailyreport-claw",
                 "version": "1.0.0",
-                "timestamp": datetime.datetime.now().isoformat()
+                "timestamp": datetime.datetime.now().isoformat(),
+                "cache": self.server.response_cache.stats()
             }
             self.send_json_response(health_data)
         except Exception as e:
@@ -165,7 +303,7 @@ class APIHandler(SimpleHTTPRequestHandler):
                 return
 
             # 验证状态值
-            valid_statuses = ['running', 'completed', 'failed']
+            valid_statuses = list(VALID_STATUSES)
             if status not in valid_statuses:
                 self.send_error_response(f"Invalid status. Must be one of: {valid_statuses}")
                 return
@@ -184,50 +322,159 @@ class APIHandler(SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error_response(str(e))
 
-    def handle_generate_reflection(self):
-        """手动触发反思生成"""
-        try:
-            import subprocess
-            script_path = Path(__file__).parent / 'scripts' / 'generate_reflection.py'
-
-            if not script_path.exists():
-                self.send_error_response("Reflection script not found")
-                return
+    def handle_batch_tasks(self):
+        """批量创建/更新任务：{"operations": [{"op": "create", ...}, {"op": "update", ...}]}
 
-            # 运行反思生成脚本
-            result = subprocess.run(
-                ['python3', str(script_path)],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=Path(__file__).parent
-            )
+        所有合法的操作在一个事务内执行，按顺序返回每个操作的结果。
+        """
+        try:
+            content_length = int(self.headers['Content-Length'])
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+        except (TypeError, ValueError) as e:
+            self.send_error_response(f"Invalid JSON body: {e}", status=400)
+            return
+
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            self.send_error_response("Missing required field: operations", status=400)
+            return
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            self.send_error_response(f"Too many operations (max {MAX_BATCH_OPERATIONS})", status=413)
+            return
 
-            if result.returncode == 0:
-                self.send_json_response({
-                    "success": True,
-                    "message": "反思生成成功",
-                    "output": result.stdout
-                })
-            else:
-                self.send_error_response(f"Reflection generation failed: {result.stderr}")
+        try:
+            results = self.data_collector.apply_task_batch(operations)
+            succeeded = sum(1 for r in results if r['success'])
+            self.send_json_response({
+                "success": succeeded == len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "results": results
+            })
+        except Exception as e:
+            self.send_error_response(str(e))
 
-        except subprocess.TimeoutExpired:
-            self.send_error_response("Reflection generation timed out")
+    def handle_generate_reflection(self):
+        """手动触发反思生成（后台执行，立即返回任务ID）"""
+        try:
+            job = self.reflection_jobs.submit()
+            self.send_json_response({
+                "success": True,
+                "job_id": job['id'],
+                "status": job['status'],
+                "message": "反思生成已开始"
+            }, status=202)
         except Exception as e:
             self.send_error_response(str(e))
 
-    def send_json_response(self, data):
+    def handle_reflection_job_request(self):
+        """查询反思生成任务进度"""
+        job_id = self.path.split('/')[-1]
+        job = self.reflection_jobs.get(job_id)
+        if job is None:
+            self.send_error_response("Job not found", status=404)
+            return
+        self.send_json_response(job)
+
+    def send_json_response(self, data, status=200):
         """发送JSON响应"""
-        self.send_response(200)
+        self.send_json_bytes(json.dumps(data, ensure_ascii=False).encode('utf-8'), status)
+
+    def send_json_bytes(self, body, status=200, etag=None, extra_headers=None):
+        """发送已序列化的JSON响应
+
+        Args:
+            etag: 响应的强 ETag；与请求的 If-None-Match 匹配时返回 304，不发送响应体
+            extra_headers: 额外的响应头
+        """
+        if etag is not None and self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+
+        # 超过阈值且客户端支持时 gzip 压缩（同一 ETag 的内容只压缩一次）
+        encoding = None
+        if len(body) >= self.server.gzip_min_size and accepts_gzip(self.headers.get('Accept-Encoding')):
+            body = self.server.gzip_cache.get(etag, body)
+            encoding = 'gzip'
+
+        self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # 允许客户端缓存，但每次使用前都要重新验证
+            self.send_header('Cache-Control', 'no-cache')
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_static_asset(self, asset, head_only=False):
+        """从内存发送静态文件，客户端支持时发送预压缩版本
+
+        带内容哈希的URL永久缓存；其他URL（页面、旧的未带哈希的引用）每次重新验证 ETag。
+        大文件不在内存中，用 sendfile 从磁盘零拷贝发送。
+        """
+        if self.server.static_assets.is_immutable(self.path):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'no-cache'
+
+        if self._etag_matches(asset.etag):
+            self.send_response(304)
+            self.send_header('ETag', asset.etag)
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+
+        body = asset.data
+        encoding = None
+        if asset.gzip_data is not None and accepts_gzip(self.headers.get('Accept-Encoding')):
+            body = asset.gzip_data
+            encoding = 'gzip'
+
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body) if body is not None else asset.size))
+        self.send_header('ETag', asset.etag)
+        self.send_header('Cache-Control', cache_control)
+        if asset.gzip_data is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
 
-    def send_error_response(self, error):
+        if head_only:
+            return
+        if body is not None:
+            self.wfile.write(body)
+            return
+        try:
+            with open(asset.path, 'rb') as f:
+                self.connection.sendfile(f, count=asset.size)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _etag_matches(self, etag):
+        """If-None-Match 是否包含当前 ETag（弱比较）"""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in header.split(',')]
+        return etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+    def send_error_response(self, error, status=500):
         """发送错误响应"""
-        self.send_response(500)
+        self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
@@ -237,13 +484,8 @@ class APIHandler(SimpleHTTPRequestHandler):
         # 添加CORS头
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-
-        # 对静态文件添加缓存控制
-        if self.path.startswith('/static/'):
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, X-Content-Versions')
 
         super().end_headers()
 
@@ -253,6 +495,79 @@ class APIHandler(SimpleHTTPRequestHandler):
         print(f"[{timestamp}] {format % args}")
 
 
+def create_server(config_path, host, port, threaded=True, ingest_interval=5, stream_config=None,
+                  system_config=None, server_config=None):
+    """创建HTTP服务器，并挂载进程级共享的数据收集器
+
+    Args:
+        config_path: 配置文件路径
+        host: 监听地址
+        port: 监听端口
+        threaded: 是否每个请求一个线程（默认True）；False 时退回单线程模式
+        ingest_interval: 入库服务清理僵尸任务、轮询会话文件的间隔（秒）
+        stream_config: 实时推送配置（interval / system_interval / keepalive）
+        system_config: 系统状态采样配置（sample_interval / sample_history / history_persist_interval）
+        server_config: 服务器配置（gzip_min_size / gzip_level / sendfile_min_size）
+    """
+    from data_collector import DataCollector
+    from system_monitor import SystemMonitor
+    from reflection_jobs import ReflectionJobManager
+    from ingestor import SessionIngestor
+    from stream import EventBus, StreamPublisher
+    from system_sampler import SystemSampler
+    from response_cache import ResponseCache
+
+    from static_assets import StaticAssets
+
+    stream_config = stream_config or {}
+    system_config = system_config or {}
+    server_config = server_config or {}
+
+    server_class = ThreadingHTTPServer if threaded else HTTPServer
+    server = server_class((host, port), APIHandler)
+
+    # 响应压缩：超过阈值的 JSON 按需 gzip，静态文件启动时预压缩并缓存在内存，
+    # 页面中的静态文件引用改写为带内容哈希的URL
+    server.gzip_min_size = server_config.get('gzip_min_size', 1024)
+    gzip_level = server_config.get('gzip_level', 6)
+    server.gzip_cache = GzipCache(level=gzip_level)
+    server.static_assets = StaticAssets(Path(__file__).parent / 'web',
+                                        gzip_min_size=server.gzip_min_size,
+                                        gzip_level=gzip_level,
+                                        sendfile_min_size=server_config.get('sendfile_min_size', 256 * 1024))
+
+    server.data_collector = DataCollector(config_path)
+    server.monitor = SystemMonitor(
+        config_path,
+        persist_interval=system_config.get('history_persist_interval', 60)
+    )
+
+    # 系统状态在后台按间隔采样，请求直接读取最新样本；样本同时写入监控的时间序列
+    server.sampler = SystemSampler(
+        server.data_collector,
+        interval=system_config.get('sample_interval', 5),
+        history=system_config.get('sample_history', 720),
+        monitor=server.monitor
+    ).start()
+    server.data_collector.sampler = server.sampler
+    server.response_cache = ResponseCache(server.data_collector)
+
+    server.reflection_jobs = ReflectionJobManager(server.data_collector)
+    server.ingestor = SessionIngestor(server.data_collector, ingest_interval).start()
+
+    # 实时推送
+    server.events = EventBus()
+    server.data_collector.events = server.events
+    server.stream_enabled = threaded
+    server.stream_keepalive = stream_config.get('keepalive', 15)
+    server.stream_publisher = StreamPublisher(
+        server.data_collector, server.events,
+        interval=stream_config.get('interval', 2),
+        system_interval=stream_config.get('system_interval', 10)
+    ).start()
+    return server
+
+
 def main():
     # 读取配置
     config_path = Path(__file__).parent / 'config.json'
@@ -262,6 +577,10 @@ def main():
     server_config = config.get('server', {})
     host = server_config.get('host', '0.0.0.0')
     port = server_config.get('port', 8080)
+    threaded = server_config.get('threaded', True)
+    ingest_interval = config.get('data', {}).get('ingest_interval', 5)
+    stream_config = config.get('stream', {})
+    system_config = config.get('system', {})
 
     # 切换到web目录
     os.chdir(Path(__file__).parent / 'web')
@@ -277,14 +596,22 @@ def main():
     """)
 
     # 创建服务器
-    server = HTTPServer((host, port), APIHandler)
-    print(f"✅ 服务器运行在 {host}:{port}")
+    server = create_server(config_path, host, port, threaded, ingest_interval, stream_config,
+                           system_config, server_config)
+    mode_text = "多线程" if threaded else "单线程"
+    print(f"✅ 服务器运行在 {host}:{port}（{mode_text}模式）")
     print("按 Ctrl+C 停止服务器")
 
+    # systemd 等用 SIGTERM 停止服务：同 Ctrl+C 一样保存系统状态历史和入库进度后退出
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n\n🛑 服务器已停止")
+        server.monitor.persist()
+        server.ingestor.stop()
+        server.ingestor.flush(force=True)
         server.shutdown()
 
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+读取进度检查点 - 持久化记录每个会话文件已处理到的位置
+
+按 (设备号, inode) 而不是路径记录，文件改名、轮转后仍能对应到原来的进度；
+同时保存文件开头若干字节的指纹，inode 被新文件复用时不会误用旧进度。
+每个使用方一个文件：data/checkpoints/<name>.json。
+修改先在内存中累积，按间隔批量写入（写临时文件后原子替换），崩溃时最多重放一个间隔内的记录，
+使用方的写入按ID去重，重放是安全的。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 文件指纹取开头的字节数
+HEAD_BYTES = 256
+
+
+def file_key(st):
+    """文件的身份：设备号 + inode"""
+    return f"{st.st_dev}:{st.st_ino}"
+
+
+def head_digest(path, length):
+    """文件开头 min(length, HEAD_BYTES) 字节的指纹"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(min(length, HEAD_BYTES))).hexdigest()[:16]
+
+
+class CheckpointStore:
+    def __init__(self, name, data_dir=None, flush_interval=2.0):
+        """
+        Args:
+            name: 使用方名称（入库服务为 ingestor）
+            data_dir: 数据目录，默认项目的 data/
+            flush_interval: 批量写入的最短间隔（秒）
+        """
+        data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / 'data'
+        self.path = data_dir / 'checkpoints' / f'{name}.json'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = False
+        # 第一次写入不等待间隔
+        self._last_flush = float('-inf')
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            return {}
+
+    def get(self, path):
+        """文件的检查点 {"offset", "last_id", "state", "path", ...}；没有记录、文件被截断或已不是原来的文件时返回None"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self._entries.get(file_key(st))
+        if entry is None or entry['offset'] > st.st_size:
+            return None
+        try:
+            if entry.get('head') != head_digest(path, entry.get('head_len', HEAD_BYTES)):
+                return None
+        except OSError:
+            return None
+        return dict(entry)
+
+    def set(self, path, offset, last_id=None, state=None):
+        """记录文件已处理到 offset（内存中，flush 时写盘）
+
+        Args:
+            last_id: 最后处理的消息ID；None 表示沿用之前记录的值
+            state: 使用方在该位置的解析状态（可JSON序列化）；None 表示沿用之前记录的值
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        key = file_key(st)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.get('head_len') != min(offset, HEAD_BYTES):
+                # 新文件、之前记录时文件还不足 HEAD_BYTES、或文件被截断后重读：重新计算指纹
+                head_len = min(offset, HEAD_BYTES)
+                entry = dict(entry or {}, head=head_digest(path, head_len), head_len=head_len)
+            entry.update(path=str(path), offset=offset, updated_at=datetime.now().isoformat())
+            if last_id is not None:
+                entry['last_id'] = last_id
+            if state is not None:
+                entry['state'] = state
+            self._entries[key] = entry
+            self._dirty = True
+
+    def flush(self, force=False):
+        """把内存中的修改写入文件（距上次写入不足 flush_interval 时跳过，除非 force）
+
+        Returns:
+            是否写入
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            if not force and time.monotonic() - self._last_flush < self.flush_interval:
+                return False
+            data = json.dumps({"files": self._entries}, ensure_ascii=False, indent=1)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        return True
+
+    def forget_missing(self, existing_paths):
+        """只保留 existing_paths 中的文件的记录（已删除或不再读取的文件）"""
+        keys = set()
+        for path in existing_paths:
+            try:
+                keys.add(file_key(os.stat(path)))
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            for key in list(self._entries):
+                if key not in keys:
+                    del self._entries[key]
+                    self._dirty = True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+响应压缩 - 按 Accept-Encoding 协商 gzip，并缓存已压缩的响应体
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+# 值得压缩的内容类型（图片、字体等已经是压缩格式）
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+def accepts_gzip(header):
+    """Accept-Encoding 是否允许 gzip（支持 q 值，q=0 表示拒绝）"""
+    if not header:
+        return False
+    allowed = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        allowed[coding.strip().lower()] = q
+    if 'gzip' in allowed:
+        return allowed['gzip'] > 0
+    return allowed.get('*', 0) > 0
+
+
+def is_compressible(content_type):
+    return (content_type or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def gzip_bytes(data, level=6):
+    # mtime=0 保证相同内容压缩结果相同
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class GzipCache:
+    """按键（通常是 ETag）缓存压缩结果的 LRU，内容未变化时不重复压缩"""
+
+    def __init__(self, level=6, max_entries=64):
+        self.level = level
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, data):
+        if key is None:
+            return gzip_bytes(data, self.level)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+        compressed = gzip_bytes(data, self.level)
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
 """
-数据收集模块 - 从OpenClaw会话历史收集数据
+数据收集模块 - 读取存储中的任务、互动和统计，以及系统状态
+
+会话文件由入库服务（ingestor.py）解析并写入存储，这里不再解析会话文件。
 """
 import json
 import os
 import subprocess
-import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
-# 添加scripts目录到路径，用于导入keyword_extractor
-scripts_dir = Path(__file__).parent.parent / 'scripts'
-sys.path.insert(0, str(scripts_dir))
+from rollups import build as build_rollups, day_span, summarize
+from store import created_ts
+from timeutil import filter_range, in_range, to_epoch_ms
+
+# 任务更新接口允许的状态
+VALID_STATUSES = ('running', 'completed', 'failed')
 
 class DataCollector:
     def __init__(self, config_path):
@@ -20,9 +24,26 @@ class DataCollector:
         self.data_dir = Path(__file__).parent.parent / 'data'
         self.data_dir.mkdir(exist_ok=True)
 
-        # 导入关键词提取器
-        from keyword_extractor import KeywordExtractor
-        self.keyword_extractor = KeywordExtractor
+        # 任务、互动等数据的存储（SQLite 或 JSON 文件，见 store.py）
+        from store import open_store
+        self.store = open_store(self.config, self.data_dir)
+
+        # 列表接口的条数上限（config.json 的 data 部分）
+        data_config = self.config.get('data', {})
+        self.max_tasks = data_config.get('max_tasks_display', 50)
+        self.max_interactions = data_config.get('max_interactions_display', 20)
+        # today/week/month 按该时区的日历计算（默认服务器本地时区）
+        from timeutil import parse_tz
+        self.tz = parse_tz(data_config.get('timezone'))
+
+        # 实时推送的事件总线（由服务器设置，见 stream.py）
+        self.events = None
+        # 后台系统状态采样线程（由服务器设置，见 system_sampler.py）
+        self.sampler = None
+        self._version_cache = None
+        self._tokens_cache = None
+
+        # token 用量等由入库服务（ingestor.py）写入存储，这里只读取
 
     def create_task(self, description, user_message='', status='running', scheduled_time=None):
         """创建新任务
@@ -36,41 +57,45 @@ class DataCollector:
         Returns:
             task_id: 创建的任务ID
         """
-        import time
-
         # 调试输出
         print(f"🔍 [DEBUG] create_task收到参数: status={repr(status)}, scheduled_time={repr(scheduled_time)}")
 
-        task_id = f"task_{int(time.time() * 1000)}"
+        task = self._new_task(description, user_message, status, scheduled_time)
+        # ID由存储在写入时分配（跨进程单调递增，同一毫秒内创建也不会重复）
+        task_id = self.store.batch('user_tasks', [('create', task)])[0]['id']
+        self._notify_change()
 
+        status_text = "🕐 计划任务" if status == 'scheduled' else "执行中"
+        print(f"✅ 创建任务: {description} (ID: {task_id}, {status_text})")
+        return task_id
+
+    def _new_task(self, description, user_message='', status='running', scheduled_time=None):
+        """新任务的记录（不含ID）"""
+        now = datetime.now().isoformat()
         task = {
-            "id": task_id,
             "description": description,
             "user_message": user_message,
             "status": status,
-            "created_at": datetime.now().isoformat(),
-            "start_time": None if status == 'scheduled' else datetime.now().isoformat(),
+            "created_at": now,
+            "start_time": None if status == 'scheduled' else now,
             "end_time": None,
             "duration": None,
             "result": "",
             "task_type": "system_task" if status == 'scheduled' else "user_task"
         }
 
-        print(f"🔍 [DEBUG] task对象创建后: status={task['status']}, start_time={task['start_time']}")
-
         # 如果是计划任务，添加计划时间
         if status == 'scheduled' and scheduled_time:
             task['scheduled_time'] = scheduled_time
+        return task
 
-        # 保存到独立的用户任务文件
-        self._save_user_task(task)
-
-        status_text = "🕐 计划任务" if status == 'scheduled' else "执行中"
-        print(f"✅ 创建任务: {description} (ID: {task_id}, {status_text})")
-        return task_id
+    def _notify_change(self):
+        """任务数据已变化，通知实时推送立即检查"""
+        if self.events is not None:
+            self.events.notify()
 
     def update_task(self, task_id, status, result=''):
-        """更新任务状态（带文件锁）
+        """更新任务状态（存储内原子更新）
 
         Args:
             task_id: 任务ID
@@ -81,60 +106,117 @@ class DataCollector:
             bool: 更新是否成功
         """
         try:
-            import fcntl
-            user_tasks_file = self.data_dir / 'user_tasks.json'
-
-            if not user_tasks_file.exists():
+            if self.store.update('user_tasks', task_id, self._status_change(status, result)) is None:
                 return False
-
-            # 读取（带共享锁）
-            with open(user_tasks_file, 'r', encoding='utf-8') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                try:
-                    tasks = json.load(f)
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-
-            # 查找并更新任务
-            for task in tasks:
-                if task.get('id') == task_id:
-                    task['status'] = status
-                    task['result'] = result
-
-                    # 如果是完成或失败，记录结束时间和持续时间
-                    if status in ['completed', 'failed']:
-                        task['end_time'] = datetime.now().isoformat()
-                        if task.get('start_time'):
-                            try:
-                                start = datetime.fromisoformat(task['start_time'])
-                                end = datetime.fromisoformat(task['end_time'])
-                                task['duration'] = round((end - start).total_seconds(), 2)
-                            except:
-                                pass
-
-                    # 保存回文件（带排他锁）
-                    with open(user_tasks_file, 'w', encoding='utf-8') as f:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                        try:
-                            json.dump(tasks, f, indent=2, ensure_ascii=False)
-                        finally:
-                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-
-                    print(f"✅ 更新任务 {task_id}: {status}")
-                    return True
-
-            return False
+            self._notify_change()
+            print(f"✅ 更新任务 {task_id}: {status}")
+            return True
 
         except Exception as e:
             print(f"❌ 更新任务失败: {e}")
             return False
 
+    @staticmethod
+    def _status_change(status, result=''):
+        """返回把任务更新为 status 的修改函数（完成或失败时记录结束时间和持续时间）"""
+        def apply(task):
+            task['status'] = status
+            task['result'] = result
+
+            # 如果是完成或失败，记录结束时间和持续时间
+            if status in ['completed', 'failed']:
+                task['end_time'] = datetime.now().isoformat()
+                if task.get('start_time'):
+                    try:
+                        start = datetime.fromisoformat(task['start_time'])
+                        end = datetime.fromisoformat(task['end_time'])
+                        task['duration'] = round((end - start).total_seconds(), 2)
+                    except:
+                        pass
+        return apply
+
+    def apply_task_batch(self, operations):
+        """在一个事务内执行一组任务创建和状态更新
+
+        Args:
+            operations: [{"op": "create", "description": ..., "status": ..., "user_message": ..., "scheduled_time": ...}
+                         | {"op": "update", "task_id": ..., "status": ..., "result": ...}]
+
+        Returns:
+            与 operations 一一对应的结果 [{"success": bool, "task_id": ..., "error": ...}]；
+            校验失败的操作不写入，其余操作照常执行
+        """
+        results = [None] * len(operations)
+        ops = []
+        positions = []
+        for i, operation in enumerate(operations):
+            try:
+                ops.append(self._batch_op(operation))
+                positions.append(i)
+            except ValueError as e:
+                results[i] = {"success": False, "error": str(e)}
+
+        written = self.store.batch('user_tasks', ops) if ops else []
+        for i, op, item in zip(positions, ops, written):
+            if item is None:
+                results[i] = {"success": False, "task_id": op[1], "error": "Task not found"}
+            else:
+                results[i] = {"success": True, "task_id": item['id'], "status": item.get('status')}
+
+        if any(item is not None for item in written):
+            self._notify_change()
+        created = sum(1 for op, item in zip(ops, written) if op[0] == 'create')
+        updated = sum(1 for op, item in zip(ops, written) if op[0] == 'update' and item is not None)
+        print(f"✅ 批量写入任务: 创建 {created} 个，更新 {updated} 个，失败 {len(operations) - created - updated} 个")
+        return results
+
+    def _batch_op(self, operation):
+        """校验一个批量操作并转换为存储的操作
+
+        Raises:
+            ValueError: 操作格式或字段不合法
+        """
+        if not isinstance(operation, dict):
+            raise ValueError("Operation must be an object")
+        kind = operation.get('op')
+        if kind == 'create':
+            description = operation.get('description', '')
+            status = operation.get('status', 'running')
+            if not description:
+                raise ValueError("Missing required field: description")
+            if status not in ('running', 'scheduled'):
+                raise ValueError("Invalid status. Must be one of: ['running', 'scheduled']")
+            return ('create', self._new_task(description, operation.get('user_message', ''), status,
+                                             operation.get('scheduled_time')))
+        if kind == 'update':
+            task_id = operation.get('task_id')
+            status = operation.get('status')
+            if not task_id or not status:
+                raise ValueError("Missing required fields: task_id, status")
+            if status not in VALID_STATUSES:
+                raise ValueError(f"Invalid status. Must be one of: {list(VALID_STATUSES)}")
+            return ('update', task_id, self._status_change(status, operation.get('result', '')))
+        raise ValueError("Unknown op. Must be one of: ['create', 'update']")
+
     def get_system_status(self):
-        """收集系统状态"""
+        """获取系统状态（有后台采样时直接返回最新样本）"""
+        if self.sampler is not None:
+            sample = self.sampler.latest()
+            if sample is not None:
+                return sample
+        return self.collect_system_status()
+
+    def collect_system_status(self, cpu_interval=0.1):
+        """实际采集系统状态
+
+        Args:
+            cpu_interval: psutil 计算CPU占用的阻塞时间；None 表示与上次调用比较（不阻塞）
+        """
         try:
             # 获取系统资源
-            cpu, memory = self._get_system_resources()
-            uptime = self._get_uptime()
+            cpu, memory = self._get_system_resources(cpu_interval)
+            uptime_seconds = self._get_uptime_seconds()
+            uptime = self._get_uptime(uptime_seconds)
 
             # 获取TOKENS使用量
             tokens = self._get_tokens_usage()
@@ -151,6 +233,7 @@ class DataCollector:
                 "cpu_percent": cpu,
                 "memory_percent": memory,
                 "uptime": uptime,
+                "uptime_seconds": uptime_seconds or 0,
                 "tokens_total": tokens,
                 "last_update": datetime.now().strftime("%H:%M:%S")
             }
@@ -174,19 +257,35 @@ class DataCollector:
         }
 
     def _get_openclaw_version(self):
-        """获取OpenClaw版本"""
+        """获取OpenClaw版本（缓存结果，openclaw 可执行文件变化时才重新查询）"""
+        import shutil
+
+        binary = shutil.which('openclaw')
         try:
-            # 使用 shell=True 执行命令
-            result = subprocess.run(
-                'openclaw --version',
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                version = result.stdout.strip()
-                return version
+            key = (binary, os.stat(binary).st_mtime_ns) if binary else (None, None)
+        except OSError:
+            key = (None, None)
+
+        if self._version_cache is not None and self._version_cache[0] == key:
+            return self._version_cache[1]
+
+        version = self._query_openclaw_version(binary)
+        self._version_cache = (key, version)
+        return version
+
+    def _query_openclaw_version(self, binary):
+        """调用命令查询OpenClaw版本"""
+        try:
+            if binary:
+                result = subprocess.run(
+                    [binary, '--version'],
+                    capture_output=True,
+                    text=True,
+                    timeout=10
+                )
+                if result.returncode == 0:
+                    version = result.stdout.strip()
+                    return version
         except subprocess.TimeoutExpired:
             print("Warning: openclaw --version timed out")
         except Exception as e:
@@ -212,13 +311,21 @@ class DataCollector:
         return "unknown"
 
     def _get_tokens_usage(self):
-        """获取TOKENS使用量"""
+        """获取TOKENS使用量（sessions.json 未变化时使用缓存）
+
+        没有 sessions.json 时使用入库服务从AI回复中累计的用量。
+        """
         try:
             # 从会话文件中读取
             sessions_file = Path.home() / '.openclaw' / 'agents' / 'main' / 'sessions' / 'sessions.json'
 
             if not sessions_file.exists():
-                return 0
+                return (self.store.get_meta('token_usage') or {}).get('total', 0)
+
+            st = sessions_file.stat()
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if self._tokens_cache is not None and self._tokens_cache[0] == key:
+                return self._tokens_cache[1]
 
             with open(sessions_file, 'r', encoding='utf-8') as f:
                 sessions_data = json.load(f)
@@ -229,401 +336,156 @@ class DataCollector:
                 if isinstance(session_data, dict) and 'totalTokens' in session_data:
                     total_tokens += session_data['totalTokens']
 
+            self._tokens_cache = (key, total_tokens)
             return total_tokens
 
         except Exception as e:
             print(f"Error reading tokens usage: {e}")
             return 0
 
-    def _get_system_resources(self):
+    def _get_system_resources(self, cpu_interval=0.1):
         """获取CPU和内存使用率"""
         try:
             import psutil
-            cpu = psutil.cpu_percent(interval=0.1)
+            cpu = psutil.cpu_percent(interval=cpu_interval)
             memory = psutil.virtual_memory().percent
             return cpu, memory
         except:
             return 12, 45
 
-    def _get_uptime(self):
-        """获取系统运行时间"""
+    def _get_uptime_seconds(self):
+        """获取系统运行秒数（读取失败返回None）"""
         try:
-            uptime_seconds = open('/proc/uptime').read().split()[0]
-            uptime_hours = int(float(uptime_seconds) // 3600)
-            uptime_minutes = int((float(uptime_seconds) % 3600) // 60)
-            return f"{uptime_hours}h {uptime_minutes}m"
+            return float(open('/proc/uptime').read().split()[0])
         except:
+            return None
+
+    def _get_uptime(self, uptime_seconds=None):
+        """获取系统运行时间"""
+        if uptime_seconds is None:
+            uptime_seconds = self._get_uptime_seconds()
+        if uptime_seconds is None:
             return "unknown"
+        uptime_hours = int(uptime_seconds // 3600)
+        uptime_minutes = int((uptime_seconds % 3600) // 60)
+        return f"{uptime_hours}h {uptime_minutes}m"
 
-    def get_tasks(self, time_filter='today', save_to_file=True, include_user_tasks=True, include_tool_calls=False):
-        """从会话历史获取任务列表（带去重和时间统一）
+    def get_tasks(self, time_filter='today', include_user_tasks=True, include_tool_calls=False):
+        """从存储获取任务列表（按创建时间倒序）
 
         Args:
-            time_filter: 时间筛选器 (today/week/month/all)
-            save_to_file: 是否保存新任务到文件 (默认True)
+            time_filter: 时间筛选器 (today/week/month/all)，或 (start_ms, end_ms) 区间
             include_user_tasks: 是否包含用户任务 (默认True)
-            include_tool_calls: 是否包含工具调用 (默认False) ← 新增参数
+            include_tool_calls: 是否包含工具调用 (默认False)
         """
         try:
-            # 先检查并清理僵尸任务
-            self.check_stale_tasks()
-
+            # 僵尸任务清理由入库服务定期执行，查询路径只读
             # 读取用户任务
             user_tasks = self._get_user_tasks(time_filter) if include_user_tasks else []
-            
-            # 记录已见任务ID（用于去重）
-            seen_task_ids = {task.get('id') for task in user_tasks}
-            
-            # 会话目录
-            sessions_dir = Path.home() / '.openclaw' / 'agents' / 'main' / 'sessions'
-
-            if not sessions_dir.exists():
-                return self._filter_and_sort_tasks(user_tasks, time_filter)
 
-            tasks = user_tasks[:]  # 复制一份
-
-            # 只有在明确要求时才提取工具调用
+            # 只有在明确要求时才合并工具调用
             if not include_tool_calls:
-                # 直接返回用户任务，不提取工具调用
-                print(f"✅ 仅返回用户任务 {len(tasks)} 个（不包含工具调用）")
-                return self._filter_and_sort_tasks(tasks, time_filter)
-
-            # 读取所有.jsonl文件（提取工具调用）
-            for jsonl_file in sessions_dir.glob('*.jsonl'):
-                if jsonl_file.name.endswith('.lock'):
-                    continue
-
-                try:
-                    with open(jsonl_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if not line.strip():
-                                continue
-
-                            try:
-                                msg_data = json.loads(line)
-
-                                # 只处理消息类型
-                                if msg_data.get('type') != 'message':
-                                    continue
-
-                                message = msg_data.get('message', {})
-                                role = message.get('role')
-                                task_id = msg_data.get('id', '')
-
-                                # 去重：跳过已存在的任务ID
-                                if task_id in seen_task_ids:
-                                    continue
-
-                                # 从assistant消息中提取工具调用
-                                if role == 'assistant':
-                                    tool_calls = self._extract_tool_calls_from_content(message.get('content', []))
-                                    timestamp = msg_data.get('timestamp', '')
-
-                                    for tool_call in tool_calls:
-                                        task = {
-                                            "id": task_id or f"session_{len(tasks)}",
-                                            "description": tool_call.get('description', '执行任务'),
-                                            "status": "completed",
-                                            "created_at": timestamp,  # 统一使用created_at
-                                            "start_time": timestamp,
-                                            "end_time": timestamp,
-                                            "function": tool_call.get('name', 'unknown'),
-                                            "duration": 0,
-                                            "task_type": "tool_call"
-                                        }
-                                        tasks.append(task)
-                                        seen_task_ids.add(task['id'])
-
-                                # 从toolResult消息中提取状态
-                                elif role == 'toolResult':
-                                    tool_name = message.get('toolName', 'unknown')
-                                    details = message.get('details', {})
-                                    timestamp = msg_data.get('timestamp', '')
-
-                                    # 计算持续时间（如果有）
-                                    duration = details.get('durationMs', 0) / 1000 if details.get('durationMs') else 0
-
-                                    task = {
-                                        "id": task_id or f"session_{len(tasks)}",
-                                        "description": f"{tool_name} - {details.get('name', tool_name)}",
-                                        "status": "completed" if details.get('status') == 'completed' else "failed",
-                                        "created_at": timestamp,  # 统一使用created_at
-                                        "start_time": timestamp,
-                                        "end_time": timestamp,
-                                        "function": tool_name,
-                                        "duration": duration,
-                                        "task_type": "tool_call"
-                                    }
-                                    tasks.append(task)
-                                    seen_task_ids.add(task['id'])
-
-                            except json.JSONDecodeError:
-                                continue
-
-                except Exception as e:
-                    print(f"Error reading {jsonl_file}: {e}")
-                    continue
-
-            # 不再保存工具任务到文件（避免覆盖用户任务）
-            # if save_to_file and tasks:
-            #     self._save_tasks_to_file(tasks)
+                # 直接返回用户任务（已按时间筛选并排序），不包含工具调用
+                print(f"✅ 仅返回用户任务 {len(user_tasks)} 个（不包含工具调用）")
+                return user_tasks
+
+            # 工具调用由入库服务写入 task_records（task_type=tool_call），同样只读取时间范围内最近的
+            # max_tasks_display 条，按ID去重
+            start, end = self._resolve_range(time_filter)
+            tool_calls = self.store.page('task_records', limit=self.max_tasks, start=start, end=end,
+                                         task_type='tool_call')[0]
+            seen_task_ids = {task.get('id') for task in user_tasks}
+            tasks = user_tasks + [t for t in tool_calls if t.get('id') not in seen_task_ids]
 
             # 使用统一的过滤、排序和限制方法
             return self._filter_and_sort_tasks(tasks, time_filter)
 
         except Exception as e:
-            print(f"Error fetching tasks from history: {e}")
-            return self._filter_and_sort_tasks(user_tasks, time_filter)  # 降级返回用户任务
-
-    def _extract_tool_calls_from_content(self, content):
-        """从消息内容中提取工具调用"""
-        tool_calls = []
-
-        if not isinstance(content, list):
-            return tool_calls
-
-        for item in content:
-            if isinstance(item, dict) and item.get('type') == 'toolCall':
-                func_name = item.get('name', 'unknown')
-                arguments = item.get('arguments', {})
-
-                # 生成描述
-                description = f"调用 {func_name}"
-                if isinstance(arguments, dict):
-                    # 提取关键参数
-                    if 'command' in arguments:
-                        description = f"执行: {arguments['command'][:50]}"
-                    elif 'path' in arguments:
-                        description = f"读取: {arguments['path']}"
-                    elif 'url' in arguments:
-                        description = f"访问: {arguments['url']}"
-                    elif 'message' in arguments:
-                        description = f"发送: {arguments['message'][:30]}"
-
-                tool_calls.append({
-                    'name': func_name,
-                    'description': description
-                })
-
-        return tool_calls
-
-    def _load_cached_tasks(self, time_filter):
-        """加载缓存的任务数据"""
-        tasks_file = self.data_dir / 'tasks.json'
-        if tasks_file.exists():
-            with open(tasks_file, 'r') as f:
-                all_tasks = json.load(f)
-            filtered_tasks = self._filter_by_time(all_tasks, time_filter)
-            # 按时间倒序排列（最近的在前）
-            filtered_tasks.sort(key=lambda x: x.get('start_time', ''), reverse=True)
-            return filtered_tasks[-50:]
-        return []
+            print(f"Error fetching tasks from store: {e}")
+            return user_tasks  # 降级返回用户任务
 
     def get_interactions(self, time_filter='today'):
-        """从会话历史获取互动记录"""
+        """获取互动记录（入库服务写入存储，按时间倒序取最近的记录）"""
         try:
-            # 直接读取会话文件
-            sessions_dir = Path.home() / '.openclaw' / 'agents' / 'main' / 'sessions'
-            session_files = list(sessions_dir.glob('*.jsonl'))
-
-            if not session_files:
-                return self._load_cached_interactions(time_filter)
-
-            # 找到最新的会话文件
-            latest_file = max(session_files, key=lambda p: p.stat().st_mtime)
-
-            # 读取并解析会话数据
-            interactions = self._parse_session_file(latest_file)
-
-            # 时间筛选
-            filtered = self._filter_by_time(interactions, time_filter)
-            # 按时间倒序排列（最近的在前）
-            filtered.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            return filtered[-20:]
-
-        except Exception as e:
-            print(f"Error fetching interactions from history: {e}")
             return self._load_cached_interactions(time_filter)
+        except Exception as e:
+            print(f"Error fetching interactions: {e}")
+            return []
 
-    def _parse_session_file(self, session_file):
-        """解析会话.jsonl文件"""
-        interactions = []
-        current_user_msg = None
-
-        try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        data = json.loads(line)
-
-                        # 只处理消息类型的记录
-                        if data.get('type') != 'message':
-                            continue
-
-                        msg = data.get('message', {})
-                        role = msg.get('role', '')
-
-                        if role == 'user':
-                            current_user_msg = data
-
-                        elif role == 'assistant' and current_user_msg:
-                            # 提取用户消息内容
-                            user_content = current_user_msg.get('message', {})
-                            user_text = self._extract_text_from_content(user_content.get('content', []))
-
-                            # 提取AI回复内容
-                            assistant_content = msg.get('content', [])
-                            bot_text = self._extract_text_from_content(assistant_content)
-
-                            # 创建互动记录（使用关键词云）
-                            if user_text:
-                                # 提取关键词，不存储原始消息
-                                keywords = self.keyword_extractor.extract_from_interaction(
-                                    user_text,
-                                    bot_text,
-                                    max_keywords=3
-                                )
-
-                                interaction = {
-                                    "timestamp": current_user_msg.get('timestamp', datetime.now().isoformat()),
-                                    "keywords": keywords,  # 只存储关键词
-                                    "session_type": "telegram"
-                                }
-                                interactions.append(interaction)
-
-                                # 创建任务记录
-                                self._create_task_from_interaction(current_user_msg, data)
-
-                            current_user_msg = None
+    def page_tasks(self, before=None, limit=None, start=None, end=None):
+        """用户任务分页（按创建时间倒序，可限定 [start, end) 毫秒区间），返回 (tasks, next_cursor)
 
-                    except json.JSONDecodeError:
-                        continue
+        Raises:
+            ValueError: limit 不是 1 到 max_tasks_display 之间的整数
+        """
+        limit = self._page_limit(limit, self.max_tasks)
+        return self.store.page('user_tasks', before, limit, start=start, end=end)
 
-        except Exception as e:
-            print(f"Error parsing session file: {e}")
+    def page_interactions(self, before=None, limit=None, start=None, end=None):
+        """互动分页（按时间倒序，可限定 [start, end) 毫秒区间），返回 (interactions, next_cursor)
 
-        return interactions
+        Raises:
+            ValueError: limit 不是 1 到 max_interactions_display 之间的整数
+        """
+        limit = self._page_limit(limit, self.max_interactions)
+        return self.store.page('interactions', before, limit, start=start, end=end)
 
-    def _extract_text_from_content(self, content):
-        """从content数组中提取纯文本"""
-        if isinstance(content, str):
-            return content
+    def _resolve_range(self, time_filter):
+        """时间筛选条件 → (start_ms, end_ms)"""
+        return filter_range(time_filter, self.tz)
 
-        if isinstance(content, list):
-            text_parts = []
-            for item in content:
-                if isinstance(item, dict):
-                    item_type = item.get('type', '')
-                    if item_type == 'text':
-                        text = item.get('text', '')
-                        if text and not text.startswith('['):  # 过滤掉 thinking
-                            text_parts.append(text)
-            return ' '.join(text_parts)
+    def _page_limit(self, limit, maximum):
+        """分页条数：默认为配置的上限；超过上限或不合法时报错，不静默截断
 
-        return ''
+        Raises:
+            ValueError: limit 不是 1 到 maximum 之间的整数
+        """
+        if limit is None:
+            return maximum
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = 0
+        if not 1 <= limit <= maximum:
+            raise ValueError(f"limit 必须是 1 到 {maximum} 之间的整数（上限由 config.json 的 data 部分配置）")
+        return limit
 
     def _load_cached_interactions(self, time_filter):
-        """加载缓存的互动数据"""
-        interactions_file = self.data_dir / 'interactions.json'
-        if interactions_file.exists():
-            with open(interactions_file, 'r') as f:
-                all_interactions = json.load(f)
-            filtered = self._filter_by_time(all_interactions, time_filter)
-            # 按时间倒序排列（最近的在前）
-            filtered.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            return filtered[-20:]
-        return []
+        """加载缓存的互动数据（按时间倒序，最近的在前）"""
+        start, end = self._resolve_range(time_filter)
+        return self.store.page('interactions', limit=self.max_interactions, start=start, end=end)[0]
 
     def _filter_and_sort_tasks(self, tasks, time_filter):
-        """过滤、排序和限制任务数量"""
-        # 时间筛选
-        filtered_tasks = self._filter_by_time(tasks, time_filter)
-        # 按created_at时间倒序排列（最近的在前）
-        filtered_tasks.sort(key=lambda x: x.get('created_at', x.get('start_time', '')), reverse=True)
-        # 只返回最近50条
-        return filtered_tasks[:50]
-
-    def _filter_by_time(self, items, time_filter):
-        """根据时间筛选"""
-        from datetime import timezone
-
-        now = datetime.now(timezone.utc)  # 使用UTC时间
-
-        if time_filter == 'today':
-            start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == 'week':
-            start = now - timedelta(days=now.weekday())
-            start = start.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_filter == 'month':
-            start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        else:  # all
-            return items
-
-        filtered = []
-        for item in items:
-            try:
-                # 支持多个时间字段
-                timestamp = (item.get('timestamp') or
-                            item.get('start_time') or
-                            item.get('created_at') or
-                            '')
-
-                if not timestamp:
-                    # 如果没有时间戳，跳过
-                    continue
-
-                # 处理时间戳
-                if isinstance(timestamp, (int, float)):
-                    # Unix时间戳（毫秒）
-                    item_time = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
-                else:
-                    # ISO格式字符串
-                    timestamp_str = timestamp.replace('Z', '+00:00')
-                    item_time = datetime.fromisoformat(timestamp_str)
-
-                    # 如果没有时区信息，假设是本地时间
-                    if item_time.tzinfo is None:
-                        # 不添加时区，直接比较
-                        pass
-
-                # 比较时忽略时区差异
-                if item_time.replace(tzinfo=None) >= start.replace(tzinfo=None):
-                    filtered.append(item)
-            except Exception as e:
-                # 忽略过滤错误，保留该item
-                filtered.append(item)
-                continue
-        return filtered
+        """过滤、排序和限制任务数量（用于合并了工具调用的任务列表）"""
+        time_range = self._resolve_range(time_filter)
+        keyed = [(created_ts(t), t) for t in tasks]
+        filtered = [(ts, t) for ts, t in keyed if in_range(ts or None, time_range)]
+        # 按创建时间倒序排列（最近的在前），只返回最近 max_tasks_display 条
+        filtered.sort(key=lambda pair: pair[0], reverse=True)
+        return [t for _, t in filtered[:self.max_tasks]]
 
     def get_stats(self, time_filter='today'):
-        """获取统计数据"""
-        tasks = self.get_tasks(time_filter)
-        interactions = self.get_interactions(time_filter)
+        """获取统计数据
 
-        completed = sum(1 for t in tasks if t.get('status') == 'completed')
-        failed = sum(1 for t in tasks if t.get('status') == 'failed')
-        running = sum(1 for t in tasks if t.get('status') == 'running')
-
-        # 计算平均响应时间
-        response_times = [t.get('duration', 0) for t in tasks if t.get('duration')]
-        avg_time = sum(response_times) / len(response_times) if response_times else 0
-
-        # 统计创建的文件
-        files_created = len([t for t in tasks if 'file' in t.get('description', '').lower() or 'write' in t.get('function', '').lower()])
-
-        return {
-            "completed": completed,
-            "failed": failed,
-            "running": running,
-            "paused": 0,
-            "interactions": len(interactions),
-            "files_created": files_created,
-            "avg_response_time": round(avg_time, 1)
-        }
+        任务统计对每日汇总行求和（区间由整天组成时，如 today/week/month/all），
+        不读取任务列表；区间不是整天时只读取该区间内的任务计算。
+        """
+        time_range = self._resolve_range(time_filter)
+        span = day_span(time_range, self.tz)
+        if span is not None:
+            stats = summarize(self.store.rollups('user_tasks', *span))
+        else:
+            tasks = self.store.range('user_tasks', *time_range)
+            stats = summarize(build_rollups(((created_ts(t), t) for t in tasks), self.tz).values())
+        stats['interactions'] = self._count_interactions(time_range)
+        return stats
+
+    def _count_interactions(self, time_range):
+        """时间范围内的互动数（整天的区间对每日汇总求和，否则只读取该区间）"""
+        span = day_span(time_range, self.tz)
+        if span is not None:
+            return sum(row['total'] for row in self.store.rollups('interactions', *span))
+        return len(self.store.range('interactions', *time_range))
 
     def get_reflection(self):
         """获取AI反思（从动态生成的文件读取）"""
@@ -653,134 +515,6 @@ class DataCollector:
             "tomorrow": ["请等待明日计划生成"]
         }
 
-    def _create_task_from_interaction(self, user_msg, assistant_msg):
-        """从互动中创建任务记录"""
-        try:
-            # 提取任务描述
-            user_content = user_msg.get('content', '')
-            if not user_content or not isinstance(user_content, str):
-                return
-
-            task_description = self._extract_task_description(user_content)
-
-            # 计算执行时间
-            user_time = user_msg.get('timestamp')
-            assistant_time = assistant_msg.get('timestamp')
-
-            if user_time and assistant_time:
-                try:
-                    start = datetime.fromisoformat(user_time.replace('Z', '+00:00'))
-                    end = datetime.fromisoformat(assistant_time.replace('Z', '+00:00'))
-                    duration = round((end - start).total_seconds(), 2)
-                except:
-                    duration = 0
-            else:
-                duration = 0
-
-            # 检查是否是简单的确认消息（不需要创建任务）
-            bot_response = assistant_msg.get('content', '')
-            if self._is_simple_acknowledgment(bot_response):
-                return
-
-            # 创建任务记录
-            task = {
-                "id": f"task_{int(datetime.now().timestamp() * 1000)}",
-                "description": task_description,
-                "status": "completed",
-                "start_time": user_time or datetime.now().isoformat(),
-                "end_time": assistant_time or datetime.now().isoformat(),
-                "duration": duration,
-                "function": "user_task",
-                "module": "interaction",
-                "result": "success"
-            }
-
-            # 保存任务
-            self._save_task_record(task)
-
-        except Exception as e:
-            print(f"Error creating task from interaction: {e}")
-
-    def _extract_task_description(self, user_message):
-        """智能提取任务描述"""
-        # 去除常见前缀
-        prefixes_to_remove = [
-            '帮我', '请', '麻烦', '能否', '可以',
-            'help me', 'please', 'can you', 'could you'
-        ]
-
-        desc = user_message.strip()
-
-        # 去除前缀
-        for prefix in prefixes_to_remove:
-            if desc.lower().startswith(prefix.lower()):
-                desc = desc[len(prefix):].strip()
-                break
-
-        # 去除标点符号
-        desc = desc.lstrip('，,。.!！')
-
-        # 限制长度
-        if len(desc) > 50:
-            desc = desc[:47] + '...'
-
-        return desc if desc else '执行任务'
-
-    def _is_simple_acknowledgment(self, bot_response):
-        """判断是否是简单的确认消息"""
-        if not bot_response or not isinstance(bot_response, str):
-            return False
-
-        # 简单确认的模式
-        simple_patterns = [
-            '好的', '收到', '明白', 'ok', 'ok的', '知道了',
-            'sure', 'got it', 'understood'
-        ]
-
-        response_lower = bot_response.lower().strip()
-
-        # 如果回复非常短（<10字）且是确认语句
-        if len(bot_response) < 10:
-            for pattern in simple_patterns:
-                if pattern in response_lower:
-                    return True
-
-        return False
-
-    def _save_task_record(self, task):
-        """保存任务记录到文件"""
-        tasks_file = self.data_dir / 'tasks.json'
-
-        try:
-            # 读取现有任务
-            if tasks_file.exists():
-                with open(tasks_file, 'r', encoding='utf-8') as f:
-                    tasks = json.load(f)
-            else:
-                tasks = []
-
-            # 检查是否已存在相同ID的任务
-            existing_index = next(
-                (i for i, t in enumerate(tasks) if t.get('id') == task['id']),
-                None
-            )
-
-            if existing_index is not None:
-                tasks[existing_index] = task
-            else:
-                tasks.append(task)
-
-            # 保持最近100条记录
-            if len(tasks) > 100:
-                tasks = tasks[-100:]
-
-            # 保存
-            with open(tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(tasks, f, indent=2, ensure_ascii=False)
-
-        except Exception as e:
-            print(f"Error saving task record: {e}")
-
     def get_task_timeout(self, description):
         """根据任务描述获取超时时间（秒）"""
         desc_lower = description.lower()
@@ -811,164 +545,55 @@ class DataCollector:
     def check_stale_tasks(self):
         """检测僵尸任务，根据任务类型使用不同的超时时间"""
         try:
-            user_tasks_file = self.data_dir / 'user_tasks.json'
-
-            if not user_tasks_file.exists():
-                return
-
-            with open(user_tasks_file, 'r', encoding='utf-8') as f:
-                tasks = json.load(f)
-
             now = datetime.now()
+            now_ms = to_epoch_ms(now.isoformat())
             has_stale = False
 
-            for task in tasks:
-                if task.get('status') == 'running':
-                    start_time = task.get('start_time')
-                    if start_time:
-                        try:
-                            start = datetime.fromisoformat(start_time)
-                            # 获取该任务的超时时间
-                            timeout = self.get_task_timeout(task.get('description', ''))
-
-                            if (now - start).total_seconds() > timeout:
-                                task['status'] = 'failed'
-                                task['end_time'] = now.isoformat()
-                                timeout_minutes = timeout // 60
-                                task['result'] = f'任务超时（{timeout_minutes}分钟未响应）'
-                                task['duration'] = round((now - start).total_seconds(), 2)
-                                has_stale = True
-                                print(f"⚠️  检测到僵尸任务: {task['id']} - {task.get('description', '')[:30]}")
-                        except:
-                            pass
+            def expire(task):
+                # 在存储的原子更新内再次确认状态，避免覆盖并发的状态更新
+                if task.get('status') != 'running':
+                    return False
+                # 没有开始时间时按创建时间计算（会话任务的时间戳带时区，统一换算为 epoch 毫秒再比较）
+                start_ms = to_epoch_ms(task.get('start_time') or task.get('created_at'))
+                if start_ms is None:
+                    return False
+                elapsed = (now_ms - start_ms) / 1000
+
+                # 获取该任务的超时时间
+                timeout = self.get_task_timeout(task.get('description', ''))
+                if elapsed <= timeout:
+                    return False
+
+                task['status'] = 'failed'
+                task['end_time'] = now.isoformat()
+                timeout_minutes = timeout // 60
+                task['result'] = f'任务超时（{timeout_minutes}分钟未响应）'
+                task['duration'] = round(elapsed, 2)
+                return True
+
+            for task in self.store.list('user_tasks', status='running'):
+                try:
+                    if self.store.update('user_tasks', task['id'], expire) is not None:
+                        has_stale = True
+                        print(f"⚠️  检测到僵尸任务: {task['id']} - {task.get('description', '')[:30]}")
+                except Exception:
+                    pass
 
             if has_stale:
-                with open(user_tasks_file, 'w', encoding='utf-8') as f:
-                    json.dump(tasks, f, indent=2, ensure_ascii=False)
+                self._notify_change()
                 print(f"✅ 已清理僵尸任务")
 
         except Exception as e:
             print(f"❌ 检查僵尸任务失败: {e}")
 
-    def _save_user_task(self, task):
-        """保存用户任务到独立文件（带文件锁）"""
-        user_tasks_file = self.data_dir / 'user_tasks.json'
-
-        try:
-            import fcntl
-
-            # 读取现有用户任务（带锁）
-            if user_tasks_file.exists():
-                with open(user_tasks_file, 'r', encoding='utf-8') as f:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH)  # 共享锁（读）
-                    try:
-                        tasks = json.load(f)
-                    finally:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # 释放锁
-            else:
-                tasks = []
-
-            # 添加新任务到开头
-            tasks.insert(0, task)
-
-            # 保持最近100条记录
-            if len(tasks) > 100:
-                tasks = tasks[:100]
-
-            # 保存（带排他锁）
-            with open(user_tasks_file, 'w', encoding='utf-8') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # 排他锁（写）
-                try:
-                    json.dump(tasks, f, indent=2, ensure_ascii=False)
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # 释放锁
-
-        except Exception as e:
-            print(f"Error saving user task: {e}")
-
-    def _save_tasks_to_file(self, new_tasks):
-        """批量保存任务到文件，避免重复
-
-        Args:
-            new_tasks: 从会话历史中提取的新任务列表（仅工具任务）
-        """
-        tasks_file = self.data_dir / 'tasks.json'
-
-        try:
-            # 读取现有任务
-            if tasks_file.exists():
-                with open(tasks_file, 'r', encoding='utf-8') as f:
-                    existing_tasks = json.load(f)
-            else:
-                existing_tasks = []
-
-            # 分离用户任务和工具任务
-            user_tasks = [t for t in existing_tasks if t.get('task_type') == 'user_task']
-            tool_tasks = [t for t in existing_tasks if t.get('task_type') != 'user_task']
-
-            # 创建现有工具任务的ID集合
-            existing_tool_ids = {t.get('id') for t in tool_tasks}
-
-            # 只添加不存在的工具任务
-            added_count = 0
-            for task in new_tasks:
-                task_id = task.get('id')
-                if task_id and task_id not in existing_tool_ids:
-                    tool_tasks.append(task)
-                    existing_tool_ids.add(task_id)
-                    added_count += 1
-                elif task_id in existing_tool_ids:
-                    # 更新已存在的任务
-                    for i, existing_task in enumerate(tool_tasks):
-                        if existing_task.get('id') == task_id:
-                            tool_tasks[i] = task
-                            break
-
-            # 合并用户任务和工具任务（用户任务在前）
-            all_tasks = user_tasks + tool_tasks
-
-            # 保持最近100条记录，但优先保留用户任务
-            if len(all_tasks) > 100:
-                # 优先保留所有用户任务
-                user_count = len(user_tasks)
-                tool_keep = 100 - user_count
-                if tool_keep > 0:
-                    all_tasks = user_tasks + tool_tasks[-tool_keep:]
-                else:
-                    all_tasks = user_tasks[:100]
-
-            # 保存
-            with open(tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(all_tasks, f, indent=2, ensure_ascii=False)
-
-            if added_count > 0:
-                print(f"✅ 已保存 {added_count} 个新工具任务到文件")
-
-        except Exception as e:
-            print(f"Error saving tasks to file: {e}")
-
     def _get_user_tasks(self, time_filter='today'):
-        """从独立的用户任务文件中读取"""
+        """从存储中读取时间范围内最近的 max_tasks_display 个用户任务（按创建时间倒序）"""
         try:
-            # 使用独立的用户任务文件
-            user_tasks_file = self.data_dir / 'user_tasks.json'
-
-            if not user_tasks_file.exists():
-                return []
-
-            with open(user_tasks_file, 'r', encoding='utf-8') as f:
-                user_tasks = json.load(f)
-
-            if not user_tasks:
-                return []
-
-            # 时间筛选
-            filtered_tasks = self._filter_by_time(user_tasks, time_filter)
-
-            # 按时间倒序排列（最近的在前），使用 created_at 字段
-            filtered_tasks.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+            # 存储按入库时计算的 epoch 毫秒在有序索引上定位，只读取 limit 条，不反序列化整个区间
+            start, end = self._resolve_range(time_filter)
+            filtered_tasks = self.store.page('user_tasks', limit=self.max_tasks, start=start, end=end)[0]
 
-            print(f"✅ 从独立文件读取了 {len(filtered_tasks)} 个用户任务")
+            print(f"✅ 从存储读取了 {len(filtered_tasks)} 个用户任务")
             return filtered_tasks
 
         except Exception as e:
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+入库服务 - 唯一解析会话文件、写入存储的地方
+
+监听 ~/.openclaw/agents/*/sessions 下的 .jsonl（inotify，不可用时轮询），每个文件只读取新追加的行，
+每行只解析一次（见 session_parser.py），派生的互动、互动任务、用户任务及其状态、工具调用、token 用量
+按批写入存储；之后清理僵尸任务。服务器和 Dashboard 只读取存储。
+
+可以在服务器进程内作为后台线程运行，也可以单独运行（scripts/task_listener.py）。
+两者同时运行时通过 data/ingest.lock 文件锁保证只有一个实例在入库，另一个待命，前者退出后接替。
+"""
+import threading
+import time
+
+from checkpoints import CheckpointStore
+from processed_index import ProcessedIndex
+from rollups import day_of
+from session_parser import Derived, SessionParser
+from session_tailer import SessionTailer
+from session_watcher import SessionWatcher
+from summarizer import TaskSummarizer
+from timeutil import to_epoch_ms
+
+# 累计的派生记录超过该数量时先写入一批（启动时补读大量历史的情况）
+BATCH_SIZE = 5000
+
+# token 用量保存在 meta 的该键下：{"total": int, "days": {"YYYY-MM-DD": int}, "recent": [最近一批计入的消息ID]}
+TOKEN_USAGE_KEY = 'token_usage'
+
+
+class SessionIngestor:
+    def __init__(self, collector, interval=5, watcher=None, summarize=True, name='ingestor'):
+        """
+        Args:
+            collector: 共享的 DataCollector 实例（使用其存储和僵尸任务清理）
+            interval: 轮询模式的检查间隔，以及清理僵尸任务的间隔（秒）
+            watcher: SessionWatcher，默认监听 ~/.openclaw/agents
+            summarize: 是否在后台请求 LLM 总结新用户任务的描述
+            name: 检查点和已处理消息索引的名称（data/checkpoints/<name>.*）
+        """
+        self.collector = collector
+        self.store = collector.store
+        self.interval = interval
+        self.watcher = watcher or SessionWatcher(interval=interval)
+        self.name = name
+        # 读取进度、已处理消息索引和解析状态在取得文件锁后从磁盘加载（见 _load_state），
+        # 待命的实例接替时读取的是前一个实例最后写入的进度，而不是自己启动时的
+        self.checkpoints = None
+        self.tailer = None
+        self.processed = None
+        # 会话文件 -> SessionParser
+        self.parsers = {}
+        self.summarizer = TaskSummarizer(collector.data_dir) if summarize else None
+        self.lock_path = collector.data_dir / 'ingest.lock'
+        self._lock_file = None
+        # 是否持有入库文件锁（没有 fcntl 的平台上直接视为持有）
+        self._held = False
+        # 启动时补读完成后才为新任务请求 LLM 总结（历史消息保留规则总结）
+        self.live = False
+        self.written = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.serve, name='session-ingestor', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- 单实例 ----
+
+    def acquire(self):
+        """获取入库文件锁（非阻塞），返回是否成功"""
+        if self._held:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            lock_file = open(self.lock_path, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        self._held = True
+        self._load_state()
+        return True
+
+    def release(self):
+        """写入进度后释放文件锁"""
+        if not self._held:
+            return
+        self.flush(force=True)
+        self._held = False
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _load_state(self):
+        """加载读取检查点、已处理消息索引（每次取得文件锁时重新加载）"""
+        data_dir = self.collector.data_dir
+        self.checkpoints = CheckpointStore(self.name, data_dir)
+        self.tailer = SessionTailer(self.checkpoints)
+        # 已计入 token 用量的消息ID（重放时不重复累计）
+        self.processed = ProcessedIndex(self.name, data_dir)
+        self.parsers = {}
+
+    # ---- 入库 ----
+
+    def run_once(self, session_files=None):
+        """读取会话文件新追加的记录，解析后批量写入存储
+
+        Args:
+            session_files: 有变化的会话文件，默认全部
+
+        Returns:
+            写入的记录数
+        """
+        full_scan = session_files is None
+        if full_scan:
+            session_files = self.watcher.session_files()
+
+        written = 0
+        derived = Derived()
+        # 本批读取到的位置：会话文件 -> (offset, 最后的消息ID, 解析状态)，写入成功后才记录为检查点
+        progress = {}
+        for session_file in session_files:
+            try:
+                self._read(session_file, derived, progress)
+            except Exception as e:
+                print(f"❌ 读取文件失败 {session_file}: {e}")
+            if len(derived) >= BATCH_SIZE:
+                written += self._commit(derived, progress)
+                derived = Derived()
+                progress = {}
+        written += self._commit(derived, progress)
+
+        if full_scan:
+            self.checkpoints.forget_missing(session_files)
+            self.tailer.forget_missing(session_files)
+            keep = {str(p) for p in session_files}
+            for key in list(self.parsers):
+                if key not in keep:
+                    del self.parsers[key]
+        self.flush()
+        self.written += written
+        return written
+
+    def _read(self, session_file, derived, progress):
+        """读取一个文件新追加的记录，解析结果追加到 derived，读取到的位置记录在 progress"""
+        key = str(session_file)
+        parser = self.parsers.get(key)
+        if parser is None:
+            # 从检查点继续时恢复跨读取的配对状态
+            checkpoint = self.checkpoints.get(session_file)
+            parser = SessionParser(checkpoint.get('state') if checkpoint else None)
+            self.parsers[key] = parser
+
+        records, reset = self.tailer.read_new(session_file)
+        if reset:
+            parser = self.parsers[key] = SessionParser()
+        if records:
+            parser.feed(records, derived)
+            last_id = next((r['id'] for r in reversed(records) if isinstance(r, dict) and r.get('id')), None)
+            progress[key] = (self.tailer.offset(session_file), last_id, parser.state())
+
+    def _commit(self, derived, progress):
+        """写入一批派生记录，成功后再推进这批文件的检查点
+
+        写入失败时回退这批文件的读取位置和解析状态，下次从上次的检查点重新读取，异常继续抛出。
+        """
+        try:
+            written = self.write(derived)
+        except Exception:
+            for key in progress:
+                self.tailer.rewind(key)
+                self.parsers.pop(key, None)
+            raise
+        for key, (offset, last_id, state) in progress.items():
+            self.checkpoints.set(key, offset, last_id, state=state)
+        return written
+
+    def write(self, derived):
+        """把一批派生记录写入存储，返回写入的记录数（按ID合并，重复写入结果相同）"""
+        store = self.store
+        written = 0
+
+        # 用户任务：存储中没有时创建（重建索引到新库时全部恢复），已存在的任务不覆盖（保留状态和 LLM 总结）
+        status = dict(derived.status)
+        created = []
+        # 缓存中没有 LLM 总结的新任务（上线后在后台请求）
+        uncached = []
+        seen = set()
+        for _, task in derived.user_tasks:
+            if task['id'] in seen:
+                continue
+            seen.add(task['id'])
+            if store.get('user_tasks', task['id']) is not None:
+                continue
+            changes = status.pop(task['id'], None)
+            if changes:
+                task.update(changes)
+            if self.summarizer is not None:
+                # 同样的消息总结过时直接使用缓存，不再请求 LLM
+                cached = self.summarizer.cached(task['user_message'])
+                if cached:
+                    task['description'] = cached
+                else:
+                    uncached.append(task)
+            created.append(task)
+        if created:
+            store.upsert('user_tasks', created)
+            if self.live:
+                for task in created:
+                    print(f"✅ 创建任务: {task['description']}")
+        if status:
+            store.batch('user_tasks', [("update", task_id, changes) for task_id, changes in status.items()])
+        written += len(created) + len(status)
+
+        # 互动、互动任务、工具调用按ID覆盖写入，重复入库结果相同
+        if derived.interactions:
+            store.upsert('interactions', derived.interactions)
+        task_records = derived.interaction_tasks + derived.tool_calls
+        if task_records:
+            store.upsert('task_records', task_records)
+        written += len(derived.interactions) + len(task_records)
+
+        if derived.usage:
+            written += self._add_usage(derived.usage)
+
+        if self.live:
+            for task in uncached:
+                self.summarizer.submit(task['user_message'], self._patch_description(task['id']))
+        if written:
+            self.collector._notify_change()
+        return written
+
+    def _add_usage(self, usage):
+        """累计 token 用量（按 data.timezone 的日期），返回新计入的条数
+
+        这一批计入的消息ID和用量在同一次写入中保存（recent），返回前已处理索引立即写盘：
+        写入后任何时刻被强制结束，重读的记录要么在索引中，要么在 recent 中，不会重复累计。
+        """
+        tz = self.collector.tz
+        totals = self.store.get_meta(TOKEN_USAGE_KEY) or {"total": 0, "days": {}}
+        recent = set(totals.get('recent', ()))
+        counted = set()
+        for msg_id, timestamp, tokens in usage:
+            if msg_id in self.processed or msg_id in recent or msg_id in counted:
+                continue
+            counted.add(msg_id)
+            day = day_of(to_epoch_ms(timestamp) or 0, tz)
+            totals['total'] += tokens
+            if day:
+                totals['days'][day] = totals['days'].get(day, 0) + tokens
+        if counted:
+            totals['recent'] = sorted(counted)
+            self.store.set_meta(TOKEN_USAGE_KEY, totals)
+            # 写入成功后才记入已处理索引，并且不等写盘间隔
+            for msg_id in counted:
+                self.processed.add(msg_id)
+            self.processed.flush(force=True)
+        return len(counted)
+
+    def _patch_description(self, task_id):
+        def patch(description):
+            # 在总结线程中调用，只修改描述，不影响状态
+            if self.store.update('user_tasks', task_id, {'description': description}) is not None:
+                print(f"📝 更新任务描述: {description}")
+                self.collector._notify_change()
+        return patch
+
+    def flush(self, force=False):
+        """写入已处理消息索引、读取检查点和总结缓存
+
+        计入用量的消息ID在 _add_usage 中已经写盘，检查点按间隔写入：崩溃后从较早的检查点重放，
+        重放的记录按ID合并，用量不会重复累计。
+        没有持有文件锁时不写入进度（待命中的实例）。
+        """
+        if self._held:
+            self.processed.flush(force)
+            self.checkpoints.flush(force)
+        if self.summarizer is not None:
+            self.summarizer.flush(force)
+
+    # ---- 运行 ----
+
+    def serve(self):
+        """入库循环：等待文件锁 → 补读上次退出后追加的内容 → 按文件变化入库，定期清理僵尸任务"""
+        waiting = False
+        while not self.acquire():
+            if not waiting:
+                print(f"⏸️  另一个入库实例正在运行（{self.lock_path}），待命中")
+                waiting = True
+            if self._stop.wait(self.interval):
+                return
+
+        try:
+            started = time.monotonic()
+            # 写入失败后重新检查全部文件（失败的文件之后不一定还有变化，不会再收到通知）
+            retry = False
+            try:
+                written = self.run_once()
+                self.collector.check_stale_tasks()
+            except Exception as e:
+                written = 0
+                retry = True
+                print(f"❌ 入库失败: {e}")
+            self.live = True
+            ready_ms = (time.monotonic() - started) * 1000
+            print(f"⏱️  入库就绪 {ready_ms:.0f} ms（读取 {self.tailer.bytes_read} 字节，写入 {written} 条，"
+                  f"已处理消息 {len(self.processed)} 条）")
+            print(f"👀 监听会话目录（{self.watcher.mode}）: {self.watcher.root}/*/sessions")
+
+            last_check = time.monotonic()
+            while not self._stop.is_set():
+                try:
+                    # inotify 模式下有文件追加时立即返回；轮询模式每 interval 秒返回全部文件
+                    changed = self.watcher.wait(self.interval)
+                    if retry:
+                        retry = False
+                        self.run_once()
+                    elif changed:
+                        self.run_once(changed)
+                    else:
+                        self.flush()
+                    if time.monotonic() - last_check >= self.interval:
+                        self.collector.check_stale_tasks()
+                        last_check = time.monotonic()
+                except Exception as e:
+                    retry = True
+                    print(f"❌ 入库失败: {e}")
+                    self._stop.wait(self.interval)
+        finally:
+            self.release()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+已处理消息索引 - 持久化记录监听器已经处理过的消息ID，启动时毫秒级加载
+
+每个消息ID取 8 字节 blake2b 摘要，保存为有序的 uint64 数组（data/checkpoints/<name>.ids），
+加载时直接 frombytes，查询用二分查找；100万条消息约 8MB。
+新增的ID先在内存中累积，flush 时追加到日志文件 <name>.ids.log，
+日志超过 compact_threshold 条时合并进有序数组（写临时文件后原子替换）。
+64 位摘要在百万级ID下冲突概率约 1e-8，可以视为精确集合。
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+MAGIC = b'PIDX\x00\x00\x00\x01'
+
+
+def id_hash(msg_id):
+    """消息ID的 64 位摘要"""
+    return int.from_bytes(hashlib.blake2b(str(msg_id).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _to_bytes(values):
+    values = array('Q', values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(data):
+    # 忽略末尾写了一半的条目（写入中途崩溃）
+    values = array('Q')
+    values.frombytes(data[:len(data) - len(data) % values.itemsize])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class ProcessedIndex:
+    def __init__(self, name, data_dir=None, flush_interval=2.0, compact_threshold=65536):
+        """
+        Args:
+            name: 使用方名称（入库服务为 ingestor）
+            data_dir: 数据目录，默认项目的 data/
+            flush_interval: 批量写入的最短间隔（秒）
+            compact_threshold: 日志条数超过该值时合并进有序数组
+        """
+        data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / 'data'
+        self.path = data_dir / 'checkpoints' / f'{name}.ids'
+        self.log_path = self.path.with_suffix('.ids.log')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        # 有序数组 + 已写入日志的摘要 + 尚未写盘的摘要
+        self._sorted = array('Q')
+        self._logged = set()
+        self._pending = set()
+        self._last_flush = float('-inf')
+        # 索引文件是否已存在（不存在时使用方需要先建立索引）
+        self.loaded = self._load()
+
+    def _load(self):
+        loaded = False
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if data[:len(MAGIC)] == MAGIC:
+                self._sorted = _from_bytes(data[len(MAGIC):])
+                loaded = True
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self.log_path, 'rb') as f:
+                self._logged = set(_from_bytes(f.read()))
+            loaded = True
+        except FileNotFoundError:
+            pass
+        return loaded
+
+    def __contains__(self, msg_id):
+        if not msg_id:
+            return False
+        h = id_hash(msg_id)
+        with self._lock:
+            if h in self._pending or h in self._logged:
+                return True
+            i = bisect_left(self._sorted, h)
+            return i < len(self._sorted) and self._sorted[i] == h
+
+    def add(self, msg_id):
+        """记录消息已处理（空ID忽略）"""
+        if not msg_id:
+            return
+        h = id_hash(msg_id)
+        with self._lock:
+            self._pending.add(h)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sorted) + len(self._logged) + len(self._pending)
+
+    def merge(self, other):
+        """并入另一个索引中的全部ID（flush 时写盘）"""
+        with other._lock:
+            hashes = set(other._sorted).union(other._logged, other._pending)
+        with self._lock:
+            self._pending |= hashes.difference(self._logged)
+
+    def clear(self):
+        """清空索引并删除索引文件"""
+        with self._lock:
+            for path in (self.path, self.log_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._sorted = array('Q')
+            self._logged = set()
+            self._pending = set()
+            self.loaded = False
+
+    def flush(self, force=False):
+        """把内存中新增的ID追加到日志（距上次写入不足 flush_interval 时跳过，除非 force）
+
+        Returns:
+            是否写入
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_flush < self.flush_interval:
+                return False
+            self._last_flush = time.monotonic()
+            if not self._pending and self.loaded:
+                return False
+
+            with open(self.log_path, 'ab') as f:
+                f.write(_to_bytes(sorted(self._pending)))
+                f.flush()
+                os.fsync(f.fileno())
+            self._logged |= self._pending
+            self._pending = set()
+            self.loaded = True
+
+            if len(self._logged) > self.compact_threshold:
+                self._compact()
+        return True
+
+    def _compact(self):
+        """把日志合并进有序数组（调用方持有锁）"""
+        merged = array('Q', sorted(set(self._sorted).union(self._logged)))
+        tmp_path = self.path.with_suffix('.ids.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_to_bytes(merged))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # 替换后、清空日志前崩溃只会留下重复条目，不影响结果
+        with open(self.log_path, 'wb') as f:
+            os.fsync(f.fileno())
+        self._sorted = merged
+        self._logged = set()
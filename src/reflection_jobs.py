@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+反思任务队列 - 在服务器进程内的后台线程中运行反思生成
+"""
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+class ReflectionJobManager:
+    # 最多保留的历史任务数
+    MAX_JOBS = 20
+
+    def __init__(self, collector):
+        self.collector = collector
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='reflection-worker', daemon=True)
+        self._worker.start()
+
+    def submit(self):
+        """提交一次反思生成，立即返回任务信息
+
+        已有排队或运行中的任务时直接返回该任务，避免重复生成。
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if job['status'] in ('queued', 'running'):
+                    return dict(job)
+
+            job_id = f"reflection_{int(time.time() * 1000)}"
+            job = {
+                "id": job_id,
+                "status": "queued",
+                "step": 0,
+                "total_steps": 0,
+                "current": None,
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None
+            }
+            self.jobs[job_id] = job
+            self._prune()
+
+        self._queue.put(job_id)
+        return dict(job)
+
+    def get(self, job_id):
+        """获取任务进度，不存在返回None"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        """丢弃最早的已结束任务，保持内存有界"""
+        finished = [j for j in self.jobs.values() if j['status'] in ('completed', 'failed')]
+        finished.sort(key=lambda j: j['created_at'])
+        while len(self.jobs) > self.MAX_JOBS and finished:
+            self.jobs.pop(finished.pop(0)['id'], None)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _run(self):
+        """后台工作线程：逐个执行排队的反思任务"""
+        from generate_reflection import ReflectionGenerator
+
+        while True:
+            job_id = self._queue.get()
+            self._update(job_id, status='running', started_at=datetime.now().isoformat())
+
+            def progress(step, total, message):
+                self._update(job_id, step=step, total_steps=total, current=message)
+
+            try:
+                ReflectionGenerator(self.collector).generate(progress=progress)
+                self._update(job_id, status='completed', finished_at=datetime.now().isoformat())
+                print(f"✅ 反思任务完成: {job_id}")
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status='failed', error=str(e),
+                             finished_at=datetime.now().isoformat())
+                print(f"❌ 反思任务失败: {job_id} - {e}")
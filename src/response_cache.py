@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+响应缓存 - 按时间筛选条件缓存 Dashboard 各部分序列化后的 JSON 字节
+
+每个部分记录它依赖的输入的版本，只有输入变化时才重新计算：
+- system: 采样线程的采样次数
+- tasks: 用户任务存储的版本
+- interactions: 互动存储的版本（入库服务写入）
+- stats: tasks 和 interactions 的版本
+- reflection: reflection.json 的修改时间
+所有部分的版本都包含当天日期（today/week/month 的范围随日期变化）。
+完整响应由缓存的片段直接拼接，不再整体序列化。
+
+每个片段内容真正变化时从全局计数器分配新的内容版本号，ETag 由各片段的版本号组成，
+输入变化但重新计算后内容相同时版本号不变，客户端仍然得到 304。
+
+请求可以只选择部分（sections）和字段（fields），未选择的部分不会被计算；
+字段投影的结果同样按内容版本缓存。
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class ResponseCache:
+    SECTIONS = ('system', 'stats', 'tasks', 'interactions', 'reflection')
+    # 不指定 sections 时返回的部分：system 每次采样都会变化（采样时间、运行时长），放进来 ETag 每隔几秒就变，
+    # 条件请求几乎总是 200；系统状态通过实时推送和 /api/system 获取，需要时可以用 ?sections=system 显式请求
+    DEFAULT_SECTIONS = ('stats', 'tasks', 'interactions', 'reflection')
+    # 最多缓存的条目数（自定义时间范围会产生新的键），超出时淘汰最早加入的
+    MAX_ENTRIES = 256
+
+    def __init__(self, collector):
+        """
+        Args:
+            collector: 共享的 DataCollector 实例
+        """
+        self.collector = collector
+        # (section, time_filter) -> (version, data, body, content_version)
+        self._entries = {}
+        # (section, time_filter, fields) -> (基础内容版本, body, content_version)
+        self._projections = {}
+        self._lock = threading.Lock()
+        # 内容版本计数器；启动标识避免重启后与旧 ETag 重复
+        self._content_counter = 0
+        self.boot_id = format(int(time.time() * 1000), 'x')
+        self.hits = {name: 0 for name in self.SECTIONS}
+        self.misses = {name: 0 for name in self.SECTIONS}
+
+    # ---- 依赖版本 ----
+
+    def _day(self):
+        # 时间筛选按 data.timezone 的日期计算，反思按本地日期判断是否是今天
+        return (datetime.now(self.collector.tz).date(), datetime.now().date())
+
+    def _version(self, name, day):
+        collector = self.collector
+        if name == 'system':
+            sampler = collector.sampler
+            if sampler is None or sampler.latest() is None:
+                return None  # 没有后台采样时不缓存
+            return sampler.ticks
+        if name == 'tasks':
+            return (day, collector.store.version('user_tasks'))
+        if name == 'interactions':
+            return (day, collector.store.version('interactions'))
+        if name == 'stats':
+            return (self._version('tasks', day), self._version('interactions', day))
+        if name == 'reflection':
+            try:
+                st = os.stat(collector.data_dir / 'reflection.json')
+                return (day, st.st_ino, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                return (day, None)
+        raise KeyError(name)
+
+    # ---- 计算 ----
+
+    def _build(self, name, time_filter):
+        collector = self.collector
+        if name == 'system':
+            return collector.get_system_status()
+        if name == 'tasks':
+            return collector.get_tasks(time_filter, include_user_tasks=True)
+        if name == 'interactions':
+            return collector.get_interactions(time_filter)
+        if name == 'stats':
+            # 任务统计来自每日汇总，不依赖任务列表
+            return collector.get_stats(time_filter)
+        if name == 'reflection':
+            return collector.get_reflection()
+        raise KeyError(name)
+
+    def _entry(self, name, time_filter):
+        version = self._version(name, self._day())
+        key = (name, time_filter)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and version is not None and entry[0] == version:
+                self.hits[name] += 1
+                return entry
+            self.misses[name] += 1
+
+        data = self._build(name, time_filter)
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[2] == body:
+                content_version = previous[3]
+            else:
+                self._content_counter += 1
+                content_version = self._content_counter
+            entry = (version, data, body, content_version)
+            if version is not None:
+                self._entries[key] = entry
+                self._evict(self._entries)
+        return entry
+
+    def _evict(self, entries):
+        """超出上限时淘汰最早加入的条目（调用方持有 self._lock）"""
+        while len(entries) > self.MAX_ENTRIES:
+            del entries[next(iter(entries))]
+
+    # ---- 对外接口 ----
+
+    def data(self, name, time_filter='today'):
+        """某个部分的数据对象（调用方不要修改）"""
+        return self._entry(name, time_filter)[1]
+
+    def section(self, name, time_filter='today'):
+        """某个部分序列化后的 JSON 字节"""
+        return self._entry(name, time_filter)[2]
+
+    def _projected(self, name, time_filter, fields):
+        """只保留 fields 中字段的片段（列表按元素投影），返回 (body, content_version)"""
+        version, data, body, content_version = self._entry(name, time_filter)
+        if not fields:
+            return body, content_version
+
+        key = (name, time_filter, fields)
+        with self._lock:
+            cached = self._projections.get(key)
+            if cached is not None and cached[0] == content_version:
+                return cached[1], cached[2]
+
+        projected = project(data, fields)
+        projected_body = json.dumps(projected, ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            previous = self._projections.get(key)
+            if previous is not None and previous[1] == projected_body:
+                projected_version = previous[2]
+            else:
+                self._content_counter += 1
+                projected_version = self._content_counter
+            if version is not None:
+                self._projections[key] = (content_version, projected_body, projected_version)
+                self._evict(self._projections)
+        return projected_body, projected_version
+
+    def section_response(self, name, time_filter='today'):
+        """某个部分的 (ETag, JSON 字节)"""
+        entry = self._entry(name, time_filter)
+        return self._etag([entry[3]]), entry[2]
+
+    def dashboard(self, time_filter='today', sections=DEFAULT_SECTIONS):
+        """拼接各部分的缓存片段，返回完整的 JSON 响应字节"""
+        return self.dashboard_response(time_filter, sections)[1]
+
+    def dashboard_response(self, time_filter='today', sections=DEFAULT_SECTIONS, fields=None):
+        """完整响应的 (ETag, JSON 字节, 各部分内容版本号)
+
+        只计算 sections 中列出的部分。
+
+        Args:
+            fields: {section: (字段, ...)}，指定的部分只输出这些字段
+        """
+        fields = fields or {}
+        parts = [(name, self._projected(name, time_filter, fields.get(name))) for name in sections]
+        body = b'{' + b', '.join(b'"' + name.encode('ascii') + b'": ' + part[0]
+                                 for name, part in parts) + b'}'
+        versions = {name: part[1] for name, part in parts}
+        return self._etag(versions.values()), body, versions
+
+    def _etag(self, content_versions):
+        # 内容版本号全局唯一，不同部分 / 投影组合不会得到相同的 ETag
+        return '"' + self.boot_id + '-' + '.'.join(str(v) for v in content_versions) + '"'
+
+    def stats(self):
+        """各部分的命中/未命中次数"""
+        with self._lock:
+            entries = len(self._entries)
+            sections = {name: {"hits": self.hits[name], "misses": self.misses[name]}
+                        for name in self.SECTIONS}
+        total_hits = sum(s['hits'] for s in sections.values())
+        total = total_hits + sum(s['misses'] for s in sections.values())
+        return {
+            "entries": entries,
+            "hit_rate": round(total_hits / total, 3) if total else 0,
+            "sections": sections
+        }
+
+
+def parse_selection(sections=None, fields=None):
+    """解析 ?sections=stats,system&fields=tasks.id,tasks.status
+
+    Returns:
+        (sections, fields)：sections 为按固定顺序排列的部分名称元组，
+        fields 为 {section: (字段, ...)}。只给 fields 时输出 fields 中出现的部分，
+        都不给时输出 DEFAULT_SECTIONS（不含 system）。
+
+    Raises:
+        ValueError: 未知的部分名称或格式错误的字段
+    """
+    field_map = {}
+    for spec in filter(None, (f.strip() for f in (fields or '').split(','))):
+        name, dot, field = spec.partition('.')
+        if not dot or not field:
+            raise ValueError(f"字段格式应为 section.field: {spec}")
+        field_map.setdefault(name, []).append(field)
+
+    if sections:
+        names = {n.strip() for n in sections.split(',') if n.strip()}
+    elif field_map:
+        names = set(field_map)
+    else:
+        names = set(ResponseCache.DEFAULT_SECTIONS)
+
+    unknown = (names | set(field_map)) - set(ResponseCache.SECTIONS)
+    if unknown:
+        raise ValueError(f"未知的部分: {', '.join(sorted(unknown))}")
+
+    ordered = tuple(n for n in ResponseCache.SECTIONS if n in names)
+    return ordered, {name: tuple(sorted(set(f))) for name, f in field_map.items()}
+
+
+def project(data, fields):
+    """按字段投影：字典保留指定键，列表对每个字典元素投影"""
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+    if isinstance(data, dict):
+        return {k: data[k] for k in fields if k in data}
+    return data
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+每日汇总 - 按 (日期, task_type) 累计任务的状态计数、耗时和文件操作数
+
+存储在每次写入任务时同步更新汇总行（写入前后的差值），统计接口对区间内的汇总行求和，
+不再扫描任务列表。日期按 data.timezone（默认服务器本地时区）计算。
+"""
+from datetime import datetime, timedelta
+
+# 汇总行的计数字段
+COUNTERS = ('total', 'completed', 'failed', 'running', 'duration_sum', 'duration_count', 'files_created')
+
+# 维护汇总的集合（interactions 只用到 total，即每日互动数）
+ROLLUP_KINDS = ('user_tasks', 'interactions')
+
+
+def contribution(item):
+    """一条任务对汇总行的贡献"""
+    status = item.get('status')
+    duration = item.get('duration')
+    has_duration = isinstance(duration, (int, float)) and not isinstance(duration, bool) and duration != 0
+    description = item.get('description') or ''
+    function = item.get('function') or ''
+    return {
+        'total': 1,
+        'completed': 1 if status == 'completed' else 0,
+        'failed': 1 if status == 'failed' else 0,
+        'running': 1 if status == 'running' else 0,
+        'duration_sum': float(duration) if has_duration else 0.0,
+        'duration_count': 1 if has_duration else 0,
+        'files_created': 1 if ('file' in description.lower() or 'write' in function.lower()) else 0,
+    }
+
+
+def day_of(ts, tz):
+    """epoch 毫秒 → tz 时区的日期字符串；ts 为0（时间无法解析）时返回空字符串"""
+    if not ts:
+        return ''
+    return datetime.fromtimestamp(ts / 1000, tz).date().isoformat()
+
+
+def row_key(ts, item, tz):
+    """汇总行的键 (日期, task_type)；ts 为记录创建时间的 epoch 毫秒"""
+    return (day_of(ts, tz), item.get('task_type') or '')
+
+
+def add(rows, key, values, sign=1):
+    """把 values 累加（sign=-1 为扣除）到 rows[key]，返回该行"""
+    row = rows.setdefault(key, dict.fromkeys(COUNTERS, 0))
+    for name in COUNTERS:
+        row[name] += sign * values[name]
+    return row
+
+
+def build(pairs, tz):
+    """从 (created_ts, 任务) 序列计算全部汇总行 {(day, task_type): counters}"""
+    rows = {}
+    for ts, item in pairs:
+        add(rows, row_key(ts, item, tz), contribution(item))
+    return rows
+
+
+def select(rows, first_day=None, last_day=None):
+    """取日期在 [first_day, last_day] 内的汇总行（有界时不含时间无法解析的行）"""
+    bounded = first_day is not None or last_day is not None
+    return [dict(row, day=day, task_type=task_type) for (day, task_type), row in rows.items()
+            if not (bounded and day == '')
+            and (first_day is None or day >= first_day)
+            and (last_day is None or day <= last_day)]
+
+
+def day_span(time_range, tz):
+    """区间 [start, end) 是否恰好由整天组成；是则返回 (first_day, last_day)（None 表示不限），否则返回None"""
+    start, end = time_range
+
+    def midnight(ts):
+        dt = datetime.fromtimestamp(ts / 1000, tz)
+        return dt.hour == dt.minute == dt.second == dt.microsecond == 0
+
+    if start is not None and not midnight(start):
+        return None
+    if end is not None and not midnight(end):
+        return None
+    first_day = day_of(start, tz) if start is not None else None
+    last_day = None
+    if end is not None:
+        last_day = (datetime.fromtimestamp(end / 1000, tz).date() - timedelta(days=1)).isoformat()
+    return first_day, last_day
+
+
+def summarize(rows):
+    """汇总行（可迭代的 counters）→ 统计接口的字段"""
+    totals = dict.fromkeys(COUNTERS, 0)
+    for row in rows:
+        for name in COUNTERS:
+            totals[name] += row[name]
+    avg_time = totals['duration_sum'] / totals['duration_count'] if totals['duration_count'] else 0
+    return {
+        "completed": int(totals['completed']),
+        "failed": int(totals['failed']),
+        "running": int(totals['running']),
+        "paused": 0,
+        "files_created": int(totals['files_created']),
+        "avg_response_time": round(avg_time, 1)
+    }
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+会话记录解析 - 一次遍历从会话 JSONL 派生全部数据
+
+每条记录只解析一次，同时得到：
+- interactions: 用户/AI 消息对（只保存关键词）
+- interaction_tasks: 由互动派生的任务记录（task_records，简单确认不派生）
+- user_tasks: 用户消息创建的任务（user_tasks，描述先用规则总结），以及随回复变化的状态
+- tool_calls: 工具调用和工具结果（task_records，task_type=tool_call）
+- usage: AI 回复的 token 用量
+
+只依赖标准库和 keyword_extractor，不访问存储，可以在子进程中运行（见 scripts/reindex.py）。
+"""
+import hashlib
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from summarizer import summarize_task
+from timeutil import to_epoch_ms
+
+# keyword_extractor 在 scripts 目录
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+from keyword_extractor import KeywordExtractor
+
+
+def extract_text(content):
+    """从消息的 content 中提取纯文本
+
+    字符串原样返回；列表中拼接所有 text 项，跳过以 "[[" 开头的 OpenClaw 回复指令（如 [[reply_to_current]]）。
+    以单个 "[" 开头的正文（如 "[urgent] ..."）保留。
+    """
+    if isinstance(content, str):
+        return content
+
+    if isinstance(content, list):
+        text_parts = []
+        for item in content:
+            if isinstance(item, dict) and item.get('type') == 'text':
+                text = item.get('text', '')
+                if text and not text.startswith('[['):
+                    text_parts.append(text)
+        return ' '.join(text_parts)
+
+    return ''
+
+
+def extract_tool_calls(content):
+    """从消息内容中提取工具调用 [{"name", "description"}]"""
+    tool_calls = []
+
+    if not isinstance(content, list):
+        return tool_calls
+
+    for item in content:
+        if isinstance(item, dict) and item.get('type') == 'toolCall':
+            func_name = item.get('name', 'unknown')
+            arguments = item.get('arguments', {})
+
+            # 生成描述
+            description = f"调用 {func_name}"
+            if isinstance(arguments, dict):
+                # 提取关键参数
+                if 'command' in arguments:
+                    description = f"执行: {str(arguments['command'])[:50]}"
+                elif 'path' in arguments:
+                    description = f"读取: {arguments['path']}"
+                elif 'url' in arguments:
+                    description = f"访问: {arguments['url']}"
+                elif 'message' in arguments:
+                    description = f"发送: {str(arguments['message'])[:30]}"
+
+            tool_calls.append({
+                'name': func_name,
+                'description': description
+            })
+
+    return tool_calls
+
+
+def describe_interaction(user_message):
+    """互动派生任务的描述"""
+    # 去除常见前缀
+    prefixes_to_remove = [
+        '帮我', '请', '麻烦', '能否', '可以',
+        'help me', 'please', 'can you', 'could you'
+    ]
+
+    desc = user_message.strip()
+
+    # 去除前缀
+    for prefix in prefixes_to_remove:
+        if desc.lower().startswith(prefix.lower()):
+            desc = desc[len(prefix):].strip()
+            break
+
+    # 去除标点符号
+    desc = desc.lstrip('，,。.!！')
+
+    # 限制长度
+    if len(desc) > 50:
+        desc = desc[:47] + '...'
+
+    return desc if desc else '执行任务'
+
+
+def is_simple_acknowledgment(bot_response):
+    """判断是否是简单的确认消息"""
+    if not bot_response or not isinstance(bot_response, str):
+        return False
+
+    # 简单确认的模式
+    simple_patterns = [
+        '好的', '收到', '明白', 'ok', 'ok的', '知道了',
+        'sure', 'got it', 'understood'
+    ]
+
+    response_lower = bot_response.lower().strip()
+
+    # 如果回复非常短（<10字）且是确认语句
+    if len(bot_response) < 10:
+        for pattern in simple_patterns:
+            if pattern in response_lower:
+                return True
+
+    return False
+
+
+def is_user_task(text):
+    """用户消息是否创建任务（过滤系统消息和过短的消息）"""
+    return bool(text) and not text.startswith('System:') and len(text) >= 5
+
+
+def token_count(usage):
+    """AI 回复的 token 用量（totalTokens，没有时为 input + output）"""
+    if not isinstance(usage, dict):
+        return 0
+    total = usage.get('totalTokens')
+    if not isinstance(total, (int, float)):
+        total = sum(v for v in (usage.get('input'), usage.get('output')) if isinstance(v, (int, float)))
+    return int(total)
+
+
+class Derived:
+    """一批会话记录派生出的数据（由入库服务批量写入存储）"""
+
+    def __init__(self):
+        self.interactions = []
+        self.interaction_tasks = []
+        # [(消息ID, 任务)]：按消息ID去重，已创建过的不再创建
+        self.user_tasks = []
+        # 任务ID -> 状态变化 {"status", "updated_at"}（同一任务只保留最后一次）
+        self.status = {}
+        self.tool_calls = []
+        # [(消息ID, 时间, tokens)]
+        self.usage = []
+
+    def __len__(self):
+        return (len(self.interactions) + len(self.interaction_tasks) + len(self.user_tasks)
+                + len(self.status) + len(self.tool_calls) + len(self.usage))
+
+    def extend(self, other):
+        """合并另一批结果（other 在后）"""
+        self.interactions += other.interactions
+        self.interaction_tasks += other.interaction_tasks
+        self.user_tasks += other.user_tasks
+        self.status.update(other.status)
+        self.tool_calls += other.tool_calls
+        self.usage += other.usage
+
+
+class SessionParser:
+    """单个会话文件的解析状态
+
+    跨越多次读取的 用户/AI 消息对、以及当前用户任务的状态保存在 state() 中，
+    入库服务把它和读取进度一起写入检查点，重启后继续配对。
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        # 尚未配对的用户消息 {"id", "timestamp", "text"}
+        self.pending_user = state.get('user')
+        # 当前用户任务 {"id", "status"}，随后续回复更新状态
+        self.turn = state.get('turn')
+
+    def state(self):
+        """当前解析状态的副本（之后的解析不会修改返回值）"""
+        return {"user": dict(self.pending_user) if self.pending_user else None,
+                "turn": dict(self.turn) if self.turn else None}
+
+    def feed(self, records, derived=None):
+        """解析一批记录，结果追加到 derived（默认新建），返回 derived"""
+        derived = derived if derived is not None else Derived()
+        for data in records:
+            try:
+                self._feed(data, derived)
+            except Exception as e:
+                print(f"Error parsing session record: {e}")
+        return derived
+
+    def _feed(self, data, derived):
+        # 只处理消息类型的记录
+        if not isinstance(data, dict) or data.get('type') != 'message':
+            return
+
+        msg = data.get('message', {})
+        role = msg.get('role', '')
+        msg_id = data.get('id') or ''
+        timestamp = data.get('timestamp', '')
+        content = msg.get('content', [])
+
+        if role == 'user':
+            text = extract_text(content)
+            self.pending_user = {"id": msg_id, "timestamp": timestamp, "text": text}
+            self.turn = None
+            if msg_id and is_user_task(text):
+                task_id = f"user_task_{msg_id}"
+                created_at = timestamp or datetime.now().isoformat()
+                derived.user_tasks.append((msg_id, {
+                    'id': task_id,
+                    'description': summarize_task(text),
+                    'user_message': text,
+                    'status': 'running',
+                    'created_at': created_at,
+                    'start_time': created_at,
+                    'updated_at': created_at,
+                    'task_type': 'user_task'
+                }))
+                self.turn = {"id": task_id, "status": "running"}
+
+        elif role == 'assistant':
+            bot_text = extract_text(content)
+            if self.pending_user is not None:
+                self._pair(self.pending_user, bot_text, timestamp, derived)
+                self.pending_user = None
+            # 有文本回复说明任务有结果
+            if bot_text or any(isinstance(c, dict) and c.get('type') == 'text' for c in content or []):
+                self._set_status('completed', timestamp, derived)
+            if msg_id:
+                for i, tool_call in enumerate(extract_tool_calls(content)):
+                    derived.tool_calls.append({
+                        "id": msg_id if i == 0 else f"{msg_id}_{i}",
+                        "description": tool_call.get('description', '执行任务'),
+                        "status": "completed",
+                        "created_at": timestamp,
+                        "start_time": timestamp,
+                        "end_time": timestamp,
+                        "function": tool_call.get('name', 'unknown'),
+                        "duration": 0,
+                        "task_type": "tool_call"
+                    })
+                tokens = token_count(msg.get('usage'))
+                if tokens:
+                    derived.usage.append((msg_id, timestamp, tokens))
+
+        elif role == 'toolResult':
+            tool_name = msg.get('toolName', 'unknown')
+            details = msg.get('details') or {}
+            if details.get('status') == 'failed':
+                self._set_status('failed', timestamp, derived)
+            if msg_id:
+                duration = details.get('durationMs', 0) / 1000 if details.get('durationMs') else 0
+                derived.tool_calls.append({
+                    "id": msg_id,
+                    "description": f"{tool_name} - {details.get('name', tool_name)}",
+                    "status": "completed" if details.get('status') == 'completed' else "failed",
+                    "created_at": timestamp,
+                    "start_time": timestamp,
+                    "end_time": timestamp,
+                    "function": tool_name,
+                    "duration": duration,
+                    "task_type": "tool_call"
+                })
+
+    def _set_status(self, status, timestamp, derived):
+        """更新当前用户任务的状态（失败后不再改为完成）"""
+        turn = self.turn
+        if turn is None or turn['status'] == status or turn['status'] == 'failed':
+            return
+        turn['status'] = status
+        derived.status[turn['id']] = {"status": status,
+                                      "updated_at": timestamp or datetime.now().isoformat()}
+
+    def _pair(self, user, bot_text, assistant_time, derived):
+        """用户消息和随后的第一条AI回复组成一次互动，并派生任务记录"""
+        user_text = user['text']
+        if not user_text:
+            return
+        user_time = user['timestamp'] or datetime.now().isoformat()
+        msg_id = user['id'] or hashlib.sha1(f"{user_time}\n{user_text}".encode('utf-8')).hexdigest()[:16]
+
+        # 提取关键词，不存储原始消息
+        keywords = KeywordExtractor.extract_from_interaction(user_text, bot_text, max_keywords=3)
+        derived.interactions.append({
+            "id": f"interaction_{msg_id}",
+            "timestamp": user_time,
+            "keywords": keywords,
+            "session_type": "telegram"
+        })
+
+        # 简单确认不派生任务
+        if is_simple_acknowledgment(bot_text):
+            return
+        start, end = to_epoch_ms(user['timestamp']), to_epoch_ms(assistant_time)
+        duration = round((end - start) / 1000, 2) if start and end else 0
+        derived.interaction_tasks.append({
+            # 任务ID由用户消息ID决定，重复入库时覆盖而不是新增
+            "id": f"interaction_{msg_id}",
+            "description": describe_interaction(user_text),
+            "status": "completed",
+            "start_time": user_time,
+            "end_time": assistant_time or datetime.now().isoformat(),
+            "duration": duration,
+            "function": "user_task",
+            "module": "interaction",
+            "result": "success"
+        })
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+会话文件增量读取 - 记录每个 .jsonl 文件的 (inode, size, offset)，只解析新追加的行
+
+传入 CheckpointStore 时，首次读取某个文件从检查点的位置继续。
+检查点由使用方在读取的记录写入成功后更新；写入失败时调用 rewind()，下次从检查点重新读取。
+"""
+import json
+import os
+import threading
+
+
+class SessionTailer:
+    def __init__(self, checkpoints=None):
+        # path -> {"inode": int, "size": int, "offset": int}
+        self.files = {}
+        self.checkpoints = checkpoints
+        # 累计读取的字节数（用于统计启动时扫描了多少新内容）
+        self.bytes_read = 0
+        self._lock = threading.Lock()
+
+    def read_new(self, path):
+        """读取文件自上次以来新追加的完整行
+
+        Args:
+            path: 会话文件路径
+
+        Returns:
+            (records, reset): records 为新解析出的JSON对象列表；
+            reset 为True表示文件被轮转或截断，调用方应丢弃该文件之前的解析结果
+        """
+        key = str(path)
+        with self._lock:
+            try:
+                st = os.stat(key)
+            except FileNotFoundError:
+                self.files.pop(key, None)
+                return [], True
+
+            state = self.files.get(key)
+            reset = False
+            if state is None or state['inode'] != st.st_ino or st.st_size < state['offset']:
+                # 新文件、文件被替换（轮转）或被截断：从头读取
+                reset = state is not None
+                offset = 0
+                if self.checkpoints is not None:
+                    # 检查点按 (设备号, inode) 校验，轮转后的新文件或被截断的文件不会用到旧进度
+                    checkpoint = self.checkpoints.get(key)
+                    if checkpoint is not None:
+                        offset = checkpoint['offset']
+                state = {"inode": st.st_ino, "size": offset, "offset": offset}
+                self.files[key] = state
+
+            if st.st_size == state['offset']:
+                state['size'] = st.st_size
+                return [], reset
+
+            with open(key, 'rb') as f:
+                f.seek(state['offset'])
+                chunk = f.read(st.st_size - state['offset'])
+
+            # 只处理到最后一个换行符，未写完的半行留到下次
+            end = chunk.rfind(b'\n')
+            if end < 0:
+                state['size'] = st.st_size
+                return [], reset
+            state['offset'] += end + 1
+            self.bytes_read += end + 1
+            state['size'] = st.st_size
+
+        records = []
+        for line in chunk[:end].split(b'\n'):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+        return records, reset
+
+    def rewind(self, path):
+        """丢弃文件的读取位置，下次读取从检查点（没有时从头）继续"""
+        with self._lock:
+            self.files.pop(str(path), None)
+
+    def offset(self, path):
+        """文件当前的读取位置（未读取过为0）"""
+        with self._lock:
+            state = self.files.get(str(path))
+            return state['offset'] if state else 0
+
+    def offsets(self):
+        """所有文件当前的读取位置，读取有进展时变化（用于缓存失效）"""
+        with self._lock:
+            return tuple(sorted((key, state['inode'], state['offset'])
+                                for key, state in self.files.items()))
+
+    def forget_missing(self, existing_paths):
+        """清理已不存在的文件记录"""
+        keep = {str(p) for p in existing_paths}
+        with self._lock:
+            for key in list(self.files):
+                if key not in keep:
+                    del self.files[key]
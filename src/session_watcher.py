@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+会话文件监听 - 等待 ~/.openclaw/agents/*/sessions 下的 .jsonl 文件变化
+
+Linux 上通过 ctypes 调用 inotify（IN_MODIFY / IN_CREATE / IN_MOVED_*），文件一有追加立即返回，
+空闲时阻塞在 select 上不占用CPU；inotify 不可用（非 Linux、监听数达到上限等）时退回按间隔 glob 轮询。
+只负责“哪些文件变了”，读取新增内容由 SessionTailer 完成。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT = struct.Struct('iIII')
+
+# 会话目录：文件追加、新建、改名（轮转）、删除
+SESSION_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF
+# 上级目录：只关心新建的子目录（新的 agent 或 sessions 目录）
+PARENT_MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+
+
+class Inotify:
+    """inotify 的最小封装（ctypes 调用 libc，不依赖第三方库）"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+        # wd -> 目录
+        self.watches = {}
+
+    def add_watch(self, path, mask):
+        wd = self._add(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        self.watches[wd] = Path(path)
+        return wd
+
+    def read(self, timeout):
+        """等待最多 timeout 秒，返回事件列表 [(目录, mask, 文件名)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        i = 0
+        while i + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, i)
+            name = data[i + _EVENT.size:i + _EVENT.size + length].rstrip(b'\0')
+            i += _EVENT.size + length
+            directory = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                # 目录已删除，内核自动移除了监听
+                self.watches.pop(wd, None)
+            events.append((directory, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SessionWatcher:
+    """等待会话文件变化
+
+    用法:
+        watcher = SessionWatcher()
+        for path in watcher.session_files():   # 启动时处理已有文件
+            ...
+        while True:
+            for path in watcher.wait():        # 阻塞到有文件变化
+                ...
+    """
+
+    def __init__(self, root=None, interval=5, use_inotify=True):
+        """
+        Args:
+            root: agents 目录，默认 ~/.openclaw/agents
+            interval: 轮询模式下的检查间隔（秒），也是 wait() 的默认超时
+            use_inotify: False 时强制使用轮询
+        """
+        self.root = Path(root) if root else Path.home() / '.openclaw' / 'agents'
+        self.interval = interval
+        self._inotify = None
+        self._watched = set()
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._watch_tree()
+            except (OSError, AttributeError) as e:
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+                print(f"⚠️  inotify 不可用，改为每 {interval} 秒轮询会话目录: {e}")
+        self.mode = 'inotify' if self._inotify is not None else 'poll'
+
+    def session_files(self):
+        """所有会话文件（agents/*/sessions/*.jsonl）"""
+        return sorted(p for p in self.root.glob('*/sessions/*.jsonl') if p.is_file())
+
+    def wait(self, timeout=None):
+        """阻塞直到有会话文件变化或超时
+
+        Args:
+            timeout: 最长等待秒数，默认 interval
+
+        Returns:
+            变化的会话文件列表；超时返回空列表。轮询模式或事件队列溢出时返回全部会话文件
+            （调用方按偏移量只读取新增内容，未变化的文件没有开销）
+        """
+        timeout = self.interval if timeout is None else timeout
+        if self._inotify is None:
+            time.sleep(timeout)
+            return self.session_files()
+
+        events = self._inotify.read(timeout)
+        if not events:
+            return []
+        # 合并紧接着到达的事件（一次写入常常产生多个事件）
+        while True:
+            more = self._inotify.read(0)
+            if not more:
+                break
+            events += more
+
+        changed = set()
+        rescan = False
+        for directory, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+            elif mask & IN_ISDIR or (directory is not None and directory.name != 'sessions'):
+                # 新的 agent 目录或 sessions 目录：补充监听，并处理其中已有的文件
+                rescan = True
+            elif directory is not None and name.endswith('.jsonl'):
+                changed.add(directory / name)
+
+        if rescan:
+            try:
+                self._watch_tree()
+            except OSError as e:
+                # 监听数达到上限等：退回轮询
+                self.close()
+                self.mode = 'poll'
+                print(f"⚠️  inotify 监听失败，改为每 {self.interval} 秒轮询会话目录: {e}")
+            return self.session_files()
+        return sorted(changed)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _watch_tree(self):
+        """监听每个 sessions 目录，以及上级目录中新建的子目录（重复调用只添加新目录）"""
+        # 已被删除的目录（内核移除了监听）重新创建后需要再次监听
+        self._watched = set(self._inotify.watches.values())
+        # agents 目录不存在时监听最近的已存在的上级目录，等它被创建
+        parent = self.root
+        while not parent.exists() and parent != parent.parent:
+            parent = parent.parent
+        targets = [(parent, PARENT_MASK)]
+        if self.root.exists():
+            for agent_dir in self.root.iterdir():
+                if not agent_dir.is_dir():
+                    continue
+                sessions_dir = agent_dir / 'sessions'
+                if sessions_dir.is_dir():
+                    targets.append((sessions_dir, SESSION_MASK))
+                else:
+                    targets.append((agent_dir, PARENT_MASK))
+
+        for path, mask in targets:
+            if path in self._watched:
+                continue
+            self._inotify.add_watch(path, mask)
+            self._watched.add(path)
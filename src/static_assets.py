@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+静态资源缓存 - 启动时把 web/ 下的页面和静态文件读入内存，并预先压缩
+
+static/ 下的文件按内容哈希生成带版本的URL（如 /static/app.3f2a9c1b7e.js），
+页面中对静态文件的引用在启动时改写为带哈希的URL，浏览器可以永久缓存
+（Cache-Control: immutable），文件内容变化时URL随之变化。
+超过 sendfile_min_size 的大文件不读入内存，发送时用 sendfile 零拷贝。
+"""
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+from compression import gzip_bytes, is_compressible
+
+# 页面中引用静态文件的属性值，如 href="/static/style.css?v=20260206v4"
+STATIC_REF = re.compile(r'''(["'])/?static/([^"'?#]+)(?:[?#][^"']*)?\1''')
+
+
+class StaticAsset:
+    def __init__(self, path, data, content_type, digest, size, gzip_data=None):
+        self.path = path
+        # 大文件为None，发送时直接从磁盘 sendfile
+        self.data = data
+        self.content_type = content_type
+        self.digest = digest
+        self.size = size
+        self.etag = '"' + digest + '"'
+        # 压缩后更小时才保留
+        self.gzip_data = gzip_data
+
+
+class StaticAssets:
+    def __init__(self, root, gzip_min_size=1024, gzip_level=6, sendfile_min_size=256 * 1024):
+        """
+        Args:
+            root: web 目录
+            gzip_min_size: 小于该字节数的文件不压缩
+            gzip_level: gzip 压缩级别
+            sendfile_min_size: 不小于该字节数的文件不缓存在内存，用 sendfile 发送
+        """
+        self.root = Path(root)
+        self.gzip_min_size = gzip_min_size
+        self.gzip_level = gzip_level
+        self.sendfile_min_size = sendfile_min_size
+        self.assets = {}
+        # 带内容哈希的URL，可以永久缓存
+        self.immutable_urls = set()
+        # 原始URL → 带哈希的URL
+        self.hashed_urls = {}
+        self.load()
+
+    def load(self):
+        """读取 static/ 下的全部文件，再读取 web/ 根目录的页面并改写静态文件引用"""
+        assets = {}
+        immutable_urls = set()
+        hashed_urls = {}
+
+        static_files = [p for p in (self.root / 'static').rglob('*') if p.is_file()]
+        for path in static_files:
+            url = '/' + path.relative_to(self.root).as_posix()
+            asset = self._load_file(path, path.read_bytes() if path.stat().st_size < self.sendfile_min_size else None)
+            assets[url] = asset
+            hashed = self._hashed_url(url, asset.digest)
+            assets[hashed] = asset
+            immutable_urls.add(hashed)
+            hashed_urls[url] = hashed
+
+        pages = [p for p in self.root.glob('*') if p.is_file()]
+        for path in pages:
+            url = '/' + path.relative_to(self.root).as_posix()
+            data = path.read_bytes()
+            if path.suffix == '.html':
+                data = self._rewrite_refs(data, hashed_urls)
+            assets[url] = self._load_file(path, data)
+        if '/index.html' in assets:
+            assets['/'] = assets['/index.html']
+
+        self.assets = assets
+        self.immutable_urls = immutable_urls
+        self.hashed_urls = hashed_urls
+
+        files = len(static_files) + len(pages)
+        compressed = sum(1 for url, a in assets.items()
+                         if url != '/' and url not in immutable_urls and a.gzip_data is not None)
+        print(f"✅ 已缓存 {files} 个静态文件（预压缩 {compressed} 个，带哈希URL {len(immutable_urls)} 个）")
+
+    def _load_file(self, path, data):
+        content_type = mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+
+        if data is None:
+            # 大文件只计算哈希，不保留内容
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return StaticAsset(path, None, content_type, digest.hexdigest()[:10], path.stat().st_size)
+
+        gzip_data = None
+        if len(data) >= self.gzip_min_size and is_compressible(content_type):
+            candidate = gzip_bytes(data, self.gzip_level)
+            if len(candidate) < len(data):
+                gzip_data = candidate
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        return StaticAsset(path, data, content_type, digest, len(data), gzip_data)
+
+    @staticmethod
+    def _hashed_url(url, digest):
+        base, dot, ext = url.rpartition('.')
+        if not dot or '/' in ext:
+            return f"{url}.{digest}"
+        return f"{base}.{digest}.{ext}"
+
+    @staticmethod
+    def _rewrite_refs(html, hashed_urls):
+        """把页面中的静态文件引用改写为带哈希的URL（去掉手写的 ?v= 版本号）"""
+        def replace(match):
+            quote, name = match.group(1), match.group(2)
+            hashed = hashed_urls.get('/static/' + name)
+            if hashed is None:
+                return match.group(0)
+            return f"{quote}{hashed}{quote}"
+
+        text = html.decode('utf-8')
+        return STATIC_REF.sub(replace, text).encode('utf-8')
+
+    def get(self, url_path):
+        """按URL路径（忽略查询参数）查找资源，不存在返回None"""
+        return self.assets.get(self._strip(url_path))
+
+    def is_immutable(self, url_path):
+        return self._strip(url_path) in self.immutable_urls
+
+    @staticmethod
+    def _strip(url_path):
+        return url_path.split('?', 1)[0].split('#', 1)[0]
@@ -0,0 +1,1188 @@
+#!/usr/bin/env python3
+"""
+存储模块 - 任务、互动、系统状态的统一存储接口
+
+后端:
+- SQLiteStore: 标准库 sqlite3，WAL 模式，按 created_ts/status/task_type 建索引，不限记录数
+- EventLogStore: 追加写的 JSONL 事件日志 + 内存视图，后台定期压缩为快照（不需要数据库文件）
+- JsonStore:   兼容旧版的 JSON 文件（每个集合一个文件，最多保留100条）
+
+数据集合（kind）:
+- user_tasks       用户任务（原 user_tasks.json）
+- task_records     任务记录（原 tasks.json）
+- interactions     互动记录（原 interactions.json）
+- scheduled_tasks  明日计划任务（原 scheduled_tasks.json）
+键值数据（meta）:
+- system_status    最近一次系统状态（原 system_status.json）
+
+user_tasks 的写入同时维护按 (日期, task_type) 的每日汇总（见 rollups.py），
+统计接口对汇总行求和，不扫描任务列表。
+"""
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import rollups
+from rollups import COUNTERS, ROLLUP_KINDS
+from timeutil import parse_tz, to_epoch_ms
+
+KINDS = ('user_tasks', 'task_records', 'interactions', 'scheduled_tasks')
+
+# 建二级索引的字段（list 按这些字段筛选）
+INDEXED_FIELDS = ('status', 'task_type')
+
+# 任务ID序号（毫秒时间戳，跨进程单调递增）保存在 meta 的该键下
+ID_SEQ_KEY = 'task_id_seq'
+ID_PREFIX = 'task_'
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def created_key(item):
+    """记录的创建时间（兼容 created_at / start_time / timestamp 三种字段）"""
+    return item.get('created_at') or item.get('start_time') or item.get('timestamp') or ''
+
+
+def created_ts(item):
+    """记录创建时间的 epoch 毫秒（写入时计算一次用于排序和范围查询；无法解析为0）"""
+    return to_epoch_ms(created_key(item)) or 0
+
+
+def sort_key(item):
+    return (created_ts(item), record_id(item))
+
+
+def make_cursor(item):
+    """分页游标：创建时间（epoch 毫秒）+ 记录ID（同一时间的记录按ID区分）"""
+    return f"{created_ts(item)}|{record_id(item)}"
+
+
+def parse_cursor(cursor):
+    """解析分页游标为 (created_ts, id)；空值返回None"""
+    if not cursor:
+        return None
+    created, _, item_id = cursor.rpartition('|')
+    try:
+        return (int(created), item_id)
+    except ValueError:
+        # 兼容以时间字符串开头的旧游标
+        return (to_epoch_ms(created) or 0, item_id)
+
+
+def next_seq(last):
+    """下一个任务ID序号：当前毫秒时间戳；同一毫秒内（或时钟回拨时）在上一个序号上顺延"""
+    return max(int(time.time() * 1000), (last or 0) + 1)
+
+
+def record_id(item):
+    """记录ID；没有 id 字段的记录（如互动）使用内容哈希，重复导入时不会产生重复记录"""
+    if item.get('id'):
+        return str(item['id'])
+    digest = hashlib.sha1(json.dumps(item, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class Store:
+    """存储接口，所有后端实现相同的方法"""
+
+    # 每日汇总按该时区划分日期（None 为服务器本地时区）
+    tz = None
+
+    def get(self, kind, item_id):
+        """按ID获取记录，不存在返回None"""
+        raise NotImplementedError
+
+    def list(self, kind, status=None, task_type=None, limit=None):
+        """列出记录，按创建时间倒序（最近的在前）"""
+        raise NotImplementedError
+
+    def upsert(self, kind, items):
+        """批量写入记录，ID已存在时覆盖"""
+        raise NotImplementedError
+
+    def page(self, kind, before=None, limit=50, start=None, end=None, task_type=None):
+        """按创建时间倒序分页
+
+        Args:
+            before: 上一页返回的游标，只返回比它更早的记录；None 表示从最新开始
+            limit: 每页条数；None 表示不限
+            start / end: 创建时间范围 [start, end)，epoch 毫秒，None 表示不限
+            task_type: 只返回该 task_type 的记录；None 表示不限
+
+        Returns:
+            (items, next_cursor)：next_cursor 为None表示没有更早的记录
+        """
+        cursor = parse_cursor(before)
+        items = [t for t in self.list(kind, task_type=task_type)
+                 if (cursor is None or sort_key(t) < cursor)
+                 and (start is None or created_ts(t) >= start)
+                 and (end is None or created_ts(t) < end)]
+        items.sort(key=sort_key, reverse=True)
+        if limit is None:
+            return items, None
+        page = items[:limit]
+        return page, (make_cursor(page[-1]) if len(items) > limit else None)
+
+    def range(self, kind, start=None, end=None):
+        """创建时间在 [start, end) 内的全部记录，按时间倒序"""
+        return self.page(kind, limit=None, start=start, end=end)[0]
+
+    def insert(self, kind, item):
+        """仅在ID不存在时写入，返回是否写入"""
+        raise NotImplementedError
+
+    def update(self, kind, item_id, changes):
+        """原子更新一条记录
+
+        Args:
+            changes: 字段字典，或接收记录并原地修改的函数（返回 False 表示放弃更新）
+
+        Returns:
+            更新后的记录；记录不存在或放弃更新时返回None
+        """
+        raise NotImplementedError
+
+    def replace_all(self, kind, items):
+        """用 items 替换整个集合"""
+        raise NotImplementedError
+
+    def batch(self, kind, ops):
+        """在一个事务内按顺序执行一组写入
+
+        Args:
+            ops: [("create", item) | ("update", item_id, changes)]
+                create: 由存储分配ID（"task_<毫秒>"，跨进程单调递增、不重复）后写入
+                update: 同 update()，可以更新同一批次中先创建的记录
+
+        Returns:
+            每个操作的结果：写入或更新后的记录；update 的记录不存在或放弃更新时为None
+        """
+        raise NotImplementedError
+
+    def next_ids(self, count=1):
+        """分配 count 个新的任务ID（与 batch 的 create 共用同一序号）"""
+        raise NotImplementedError
+
+    def rollups(self, kind, first_day=None, last_day=None):
+        """日期在 [first_day, last_day]（'YYYY-MM-DD'，None 表示不限）内的每日汇总行
+
+        Returns:
+            [{"day", "task_type", "total", "completed", ...}]
+        """
+        items = self.list(kind)
+        rows = rollups.build(((created_ts(t), t) for t in items), self._tz())
+        return rollups.select(rows, first_day, last_day)
+
+    def rebuild_rollups(self, kind):
+        """从全部记录重新计算每日汇总，返回汇总行数（默认实现每次查询时计算，无需重建）"""
+        return len(self.rollups(kind))
+
+    def get_meta(self, key, default=None):
+        raise NotImplementedError
+
+    def set_meta(self, key, value):
+        raise NotImplementedError
+
+    def version(self, kind):
+        """集合的变化标识（可哈希，基于文件状态，能感知其他进程的写入），用于缓存失效"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _stat_key(*paths):
+        key = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                key.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def _tz(self):
+        if self.tz is None:
+            self.tz = parse_tz(None)
+        return self.tz
+
+    @staticmethod
+    def _apply_changes(item, changes):
+        if callable(changes):
+            return changes(item) is not False
+        item.update(changes)
+        return True
+
+
+class SQLiteStore(Store):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            kind TEXT NOT NULL,
+            id TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT '',
+            created_ts INTEGER NOT NULL DEFAULT 0,
+            status TEXT,
+            task_type TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (kind, id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_created ON records (kind, created_at);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS rollups (
+            kind TEXT NOT NULL,
+            day TEXT NOT NULL,
+            task_type TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            running INTEGER NOT NULL DEFAULT 0,
+            duration_sum REAL NOT NULL DEFAULT 0,
+            duration_count INTEGER NOT NULL DEFAULT 0,
+            files_created INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, day, task_type)
+        );
+    """
+    # 依赖 created_ts 列的索引，在旧库补齐该列之后创建；
+    # 按 status/task_type 筛选的索引带上 created_ts，筛选结果直接按时间有序，不扫描整个集合
+    TS_INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_records_ts ON records (kind, created_ts, id);
+        DROP INDEX IF EXISTS idx_records_status;
+        DROP INDEX IF EXISTS idx_records_task_type;
+        CREATE INDEX IF NOT EXISTS idx_records_status_ts ON records (kind, status, created_ts);
+        CREATE INDEX IF NOT EXISTS idx_records_task_type_ts ON records (kind, task_type, created_ts);
+    """
+
+    def __init__(self, db_path, tz=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = not self.db_path.exists()
+        self.tz = tz
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+        self._add_created_ts()
+        self._conn().executescript(self.TS_INDEXES)
+        self._check_rollups()
+
+    def _check_rollups(self):
+        """旧库没有汇总行，或汇总时区与当前配置不同时，重新计算（只在需要时执行）"""
+        tz_name = str(self._tz())
+        conn = self._conn()
+        # 时区只读取一次：所有种类重算完成后才写入 rollups_tz，否则第一个种类重算后其余的会被当作最新
+        tz_stale = self.get_meta('rollups_tz') != tz_name
+        stale_kinds = []
+        for kind in ROLLUP_KINDS:
+            stale = tz_stale
+            if not stale:
+                has_rows = conn.execute('SELECT 1 FROM rollups WHERE kind = ? LIMIT 1', (kind,)).fetchone()
+                has_records = conn.execute('SELECT 1 FROM records WHERE kind = ? LIMIT 1', (kind,)).fetchone()
+                stale = has_records is not None and has_rows is None
+            if stale:
+                stale_kinds.append(kind)
+        if not stale_kinds:
+            return
+
+        with self._transaction() as conn:
+            counts = {kind: self._rebuild_rollups(conn, kind) for kind in stale_kinds}
+            self._write_meta(conn, 'rollups_tz', tz_name)
+        for kind, count in counts.items():
+            if count:
+                print(f"✅ 已重建 {kind} 的每日汇总（{count} 行，时区 {tz_name}）")
+
+    def _add_created_ts(self):
+        """旧库没有 created_ts 列时补齐并回填（只执行一次）"""
+        conn = self._conn()
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(records)')}
+        if 'created_ts' in columns:
+            return
+        with self._transaction() as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(records)')}
+            if 'created_ts' in columns:
+                return
+            conn.execute('ALTER TABLE records ADD COLUMN created_ts INTEGER NOT NULL DEFAULT 0')
+            rows = conn.execute('SELECT kind, id, data FROM records').fetchall()
+            conn.executemany('UPDATE records SET created_ts = ? WHERE kind = ? AND id = ?',
+                             [(created_ts(json.loads(data)), kind, item_id) for kind, item_id, data in rows])
+            conn.execute('DROP INDEX IF EXISTS idx_records_page')
+        print(f"✅ 存储已升级：回填 {len(rows)} 条记录的时间索引")
+
+    def _conn(self):
+        """每个线程一个连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=10000')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    @staticmethod
+    def _row(kind, item):
+        return (kind, record_id(item), created_key(item), created_ts(item), item.get('status'),
+                item.get('task_type'), json.dumps(item, ensure_ascii=False))
+
+    def get(self, kind, item_id):
+        row = self._conn().execute(
+            'SELECT data FROM records WHERE kind = ? AND id = ?', (kind, item_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, kind, status=None, task_type=None, limit=None):
+        sql = 'SELECT data FROM records WHERE kind = ?'
+        params = [kind]
+        if status is not None:
+            sql += ' AND status = ?'
+            params.append(status)
+        if task_type is not None:
+            sql += ' AND task_type = ?'
+            params.append(task_type)
+        sql += ' ORDER BY created_ts DESC, rowid DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [json.loads(row[0]) for row in self._conn().execute(sql, params)]
+
+    def page(self, kind, before=None, limit=50, start=None, end=None, task_type=None):
+        # 走 (kind, created_ts, id) 索引（按 task_type 筛选时走 (kind, task_type, created_ts)），每页只读取 limit+1 行
+        cursor = parse_cursor(before)
+        sql = 'SELECT data FROM records WHERE kind = ?'
+        params = [kind]
+        if task_type is not None:
+            sql += ' AND task_type = ?'
+            params.append(task_type)
+        if cursor is not None:
+            sql += ' AND (created_ts < ? OR (created_ts = ? AND id < ?))'
+            params += [cursor[0], cursor[0], cursor[1]]
+        if start is not None:
+            sql += ' AND created_ts >= ?'
+            params.append(start)
+        if end is not None:
+            sql += ' AND created_ts < ?'
+            params.append(end)
+        sql += ' ORDER BY created_ts DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+        items = [json.loads(row[0]) for row in self._conn().execute(sql, params)]
+        if limit is None:
+            return items, None
+        page = items[:limit]
+        return page, (make_cursor(page[-1]) if len(items) > limit else None)
+
+    _UPSERT = """
+        INSERT INTO records (kind, id, created_at, created_ts, status, task_type, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (kind, id) DO UPDATE SET
+            created_at = excluded.created_at,
+            created_ts = excluded.created_ts,
+            status = excluded.status,
+            task_type = excluded.task_type,
+            data = excluded.data
+    """
+
+    _ROLLUP_ADD = """
+        INSERT INTO rollups (kind, day, task_type, total, completed, failed, running,
+                             duration_sum, duration_count, files_created)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (kind, day, task_type) DO UPDATE SET
+            total = total + excluded.total,
+            completed = completed + excluded.completed,
+            failed = failed + excluded.failed,
+            running = running + excluded.running,
+            duration_sum = duration_sum + excluded.duration_sum,
+            duration_count = duration_count + excluded.duration_count,
+            files_created = files_created + excluded.files_created
+    """
+
+    def _track(self, deltas, item, sign):
+        """记录一条任务对汇总行的增减（sign=-1 为写入前的旧记录）"""
+        key = rollups.row_key(created_ts(item), item, self._tz())
+        rollups.add(deltas, key, rollups.contribution(item), sign)
+
+    def _apply_rollups(self, conn, kind, deltas):
+        """在写入记录的同一事务中累加汇总行的差值，删除已经没有任务的行"""
+        rows = [(kind, day, task_type) + tuple(delta[name] for name in COUNTERS)
+                for (day, task_type), delta in deltas.items() if any(delta.values())]
+        if not rows:
+            return
+        conn.executemany(self._ROLLUP_ADD, rows)
+        conn.execute('DELETE FROM rollups WHERE kind = ? AND total <= 0', (kind,))
+
+    _INSERT = ('INSERT OR IGNORE INTO records (kind, id, created_at, created_ts, status, task_type, data) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?)')
+
+    def upsert(self, kind, items):
+        with self._transaction() as conn:
+            if kind not in ROLLUP_KINDS:
+                conn.executemany(self._UPSERT, [self._row(kind, item) for item in items])
+                return
+            deltas = {}
+            for item in items:
+                row = self._row(kind, item)
+                previous = conn.execute(
+                    'SELECT data FROM records WHERE kind = ? AND id = ?', (kind, row[1])).fetchone()
+                if previous is not None:
+                    self._track(deltas, json.loads(previous[0]), -1)
+                self._track(deltas, item, 1)
+                conn.execute(self._UPSERT, row)
+            self._apply_rollups(conn, kind, deltas)
+
+    def insert(self, kind, item):
+        with self._transaction() as conn:
+            deltas = {}
+            inserted = self._insert(conn, kind, item, deltas)
+            self._apply_rollups(conn, kind, deltas)
+            return inserted
+
+    def update(self, kind, item_id, changes):
+        with self._transaction() as conn:
+            deltas = {}
+            item = self._modify(conn, kind, item_id, changes, deltas)
+            self._apply_rollups(conn, kind, deltas)
+            return item
+
+    def batch(self, kind, ops):
+        with self._transaction() as conn:
+            deltas = {}
+            results = []
+            seq = self._read_meta(conn, ID_SEQ_KEY, 0)
+            for op in ops:
+                if op[0] == 'create':
+                    item = dict(op[1])
+                    while True:
+                        seq = next_seq(seq)
+                        item['id'] = f"{ID_PREFIX}{seq}"
+                        # 序号保证不与本存储分配过的ID重复；旧版本生成的ID冲突时继续顺延
+                        if self._insert(conn, kind, item, deltas):
+                            break
+                    results.append(item)
+                else:
+                    results.append(self._modify(conn, kind, op[1], op[2], deltas))
+            self._write_meta(conn, ID_SEQ_KEY, seq)
+            self._apply_rollups(conn, kind, deltas)
+            return results
+
+    def next_ids(self, count=1):
+        with self._transaction() as conn:
+            seq = self._read_meta(conn, ID_SEQ_KEY, 0)
+            ids = []
+            for _ in range(count):
+                seq = next_seq(seq)
+                ids.append(f"{ID_PREFIX}{seq}")
+            self._write_meta(conn, ID_SEQ_KEY, seq)
+            return ids
+
+    def _insert(self, conn, kind, item, deltas):
+        """仅在ID不存在时写入一条记录，返回是否写入"""
+        cursor = conn.execute(self._INSERT, self._row(kind, item))
+        if cursor.rowcount > 0 and kind in ROLLUP_KINDS:
+            self._track(deltas, item, 1)
+        return cursor.rowcount > 0
+
+    def _modify(self, conn, kind, item_id, changes, deltas):
+        """在事务内更新一条记录，返回更新后的记录（不存在或放弃更新时为None）"""
+        row = conn.execute(
+            'SELECT data FROM records WHERE kind = ? AND id = ?', (kind, item_id)).fetchone()
+        if row is None:
+            return None
+        item = json.loads(row[0])
+        if not self._apply_changes(item, changes):
+            return None
+        conn.execute(self._UPSERT, self._row(kind, item))
+        if kind in ROLLUP_KINDS:
+            self._track(deltas, json.loads(row[0]), -1)
+            self._track(deltas, item, 1)
+        return item
+
+    def replace_all(self, kind, items):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM records WHERE kind = ?', (kind,))
+            conn.executemany(self._UPSERT, [self._row(kind, item) for item in items])
+            if kind in ROLLUP_KINDS:
+                self._rebuild_rollups(conn, kind)
+
+    def rollups(self, kind, first_day=None, last_day=None):
+        sql = 'SELECT day, task_type, ' + ', '.join(COUNTERS) + ' FROM rollups WHERE kind = ?'
+        params = [kind]
+        if first_day is not None or last_day is not None:
+            sql += " AND day != ''"
+        if first_day is not None:
+            sql += ' AND day >= ?'
+            params.append(first_day)
+        if last_day is not None:
+            sql += ' AND day <= ?'
+            params.append(last_day)
+        columns = ('day', 'task_type') + COUNTERS
+        return [dict(zip(columns, row)) for row in self._conn().execute(sql, params)]
+
+    def rebuild_rollups(self, kind):
+        with self._transaction() as conn:
+            count = self._rebuild_rollups(conn, kind)
+            self._write_meta(conn, 'rollups_tz', str(self._tz()))
+            return count
+
+    def _rebuild_rollups(self, conn, kind):
+        conn.execute('DELETE FROM rollups WHERE kind = ?', (kind,))
+        pairs = ((ts, json.loads(data)) for ts, data in
+                 conn.execute('SELECT created_ts, data FROM records WHERE kind = ?', (kind,)).fetchall())
+        rows = rollups.build(pairs, self._tz())
+        conn.executemany(self._ROLLUP_ADD,
+                         [(kind, day, task_type) + tuple(row[name] for name in COUNTERS)
+                          for (day, task_type), row in rows.items()])
+        return len(rows)
+
+    def get_meta(self, key, default=None):
+        return self._read_meta(self._conn(), key, default)
+
+    def set_meta(self, key, value):
+        with self._transaction() as conn:
+            self._write_meta(conn, key, value)
+
+    @staticmethod
+    def _read_meta(conn, key, default=None):
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @staticmethod
+    def _write_meta(conn, key, value):
+        conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                     (key, json.dumps(value, ensure_ascii=False)))
+
+    def version(self, kind):
+        # WAL 模式下提交写入 -wal 文件，检查点写回主文件
+        return self._stat_key(self.db_path, str(self.db_path) + '-wal')
+
+
+class EventLogStore(Store):
+    """事件日志后端：每次写入只追加一行事件，读取走内存中的物化视图
+
+    文件:
+        task_events.jsonl          事件日志（put / clear / meta）
+        task_events.snapshot.json  最近一次压缩时的完整快照
+
+    启动时加载快照并重放日志尾部。每次读写前检查日志是否有其他进程追加的新事件；
+    压缩时写新快照并原子替换为空日志，其他进程通过 inode 变化感知并重新加载。
+
+    内存视图按ID保存记录（字典），另有按 (created_ts, id) 排序的索引和 status/task_type
+    二级索引，按ID更新和按状态筛选的开销与历史总量无关。
+    """
+
+    LOG_NAME = 'task_events.jsonl'
+    SNAPSHOT_NAME = 'task_events.snapshot.json'
+
+    def __init__(self, data_dir, compact_bytes=4 * 1024 * 1024, compact_interval=60, tz=None):
+        """
+        Args:
+            data_dir: 日志和快照所在目录
+            compact_bytes: 日志超过该大小时压缩
+            compact_interval: 后台检查是否需要压缩的间隔（秒）
+            tz: 每日汇总划分日期的时区
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.data_dir / self.LOG_NAME
+        self.snapshot_path = self.data_dir / self.SNAPSHOT_NAME
+        self.lock_path = self.data_dir / ('.' + self.LOG_NAME + '.lock')
+        self.compact_bytes = compact_bytes
+        self.created = not self.log_path.exists() and not self.snapshot_path.exists()
+        self.tz = tz
+
+        self._lock = threading.RLock()
+        self._records = {kind: {} for kind in KINDS}
+        # 按 (created_ts, id) 排序的索引，用于分页和范围查询
+        self._order = {kind: [] for kind in KINDS}
+        # 二级索引 {kind: {field: {value: {id, ...}}}}
+        self._index = {kind: {field: {} for field in INDEXED_FIELDS} for kind in KINDS}
+        # 每日汇总 {kind: {(day, task_type): counters}}，随事件增量更新
+        self._rollups = {kind: {} for kind in ROLLUP_KINDS}
+        self._meta = {}
+        self._inode = None
+        self._offset = 0
+
+        self.log_path.touch(exist_ok=True)
+        with self._lock:
+            self._sync()
+
+        self._compactor = threading.Thread(
+            target=self._compact_loop, args=(compact_interval,), name='eventlog-compactor', daemon=True)
+        self._compactor.start()
+
+    # ---- 日志读取 / 物化视图 ----
+
+    def _load_snapshot(self):
+        self._records = {kind: {} for kind in KINDS}
+        self._meta = {}
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            for kind, items in snapshot.get('records', {}).items():
+                self._records.setdefault(kind, {})
+                for item in items:
+                    self._records[kind][record_id(item)] = item
+            self._meta = snapshot.get('meta', {})
+        self._order = {kind: sorted((created_ts(item), rid) for rid, item in records.items())
+                       for kind, records in self._records.items()}
+        self._index = {}
+        for kind, records in self._records.items():
+            index = self._index[kind] = {field: {} for field in INDEXED_FIELDS}
+            for rid, item in records.items():
+                for field in INDEXED_FIELDS:
+                    index[field].setdefault(item.get(field), set()).add(rid)
+        self._rollups = {kind: rollups.build(((created_ts(t), t) for t in self._records.get(kind, {}).values()),
+                                             self._tz())
+                         for kind in ROLLUP_KINDS}
+
+    def _apply(self, event):
+        op = event.get('op')
+        if op == 'put':
+            item = event['item']
+            kind, rid = event['kind'], record_id(item)
+            records = self._records.setdefault(kind, {})
+            order = self._order.setdefault(kind, [])
+            index = self._index.setdefault(kind, {field: {} for field in INDEXED_FIELDS})
+            previous = records.get(rid)
+            key = (created_ts(item), rid)
+            if previous is None:
+                bisect.insort(order, key)
+            else:
+                old_key = (created_ts(previous), rid)
+                if old_key != key:
+                    # 创建时间变化时才调整有序索引（状态更新不移动位置）
+                    i = bisect.bisect_left(order, old_key)
+                    if i < len(order) and order[i] == old_key:
+                        del order[i]
+                    bisect.insort(order, key)
+                for field in INDEXED_FIELDS:
+                    old_value = previous.get(field)
+                    if old_value != item.get(field):
+                        ids = index[field].get(old_value)
+                        if ids is not None:
+                            ids.discard(rid)
+                            if not ids:
+                                del index[field][old_value]
+            for field in INDEXED_FIELDS:
+                index[field].setdefault(item.get(field), set()).add(rid)
+            records[rid] = item
+            if kind in self._rollups:
+                self._track(kind, previous, item)
+        elif op == 'clear':
+            self._records[event['kind']] = {}
+            self._order[event['kind']] = []
+            self._index[event['kind']] = {field: {} for field in INDEXED_FIELDS}
+            if event['kind'] in self._rollups:
+                self._rollups[event['kind']] = {}
+        elif op == 'meta':
+            self._meta[event['key']] = event['value']
+
+    def _track(self, kind, previous, item):
+        """用记录写入前后的差值更新每日汇总"""
+        rows = self._rollups[kind]
+        tz = self._tz()
+        if previous is not None:
+            key = rollups.row_key(created_ts(previous), previous, tz)
+            if rollups.add(rows, key, rollups.contribution(previous), -1)['total'] <= 0:
+                del rows[key]
+        rollups.add(rows, rollups.row_key(created_ts(item), item, tz), rollups.contribution(item))
+
+    def _sync(self):
+        """应用日志中尚未读到的事件（调用方持有 self._lock）"""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # 首次加载，或日志已被压缩替换：从快照重建
+            self._load_snapshot()
+            self._inode = st.st_ino
+            self._offset = 0
+        if st.st_size == self._offset:
+            return
+
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            return
+        for line in chunk[:end].split(b'\n'):
+            if line.strip():
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        self._offset += end + 1
+
+    @contextmanager
+    def _locked(self):
+        """线程锁 + 进程间文件锁，保护 同步-修改-追加"""
+        import fcntl
+
+        with self._lock:
+            with open(self.lock_path, 'w') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _append(self, events):
+        """追加事件并应用到内存视图（调用方持有 _locked）"""
+        data = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in events).encode('utf-8')
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+        for event in events:
+            self._apply(event)
+        self._offset += len(data)
+
+    # ---- Store 接口 ----
+
+    def get(self, kind, item_id):
+        with self._lock:
+            self._sync()
+            item = self._records.get(kind, {}).get(item_id)
+            return dict(item) if item else None
+
+    def list(self, kind, status=None, task_type=None, limit=None):
+        with self._lock:
+            self._sync()
+            records = self._records.get(kind, {})
+            if status is None and task_type is None:
+                # 有序索引已按时间排序，直接倒序取
+                keys = self._order.get(kind, [])[::-1]
+            else:
+                # 只取二级索引命中的记录再排序，开销与筛选结果的数量有关
+                index = self._index.get(kind, {})
+                matches = [index.get(field, {}).get(value, set())
+                           for field, value in (('status', status), ('task_type', task_type)) if value is not None]
+                ids = set.intersection(*matches) if matches else set()
+                keys = sorted(((created_ts(records[rid]), rid) for rid in ids), reverse=True)
+            if limit is not None:
+                keys = keys[:limit]
+            return [dict(records[rid]) for _, rid in keys]
+
+    def page(self, kind, before=None, limit=50, start=None, end=None, task_type=None):
+        # 在有序索引上二分查找游标和时间范围，每页 O(log n + limit)
+        cursor = parse_cursor(before)
+        with self._lock:
+            self._sync()
+            order = self._order.get(kind, [])
+            lo = bisect.bisect_left(order, (start,)) if start is not None else 0
+            hi = bisect.bisect_left(order, (end,)) if end is not None else len(order)
+            if cursor is not None:
+                hi = min(hi, bisect.bisect_left(order, cursor))
+            records = self._records.get(kind, {})
+            if task_type is not None:
+                # 从新到旧扫描区间，取到 limit+1 条匹配的记录为止
+                items = []
+                for _, rid in reversed(order[lo:hi]):
+                    if records[rid].get('task_type') == task_type:
+                        items.append(dict(records[rid]))
+                        if limit is not None and len(items) > limit:
+                            break
+                if limit is None:
+                    return items, None
+                page = items[:limit]
+                return page, (make_cursor(page[-1]) if len(items) > limit else None)
+            first = max(lo, hi - limit) if limit is not None else lo
+            page = [dict(records[rid]) for _, rid in reversed(order[first:hi])]
+        return page, (make_cursor(page[-1]) if first > lo and page else None)
+
+    def upsert(self, kind, items):
+        with self._locked():
+            self._append([{"op": "put", "kind": kind, "item": item} for item in items])
+
+    def insert(self, kind, item):
+        with self._locked():
+            if record_id(item) in self._records.get(kind, {}):
+                return False
+            self._append([{"op": "put", "kind": kind, "item": item}])
+            return True
+
+    def update(self, kind, item_id, changes):
+        with self._locked():
+            current = self._records.get(kind, {}).get(item_id)
+            if current is None:
+                return None
+            item = dict(current)
+            if not self._apply_changes(item, changes):
+                return None
+            self._append([{"op": "put", "kind": kind, "item": item}])
+            return dict(item)
+
+    def replace_all(self, kind, items):
+        with self._locked():
+            events = [{"op": "clear", "kind": kind}]
+            events += [{"op": "put", "kind": kind, "item": item} for item in items]
+            self._append(events)
+
+    def batch(self, kind, ops):
+        with self._locked():
+            records = self._records.get(kind, {})
+            # 本批次中已写入的记录（后面的更新要看到前面的写入）
+            pending = {}
+            results = []
+            seq = self._meta.get(ID_SEQ_KEY, 0)
+            for op in ops:
+                if op[0] == 'create':
+                    item = dict(op[1])
+                    while True:
+                        seq = next_seq(seq)
+                        item['id'] = f"{ID_PREFIX}{seq}"
+                        if item['id'] not in records and item['id'] not in pending:
+                            break
+                else:
+                    current = pending.get(op[1]) or records.get(op[1])
+                    item = dict(current) if current is not None else None
+                    if item is None or not self._apply_changes(item, op[2]):
+                        results.append(None)
+                        continue
+                pending[item['id']] = item
+                results.append(dict(item))
+            events = [{"op": "put", "kind": kind, "item": item} for item in pending.values()]
+            events.append({"op": "meta", "key": ID_SEQ_KEY, "value": seq})
+            self._append(events)
+            return results
+
+    def next_ids(self, count=1):
+        with self._locked():
+            seq = self._meta.get(ID_SEQ_KEY, 0)
+            ids = []
+            for _ in range(count):
+                seq = next_seq(seq)
+                ids.append(f"{ID_PREFIX}{seq}")
+            self._append([{"op": "meta", "key": ID_SEQ_KEY, "value": seq}])
+            return ids
+
+    def rollups(self, kind, first_day=None, last_day=None):
+        with self._lock:
+            self._sync()
+            return rollups.select(self._rollups.get(kind, {}), first_day, last_day)
+
+    def rebuild_rollups(self, kind):
+        with self._lock:
+            self._sync()
+            records = self._records.get(kind, {})
+            self._rollups[kind] = rollups.build(((created_ts(t), t) for t in records.values()), self._tz())
+            return len(self._rollups[kind])
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            self._sync()
+            return self._meta.get(key, default)
+
+    def set_meta(self, key, value):
+        with self._locked():
+            self._append([{"op": "meta", "key": key, "value": value}])
+
+    def version(self, kind):
+        return self._stat_key(self.log_path)
+
+    # ---- 压缩 ----
+
+    def compact(self):
+        """把当前视图写成快照，并用空日志替换旧日志"""
+        with self._locked():
+            snapshot = {
+                "records": {kind: list(items.values()) for kind, items in self._records.items()},
+                "meta": self._meta
+            }
+            tmp_snapshot = self.snapshot_path.with_suffix('.json.tmp')
+            with open(tmp_snapshot, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_snapshot, self.snapshot_path)
+
+            tmp_log = self.log_path.with_suffix('.jsonl.tmp')
+            open(tmp_log, 'wb').close()
+            os.replace(tmp_log, self.log_path)
+            self._inode = os.stat(self.log_path).st_ino
+            self._offset = 0
+
+    def _compact_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                if os.path.getsize(self.log_path) > self.compact_bytes:
+                    size = os.path.getsize(self.log_path)
+                    self.compact()
+                    print(f"✅ 事件日志已压缩（{size // 1024}KB → 快照）")
+            except Exception as e:
+                print(f"❌ 事件日志压缩失败: {e}")
+
+
+class JsonStore(Store):
+    """JSON 文件后端：每次修改整体读写文件（带进程间文件锁，原子替换）"""
+
+    FILES = {
+        'user_tasks': 'user_tasks.json',
+        'task_records': 'tasks.json',
+        'interactions': 'interactions.json',
+        'scheduled_tasks': 'scheduled_tasks.json',
+    }
+    META_FILES = {
+        'system_status': 'system_status.json',
+    }
+    # 每个文件最多保留的记录数
+    MAX_RECORDS = 100
+
+    def __init__(self, data_dir, tz=None):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.tz = tz
+        self._lock = threading.RLock()
+
+    def _path(self, kind):
+        return self.data_dir / self.FILES[kind]
+
+    def _read(self, path, default):
+        if not path.exists():
+            return default
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return default
+
+    def _write(self, path, data):
+        # 写临时文件后原子替换，读者永远不会读到半个文件
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self, path):
+        """线程锁 + 进程间文件锁，保护一次完整的读-改-写"""
+        import fcntl
+
+        with self._lock:
+            lock_path = path.with_name('.' + path.name + '.lock')
+            with open(lock_path, 'w') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _trim(self, items):
+        if len(items) > self.MAX_RECORDS:
+            items.sort(key=created_ts, reverse=True)
+            del items[self.MAX_RECORDS:]
+        return items
+
+    def get(self, kind, item_id):
+        for item in self._read(self._path(kind), []):
+            if record_id(item) == item_id:
+                return item
+        return None
+
+    def list(self, kind, status=None, task_type=None, limit=None):
+        items = self._read(self._path(kind), [])
+        if status is not None:
+            items = [t for t in items if t.get('status') == status]
+        if task_type is not None:
+            items = [t for t in items if t.get('task_type') == task_type]
+        items.sort(key=created_ts, reverse=True)
+        return items[:limit] if limit is not None else items
+
+    def upsert(self, kind, items):
+        path = self._path(kind)
+        with self._locked(path):
+            existing = self._read(path, [])
+            index = {record_id(t): i for i, t in enumerate(existing)}
+            added = {}
+            for item in items:
+                item_id = record_id(item)
+                i = index.get(item_id)
+                if i is not None:
+                    existing[i] = item
+                else:
+                    added[item_id] = item
+            # 新记录放在最前面
+            existing[:0] = reversed(list(added.values()))
+            self._write(path, self._trim(existing))
+
+    def insert(self, kind, item):
+        path = self._path(kind)
+        with self._locked(path):
+            existing = self._read(path, [])
+            item_id = record_id(item)
+            if any(record_id(t) == item_id for t in existing):
+                return False
+            existing.insert(0, item)
+            self._write(path, self._trim(existing))
+            return True
+
+    def update(self, kind, item_id, changes):
+        path = self._path(kind)
+        with self._locked(path):
+            existing = self._read(path, [])
+            for item in existing:
+                if record_id(item) == item_id:
+                    if not self._apply_changes(item, changes):
+                        return None
+                    self._write(path, existing)
+                    return item
+            return None
+
+    def replace_all(self, kind, items):
+        path = self._path(kind)
+        with self._locked(path):
+            self._write(path, self._trim(list(items)))
+
+    def batch(self, kind, ops):
+        path = self._path(kind)
+        with self._locked(path):
+            existing = self._read(path, [])
+            index = {record_id(t): t for t in existing}
+            results = []
+            created = []
+            with self._locked(self._meta_path(ID_SEQ_KEY)):
+                seq = self.get_meta(ID_SEQ_KEY, 0)
+                for op in ops:
+                    if op[0] == 'create':
+                        item = dict(op[1])
+                        while True:
+                            seq = next_seq(seq)
+                            item['id'] = f"{ID_PREFIX}{seq}"
+                            if item['id'] not in index:
+                                break
+                        index[item['id']] = item
+                        created.append(item)
+                        results.append(item)
+                    else:
+                        item = index.get(op[1])
+                        if item is None or not self._apply_changes(item, op[2]):
+                            results.append(None)
+                            continue
+                        results.append(item)
+                self._write(self._meta_path(ID_SEQ_KEY), seq)
+            # 新记录放在最前面
+            existing[:0] = reversed(created)
+            self._write(path, self._trim(existing))
+            return [dict(item) if item is not None else None for item in results]
+
+    def next_ids(self, count=1):
+        path = self._meta_path(ID_SEQ_KEY)
+        with self._locked(path):
+            seq = self.get_meta(ID_SEQ_KEY, 0)
+            ids = []
+            for _ in range(count):
+                seq = next_seq(seq)
+                ids.append(f"{ID_PREFIX}{seq}")
+            self._write(path, seq)
+            return ids
+
+    def _meta_path(self, key):
+        return self.data_dir / self.META_FILES.get(key, f'{key}.json')
+
+    def get_meta(self, key, default=None):
+        return self._read(self._meta_path(key), default)
+
+    def set_meta(self, key, value):
+        path = self._meta_path(key)
+        with self._locked(path):
+            self._write(path, value)
+
+    def version(self, kind):
+        return self._stat_key(self._path(kind))
+
+
+def load_config(config_path=None):
+    """读取配置文件，不存在时返回空配置"""
+    config_path = Path(config_path) if config_path else PROJECT_ROOT / 'config.json'
+    if config_path.exists():
+        with open(config_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(config=None, data_dir=None):
+    """按配置打开存储（同一进程内相同配置共享一个实例）
+
+    config.json:
+        "storage": {"backend": "sqlite" | "eventlog" | "json", "path": "data/dailyreport.db"}
+    """
+    if config is None:
+        config = load_config()
+    data_dir = Path(data_dir) if data_dir else PROJECT_ROOT / 'data'
+    storage_config = config.get('storage', {})
+    backend = storage_config.get('backend', 'sqlite')
+    # 每日汇总按 data.timezone 划分日期，与 today/week/month 的日历一致
+    tz = parse_tz(config.get('data', {}).get('timezone'))
+
+    if backend in ('json', 'eventlog'):
+        key = (backend, str(data_dir))
+    elif backend == 'sqlite':
+        db_path = Path(storage_config.get('path', data_dir / 'dailyreport.db'))
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        key = ('sqlite', str(db_path))
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == 'json':
+                store = JsonStore(data_dir, tz=tz)
+            else:
+                if backend == 'eventlog':
+                    store = EventLogStore(
+                        data_dir,
+                        compact_bytes=storage_config.get('compact_bytes', 4 * 1024 * 1024),
+                        compact_interval=storage_config.get('compact_interval', 60),
+                        tz=tz)
+                else:
+                    store = SQLiteStore(db_path, tz=tz)
+                if store.created:
+                    # 新建存储时自动导入旧的 JSON 数据
+                    counts = migrate_json(data_dir, store)
+                    if any(counts.values()):
+                        print(f"✅ 已从JSON文件导入数据: {counts}")
+            _stores[key] = store
+        return store
+
+
+def migrate_json(data_dir, store):
+    """把 JSON 文件中的数据导入到 store（按ID覆盖，可重复执行）
+
+    Returns:
+        每个集合导入的记录数
+    """
+    source = JsonStore(data_dir)
+    counts = {}
+    for kind in KINDS:
+        items = source._read(source._path(kind), [])
+        if items:
+            store.upsert(kind, items)
+        counts[kind] = len(items)
+
+    for key in JsonStore.META_FILES:
+        value = source.get_meta(key)
+        if value is not None:
+            store.set_meta(key, value)
+    return counts
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+实时推送 - Server-Sent Events 的事件总线和变化发布线程
+
+- EventBus: 进程内发布/订阅，每个 SSE 连接一个有界队列
+- StreamPublisher: 有订阅者时，定期（或被写操作唤醒时）对比任务、统计、系统状态的变化并推送
+"""
+import queue
+import threading
+import time
+
+
+class EventBus:
+    # 每个订阅者最多积压的事件数，慢客户端超出后丢弃最旧的事件
+    MAX_PENDING = 100
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def subscribe(self, time_filter='today'):
+        """订阅事件，返回事件队列"""
+        q = queue.Queue(maxsize=self.MAX_PENDING)
+        with self._lock:
+            self._subscribers[q] = time_filter
+        self._wakeup.set()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def active_filters(self):
+        """当前订阅者关心的时间筛选条件"""
+        with self._lock:
+            return set(self._subscribers.values())
+
+    def publish(self, event_type, data, time_filter=None):
+        """发布事件；指定 time_filter 时只发给该筛选条件的订阅者"""
+        event = (event_type, data)
+        with self._lock:
+            targets = [q for q, f in self._subscribers.items()
+                       if time_filter is None or f == time_filter]
+        for q in targets:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def notify(self):
+        """数据已变化，唤醒发布线程立即检查"""
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        """发布线程等待下一次检查（被 notify 唤醒或超时）"""
+        woken = self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return woken
+
+
+class StreamPublisher:
+    # 任务变化对比时关注的字段
+    TASK_FIELDS = ('status', 'result', 'description', 'end_time')
+
+    def __init__(self, collector, bus, interval=2, system_interval=10):
+        """
+        Args:
+            collector: 共享的 DataCollector 实例
+            bus: EventBus
+            interval: 检查任务和统计变化的间隔（秒）
+            system_interval: 推送系统状态的间隔（秒）
+        """
+        self.collector = collector
+        self.bus = bus
+        self.interval = interval
+        self.system_interval = system_interval
+        self._task_snapshot = None
+        self._stats = {}
+        # 上次推送系统状态的时间（数据变化提前唤醒时不计入间隔）
+        self._last_system = None
+        self._thread = threading.Thread(target=self._run, name='stream-publisher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _publish_tasks(self):
+        """对比最近任务的状态，推送新建和更新"""
+        tasks = self.collector.store.list('user_tasks', limit=200)
+        snapshot = {t.get('id'): tuple(t.get(k) for k in self.TASK_FIELDS) for t in tasks}
+
+        if self._task_snapshot is not None:
+            # 按时间正序推送，客户端依次插入后最新的在最前
+            for task in reversed(tasks):
+                previous = self._task_snapshot.get(task.get('id'))
+                if previous is None:
+                    self.bus.publish('task', {"action": "created", "task": task})
+                elif previous != snapshot[task.get('id')]:
+                    self.bus.publish('task', {"action": "updated", "task": task})
+        self._task_snapshot = snapshot
+
+    def _publish_stats(self):
+        """推送有变化的统计数据（完整值 + 变化量）"""
+        for time_filter in self.bus.active_filters():
+            stats = self.collector.get_stats(time_filter)
+            previous = self._stats.get(time_filter)
+            if stats != previous:
+                delta = {k: v - (previous or {}).get(k, 0) for k, v in stats.items()
+                         if isinstance(v, (int, float)) and v != (previous or {}).get(k)}
+                self.bus.publish('stats', {"filter": time_filter, "stats": stats, "delta": delta},
+                                 time_filter=time_filter)
+                self._stats[time_filter] = stats
+
+    def _publish_system(self):
+        self.bus.publish('system', self.collector.get_system_status())
+
+    def _run(self):
+        while True:
+            self.bus.wait(self.interval)
+            if not self.bus.has_subscribers():
+                # 没有客户端时不做任何工作，下次有人订阅时重新建立基线
+                self._task_snapshot = None
+                self._stats = {}
+                self._last_system = None
+                continue
+
+            try:
+                self._publish_tasks()
+                self._publish_stats()
+
+                now = time.monotonic()
+                if self._last_system is None or now - self._last_system >= self.system_interval:
+                    self._publish_system()
+                    self._last_system = now
+            except Exception as e:
+                print(f"❌ 推送失败: {e}")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+任务总结 - 规则总结立即返回，LLM 总结在后台线程池中完成后回填
+
+- summarize_task: 规则总结（去掉客套话、截断），创建任务时直接作为描述
+- TaskSummarizer: 有界队列 + 固定数量的工作线程调用 `openclaw message`，
+  每次调用有截止时间（排队超过截止时间的直接放弃，保留规则总结）；
+  结果按消息内容的哈希缓存在 data/summary_cache.json（LRU），重复的消息不再调用 LLM。
+"""
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+PROMPT = """请将以下用户消息总结为一个简洁的任务描述（30字以内）：
+
+用户消息：{message}
+
+要求：
+1. 提取核心任务
+2. 去除客套话（帮我、请等）
+3. 简洁明了
+4. 只要任务描述，不要其他内容
+
+任务描述："""
+
+
+def summarize_task(user_message):
+    """简单规则总结任务"""
+    # 去除常见前缀
+    prefixes = ['帮我', '请', '麻烦', '能否', '可以', '帮我查下', '帮我查']
+    desc = user_message.strip()
+
+    for prefix in prefixes:
+        if desc.startswith(prefix):
+            desc = desc[len(prefix):].strip()
+            break
+
+    # 去除标点
+    desc = desc.lstrip('，,。.!！')
+
+    # 限制长度
+    if len(desc) > 40:
+        desc = desc[:37] + '...'
+
+    return desc if desc else user_message[:30]
+
+
+def content_key(user_message):
+    """缓存键：消息内容的哈希"""
+    return hashlib.sha1(user_message.encode('utf-8')).hexdigest()
+
+
+def call_llm(user_message, timeout):
+    """调用 OpenClaw 总结任务描述，失败返回None"""
+    result = subprocess.run(
+        ['openclaw', 'message', '--channel', 'telegram', '--to', 'main',
+         '--message', PROMPT.format(message=user_message)],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    if result.returncode != 0:
+        return None
+    task_desc = result.stdout.strip()
+    # 清理可能的输出
+    if len(task_desc) > 50:
+        task_desc = task_desc[:47] + '...'
+    return task_desc or None
+
+
+class SummaryCache:
+    """按内容哈希缓存的 LRU，持久化到 JSON 文件（写临时文件后原子替换）"""
+
+    def __init__(self, path, capacity=2000, flush_interval=5.0):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._last_flush = float('-inf')
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for key, summary in json.load(f).get('entries', []):
+                    self._entries[key] = summary
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError, ValueError):
+            pass
+
+    def get(self, key):
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+            return summary
+
+    def put(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def flush(self, force=False):
+        with self._lock:
+            if not self._dirty:
+                return False
+            if not force and time.monotonic() - self._last_flush < self.flush_interval:
+                return False
+            data = json.dumps({"entries": list(self._entries.items())}, ensure_ascii=False)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class TaskSummarizer:
+    """
+    用法:
+        summarizer = TaskSummarizer(data_dir)
+        desc = summarizer.cached(text) or summarize_task(text)   # 立即可用的描述
+        ...保存任务...
+        if 没有缓存: summarizer.submit(text, on_summary)      # LLM 完成后在工作线程中回填
+    """
+
+    def __init__(self, data_dir=None, workers=2, queue_size=100, call_timeout=10, deadline=60,
+                 cache_size=2000, llm=call_llm):
+        """
+        Args:
+            data_dir: 数据目录，默认项目的 data/
+            workers: 同时调用 LLM 的线程数
+            queue_size: 最多排队的消息数，队列满时只使用规则总结
+            call_timeout: 单次 LLM 调用的超时（秒）
+            deadline: 从提交到完成的截止时间（秒），排队超时的不再调用
+            cache_size: 缓存的总结条数
+            llm: 调用 LLM 的函数 (user_message, timeout) -> 描述或None
+        """
+        data_dir = Path(data_dir) if data_dir else Path(__file__).parent.parent / 'data'
+        self.cache = SummaryCache(data_dir / 'summary_cache.json', capacity=cache_size)
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.llm = llm
+        self.stats = {"cache_hits": 0, "submitted": 0, "completed": 0, "failed": 0,
+                      "expired": 0, "dropped": 0}
+        self._queue = queue.Queue(maxsize=queue_size)
+        # 内容哈希 -> 等待结果的回调（同样的消息排队中只调用一次 LLM）
+        self._waiting = {}
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._run, name=f'summarizer-{i}', daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def cached(self, user_message):
+        """缓存中的 LLM 总结，没有返回None"""
+        summary = self.cache.get(content_key(user_message))
+        if summary is not None:
+            with self._lock:
+                self.stats['cache_hits'] += 1
+        return summary
+
+    def submit(self, user_message, on_summary):
+        """在后台请求 LLM 总结，立即返回
+
+        Args:
+            user_message: 用户消息
+            on_summary: LLM 返回后调用 on_summary(描述)（在工作线程中）；失败或超时不调用
+
+        Returns:
+            是否已排队（队列满时返回False，调用方保留规则总结）
+        """
+        key = content_key(user_message)
+        with self._lock:
+            callbacks = self._waiting.get(key)
+            if callbacks is not None:
+                # 同样的内容已在排队，结果返回时一起回填
+                callbacks.append(on_summary)
+                return True
+            self._waiting[key] = [on_summary]
+            self.stats['submitted'] += 1
+
+        try:
+            self._queue.put_nowait((key, user_message, time.monotonic() + self.deadline))
+        except queue.Full:
+            with self._lock:
+                self._waiting.pop(key, None)
+                self.stats['dropped'] += 1
+            return False
+        return True
+
+    def pending(self):
+        """排队和处理中的消息数"""
+        with self._lock:
+            return len(self._waiting)
+
+    def flush(self, force=False):
+        """写入缓存（距上次写入不足间隔时跳过，除非 force）"""
+        return self.cache.flush(force)
+
+    def _run(self):
+        while True:
+            key, user_message, deadline = self._queue.get()
+            # 排队期间可能已有同样内容的总结写入缓存
+            summary = self.cache.get(key)
+            if summary is not None:
+                outcome = 'cache_hits'
+            else:
+                outcome = 'expired'
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    try:
+                        summary = self.llm(user_message, min(self.call_timeout, remaining))
+                    except Exception as e:
+                        print(f"LLM总结失败: {e}")
+                    outcome = 'completed' if summary else 'failed'
+
+            if summary:
+                # 先写缓存再移出等待表，期间提交的同样内容不会再次调用 LLM
+                self.cache.put(key, summary)
+            with self._lock:
+                callbacks = self._waiting.pop(key, [])
+                self.stats[outcome] += 1
+            if not summary:
+                continue
+
+            for callback in callbacks:
+                try:
+                    callback(summary)
+                except Exception as e:
+                    print(f"❌ 回填任务描述失败: {e}")
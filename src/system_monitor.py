@@ -1,30 +1,244 @@
 #!/usr/bin/env python3
 """
 系统监控模块 - 持续监控系统状态
+
+采样结果写入内存中的时间序列（1秒 / 1分钟 / 1小时三级环形缓冲区），
+分钟和小时级数据定期持久化到存储，查询历史不读磁盘。
 """
-import json
+import array
+import re
+import threading
 import time
 from pathlib import Path
 from datetime import datetime
 
+from store import load_config, open_store
+
+# 记录历史的指标（均为数值）
+METRICS = ('cpu_percent', 'memory_percent', 'tokens_total', 'uptime_seconds')
+
+
+class MetricRing:
+    """固定容量的时间序列环形缓冲区（array 存储，内存有界）
+
+    每个槽位对应一个 step 秒的时间桶，同一个桶内的多个样本取平均值。
+    """
+
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.times = array.array('d', [0.0]) * capacity
+        self.counts = array.array('L', [0]) * capacity
+        self.values = {m: array.array('d', [0.0]) * capacity for m in METRICS}
+        self.size = 0
+        self.head = 0  # 下一个写入位置
+
+    def add(self, ts, sample, count=1):
+        """写入一个样本；与最新槽位同一时间桶时合并为平均值"""
+        bucket = ts - ts % self.step
+        last = (self.head - 1) % self.capacity
+        if self.size and self.times[last] == bucket:
+            n = self.counts[last]
+            for m in METRICS:
+                self.values[m][last] = (self.values[m][last] * n + sample[m] * count) / (n + count)
+            self.counts[last] = n + count
+            return
+        if self.size and bucket < self.times[last]:
+            # 时钟回拨或乱序样本，直接丢弃
+            return
+
+        i = self.head
+        self.times[i] = bucket
+        self.counts[i] = count
+        for m in METRICS:
+            self.values[m][i] = sample[m]
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def slots(self, since=0):
+        """按时间正序返回 since 之后的槽位下标"""
+        start = (self.head - self.size) % self.capacity
+        indexes = [(start + k) % self.capacity for k in range(self.size)]
+        return [i for i in indexes if self.times[i] >= since]
+
+    def oldest(self):
+        if not self.size:
+            return None
+        return self.times[(self.head - self.size) % self.capacity]
+
+    def to_dict(self):
+        indexes = self.slots()
+        data = {
+            "step": self.step,
+            "t": [self.times[i] for i in indexes],
+            "n": [self.counts[i] for i in indexes],
+        }
+        for m in METRICS:
+            data[m] = [self.values[m][i] for i in indexes]
+        return data
+
+    def load(self, data):
+        for k, ts in enumerate(data.get('t', [])):
+            try:
+                sample = {m: data[m][k] for m in METRICS}
+                self.add(ts, sample, data.get('n', [1] * (k + 1))[k])
+            except (KeyError, IndexError, TypeError):
+                continue
+
+
 class SystemMonitor:
-    def __init__(self, config_path):
+    # 三级分辨率：名称 → (桶秒数, 容量)
+    RESOLUTIONS = {
+        '1s': (1, 3600),       # 最近1小时
+        '1m': (60, 1440),      # 最近1天
+        '1h': (3600, 720),     # 最近30天
+    }
+    # 持久化的分辨率（秒级数据重启后价值不大，不保存）
+    PERSISTED = ('1m', '1h')
+
+    def __init__(self, config_path, persist_interval=60):
+        """
+        Args:
+            config_path: 配置文件路径
+            persist_interval: 历史数据持久化间隔（秒）
+        """
         self.data_dir = Path(__file__).parent.parent / 'data'
         self.data_dir.mkdir(exist_ok=True)
-        self.status_file = self.data_dir / 'system_status.json'
+        self.store = open_store(load_config(config_path), self.data_dir)
+        self.persist_interval = persist_interval
+        self.rings = {name: MetricRing(step, capacity)
+                      for name, (step, capacity) in self.RESOLUTIONS.items()}
+        self._latest = None
+        self._lock = threading.Lock()
+        self._last_persist = time.time()
+        self._load_history()
 
     def update_status(self, status_data):
         """更新系统状态"""
         status_data['last_update'] = datetime.now().isoformat()
-
-        with open(self.status_file, 'w') as f:
-            json.dump(status_data, f, indent=2, ensure_ascii=False)
-
+        self.store.set_meta('system_status', status_data)
         return status_data
 
     def get_status(self):
         """获取当前系统状态"""
-        if self.status_file.exists():
-            with open(self.status_file, 'r') as f:
-                return json.load(f)
-        return {}
+        with self._lock:
+            if self._latest is not None:
+                return dict(self._latest)
+        return self.store.get_meta('system_status', {})
+
+    def record(self, status, ts=None):
+        """记录一次采样（由采样线程调用），到达间隔时持久化"""
+        ts = ts if ts is not None else status.get('sampled_at', time.time())
+        sample = {m: float(status.get(m) or 0) for m in METRICS}
+        with self._lock:
+            self._latest = dict(status)
+            for ring in self.rings.values():
+                ring.add(ts, sample)
+
+        if ts - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    def persist(self):
+        """把分钟和小时级历史以及最新状态写入存储"""
+        with self._lock:
+            history = {name: self.rings[name].to_dict() for name in self.PERSISTED}
+            latest = self._latest
+        self._last_persist = time.time()
+        try:
+            self.store.set_meta('system_history', history)
+            if latest is not None:
+                self.update_status(dict(latest))
+        except Exception as e:
+            print(f"❌ 保存系统历史失败: {e}")
+
+    def _load_history(self):
+        try:
+            history = self.store.get_meta('system_history', {}) or {}
+        except Exception as e:
+            print(f"⚠️  读取系统历史失败: {e}")
+            return
+        for name in self.PERSISTED:
+            if name in history:
+                self.rings[name].load(history[name])
+
+    def history(self, range_seconds=3600, step_seconds=None):
+        """查询历史（列式数据，便于绘制迷你图）
+
+        选择能覆盖整个时间范围的最细分辨率；请求的 step 比分辨率粗时再按 step 合并。
+
+        Args:
+            range_seconds: 时间范围（秒）
+            step_seconds: 数据点间隔（秒），默认使用所选分辨率
+        """
+        now = time.time()
+        since = now - range_seconds
+
+        with self._lock:
+            name = self._pick_resolution(since, range_seconds, step_seconds)
+            ring = self.rings[name]
+            indexes = ring.slots(since)
+            times = [ring.times[i] for i in indexes]
+            counts = [ring.counts[i] for i in indexes]
+            columns = {m: [ring.values[m][i] for i in indexes] for m in METRICS}
+
+        step = ring.step
+        if step_seconds and step_seconds > step:
+            times, columns = self._downsample(times, counts, columns, step_seconds)
+            step = step_seconds
+
+        return {
+            "range": range_seconds,
+            "step": step,
+            "resolution": name,
+            "t": times,
+            **{m: [round(v, 2) for v in columns[m]] for m in METRICS}
+        }
+
+    def _pick_resolution(self, since, range_seconds, step_seconds):
+        candidates = sorted(self.RESOLUTIONS.items(), key=lambda item: item[1][0])
+        if step_seconds:
+            # 不使用比请求 step 更粗的分辨率
+            fine = [c for c in candidates if c[1][0] <= step_seconds]
+            candidates = fine or candidates[:1]
+        for name, (step, capacity) in candidates:
+            oldest = self.rings[name].oldest()
+            if step * capacity >= range_seconds or (oldest is not None and oldest <= since):
+                return name
+        return candidates[-1][0]
+
+    def _downsample(self, times, counts, columns, step):
+        """按 step 把相邻槽位合并为加权平均"""
+        out_times = []
+        out = {m: [] for m in METRICS}
+        sums = None
+        current = None
+        total = 0
+        for k, ts in enumerate(times):
+            bucket = ts - ts % step
+            if bucket != current:
+                if current is not None:
+                    out_times.append(current)
+                    for m in METRICS:
+                        out[m].append(sums[m] / total)
+                current, total = bucket, 0
+                sums = {m: 0.0 for m in METRICS}
+            n = counts[k] or 1
+            total += n
+            for m in METRICS:
+                sums[m] += columns[m][k] * n
+        if current is not None:
+            out_times.append(current)
+            for m in METRICS:
+                out[m].append(sums[m] / total)
+        return out_times, out
+
+
+def parse_duration(value, default):
+    """解析 "90" / "30s" / "15m" / "6h" / "7d" 为秒数"""
+    if not value:
+        return default
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd]?)', value.strip())
+    if not match:
+        raise ValueError(f"无效的时间参数: {value}")
+    number, unit = match.groups()
+    return float(number) * {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[unit]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+系统状态采样线程 - 按固定间隔在后台采集系统状态，请求直接读取最新样本
+"""
+import collections
+import threading
+import time
+
+
+class SystemSampler:
+    def __init__(self, collector, interval=5, history=720, monitor=None):
+        """
+        Args:
+            collector: 共享的 DataCollector 实例（提供实际的采集方法）
+            interval: 采样间隔（秒）
+            history: 环形缓冲区保留的样本数
+            monitor: 可选的 SystemMonitor，每个样本写入其时间序列
+        """
+        self.collector = collector
+        self.monitor = monitor
+        self.interval = interval
+        self.samples = collections.deque(maxlen=history)
+        self._latest = None
+        # 已完成的采样次数，每次采样加一（用于缓存失效）
+        self.ticks = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self):
+        """最新样本的副本；第一次采样完成前返回None"""
+        with self._lock:
+            return dict(self._latest) if self._latest is not None else None
+
+    def history(self):
+        """缓冲区中的全部样本（按时间正序）"""
+        with self._lock:
+            return list(self.samples)
+
+    def sample_once(self):
+        sample = self.collector.collect_system_status(cpu_interval=None)
+        sample['sampled_at'] = time.time()
+        with self._lock:
+            self._latest = sample
+            self.samples.append(sample)
+            self.ticks += 1
+        if self.monitor is not None:
+            self.monitor.record(sample)
+        return sample
+
+    def _run(self):
+        # psutil 非阻塞模式下第一次调用只是建立基线
+        self.collector._get_system_resources(cpu_interval=None)
+        while not self._stop.is_set():
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"❌ 系统状态采样失败: {e}")
+            self._stop.wait(self.interval)
@@ -2,23 +2,25 @@
 """
 任务追踪装饰器 - 自动记录任务执行状态
 """
-import json
 import time
 import functools
 from datetime import datetime
 from pathlib import Path
 
+from store import open_store
+
 class TaskTracker:
     def __init__(self):
         self.data_dir = Path(__file__).parent.parent / 'data'
         self.data_dir.mkdir(exist_ok=True)
-        self.tasks_file = self.data_dir / 'tasks.json'
+        self.store = open_store(data_dir=self.data_dir)
 
     def track(self, func):
         """装饰器：追踪任务执行"""
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            task_id = f"task_{int(time.time() * 1000)}"
+            # ID由存储分配（跨进程单调递增，与服务器创建的任务不会重复）
+            task_id = self.store.next_ids(1)[0]
             start_time = time.time()
             timestamp = datetime.now().isoformat()
 
@@ -184,41 +186,11 @@ class TaskTracker:
             return "执行了命令"
 
     def _save_task(self, task):
-        """保存任务到JSON文件"""
-        tasks = []
-
-        # 读取现有任务
-        if self.tasks_file.exists():
-            with open(self.tasks_file, 'r') as f:
-                try:
-                    tasks = json.load(f)
-                except:
-                    tasks = []
-
-        # 更新或添加任务
-        existing_index = next((i for i, t in enumerate(tasks) if t.get('id') == task['id']), None)
-
-        if existing_index is not None:
-            tasks[existing_index] = task
-        else:
-            tasks.append(task)
-
-        # 保存
-        with open(self.tasks_file, 'w') as f:
-            json.dump(tasks, f, indent=2, ensure_ascii=False)
+        """保存任务记录（按ID覆盖或新增）"""
+        self.store.upsert('task_records', [dict(task)])
 
     def record_interaction(self, user_message, bot_response, session_type='telegram'):
         """记录用户互动"""
-        interactions_file = self.data_dir / 'interactions.json'
-
-        interactions = []
-        if interactions_file.exists():
-            with open(interactions_file, 'r') as f:
-                try:
-                    interactions = json.load(f)
-                except:
-                    interactions = []
-
         interaction = {
             "timestamp": datetime.now().isoformat(),
             "user_message": user_message[:200],  # 限制长度
@@ -226,14 +198,7 @@ class TaskTracker:
             "session_type": session_type
         }
 
-        interactions.append(interaction)
-
-        # 保持最近100条
-        if len(interactions) > 100:
-            interactions = interactions[-100:]
-
-        with open(interactions_file, 'w') as f:
-            json.dump(interactions, f, indent=2, ensure_ascii=False)
+        self.store.upsert('interactions', [interaction])
 
 
 # 全局实例
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+时间工具 - 把各种格式的时间戳统一为 epoch 毫秒整数，并把时间筛选条件解析为区间
+
+记录的时间字段可能是：
+- ISO 字符串，带时区（"2026-02-06T00:37:00.000Z" / "+08:00"）或不带时区（按服务器本地时间）
+- Unix 时间戳（秒或毫秒）
+入库时统一转换一次，之后的排序和范围查询都只比较整数。
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+TIME_FILTERS = ('today', 'week', 'month', 'all')
+
+_OFFSET = re.compile(r'^(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$')
+
+
+def to_epoch_ms(value):
+    """时间戳 → epoch 毫秒；无法解析返回None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # 小于 1e11 视为秒
+        return int(value * 1000) if abs(value) < 1e11 else int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.isdigit():
+            return to_epoch_ms(int(text))
+        try:
+            dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            # 没有时区信息的时间按服务器本地时间处理
+            dt = dt.astimezone()
+        return int(dt.timestamp() * 1000)
+    return None
+
+
+def parse_tz(name):
+    """解析时区参数：IANA 名称（Asia/Shanghai）、UTC 或 +08:00 形式的偏移；空值为服务器本地时区
+
+    Raises:
+        ValueError: 无法识别的时区
+    """
+    if not name:
+        return datetime.now().astimezone().tzinfo
+    name = name.strip()
+    if name.upper() in ('UTC', 'Z', 'GMT'):
+        return timezone.utc
+    match = _OFFSET.match(name)
+    if match:
+        sign, hours, minutes = match.groups()
+        delta = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        return timezone(-delta if sign == '-' else delta)
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        raise ValueError(f"无法识别的时区: {name}")
+
+
+def parse_time_param(value, tz=None):
+    """解析 from/to 参数：epoch（秒或毫秒）、日期（2026-02-06）或 ISO 时间；不带时区时按 tz 解释
+
+    Raises:
+        ValueError: 无法解析
+    """
+    if value is None or value == '':
+        return None
+    text = value.strip()
+    if re.fullmatch(r'-?\d+(\.\d+)?', text):
+        return to_epoch_ms(float(text))
+    try:
+        dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"无法解析的时间: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz or parse_tz(None))
+    return int(dt.timestamp() * 1000)
+
+
+def filter_range(time_filter, tz=None, now=None):
+    """today/week/month/all → (start_ms, end_ms)，按 tz（默认服务器本地时区）的日历计算；
+    end_ms 为None表示不限
+
+    已经是区间的 (start_ms, end_ms) 原样返回。
+    """
+    if isinstance(time_filter, tuple):
+        return time_filter
+    tz = tz or parse_tz(None)
+    now = now or datetime.now(tz)
+
+    if time_filter == 'today':
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif time_filter == 'week':
+        start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif time_filter == 'month':
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:  # all
+        return (None, None)
+    return (int(start.timestamp() * 1000), None)
+
+
+def in_range(ts, time_range):
+    """ts 是否在 [start, end) 区间内；ts 为None（无法解析）时不在任何有界区间内"""
+    start, end = time_range
+    if start is None and end is None:
+        return True
+    if ts is None:
+        return False
+    return (start is None or ts >= start) and (end is None or ts < end)
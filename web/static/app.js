@@ -2,14 +2,25 @@
 
 let currentFilter = 'today';
 let autoRefresh = null;
+let eventSource = null;
+let streamInterrupted = false;
+let currentTasks = [];
+// 任务列表的条数上限（服务器的 data.max_tasks_display，由 X-Max-Tasks 头下发）
+let maxTasks = 50;
+// 上次渲染的筛选条件、ETag 和各部分内容版本（用于条件请求和跳过未变化部分的渲染）
+let renderedFilter = null;
+let renderedEtag = null;
+let renderedVersions = {};
+// 系统状态单独从 /api/system 获取（/api/data 默认不含 system），同样带 ETag
+let systemEtag = null;
 
 // 初始化
 document.addEventListener('DOMContentLoaded', () => {
     // 初始加载数据
     refreshData();
 
-    // 设置自动刷新（30秒）
-    autoRefresh = setInterval(refreshData, 30000);
+    // 实时推送（不支持时退回30秒轮询）
+    startStream();
 
     // 绑定筛选按钮
     document.querySelectorAll('.filter-btn').forEach(btn => {
@@ -21,6 +32,8 @@ document.addEventListener('DOMContentLoaded', () => {
             // 更新筛选条件
             currentFilter = e.target.dataset.filter;
             refreshData();
+            // 按新的筛选条件重新订阅统计推送
+            if (eventSource) startStream();
         });
     });
 
@@ -31,14 +44,26 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // 刷新数据
 async function refreshData() {
+    refreshSystem();
     try {
         console.log('🔄 开始刷新数据，筛选条件:', currentFilter);
         const url = `/api/data/${currentFilter}`;
         console.log('📡 请求URL:', url);
 
-        const response = await fetch(url);
+        // 页面显示的就是该筛选条件时带上 ETag，数据未变化则服务器返回 304
+        const headers = {};
+        if (renderedFilter === currentFilter && renderedEtag) {
+            headers['If-None-Match'] = renderedEtag;
+        }
+        // no-store: 让 304 直接交给脚本处理，而不是由浏览器缓存透明地换成 200
+        const response = await fetch(url, { headers, cache: 'no-store' });
         console.log('📡 响应状态:', response.status);
 
+        if (response.status === 304) {
+            console.log('✅ 数据未变化，跳过解析和渲染');
+            return;
+        }
+
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
@@ -50,11 +75,25 @@ async function refreshData() {
             failed: data.stats?.failed || 0
         });
 
-        updateSystemStatus(data.system);
-        updateStats(data.stats);
-        updateTasks(data.tasks);
-        updateInteractions(data.interactions);
-        updateReflection(data.reflection);
+        // 同一筛选条件下只重新渲染内容版本变化的部分
+        const versions = parseContentVersions(response.headers.get('X-Content-Versions'));
+        const limit = parseInt(response.headers.get('X-Max-Tasks'), 10);
+        if (limit > 0) maxTasks = limit;
+        const sameFilter = renderedFilter === currentFilter;
+        const changed = (name) => !sameFilter || !versions[name] || versions[name] !== renderedVersions[name];
+
+        if (data.system && changed('system')) updateSystemStatus(data.system);
+        if (changed('stats')) updateStats(data.stats);
+        if (changed('tasks')) {
+            currentTasks = data.tasks || [];
+            updateTasks(currentTasks);
+        }
+        if (changed('interactions')) updateInteractions(data.interactions);
+        if (changed('reflection')) updateReflection(data.reflection);
+
+        renderedFilter = currentFilter;
+        renderedEtag = response.headers.get('ETag');
+        renderedVersions = versions;
 
         console.log('✅ 页面更新完成');
     } catch (error) {
@@ -63,6 +102,118 @@ async function refreshData() {
     }
 }
 
+// 刷新系统状态（实时推送连接后由 system 事件更新）
+async function refreshSystem() {
+    try {
+        const headers = systemEtag ? { 'If-None-Match': systemEtag } : {};
+        const response = await fetch('/api/system', { headers, cache: 'no-store' });
+        if (response.status === 304) return;
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        updateSystemStatus(await response.json());
+        systemEtag = response.headers.get('ETag');
+    } catch (error) {
+        console.error('❌ 刷新系统状态失败:', error);
+    }
+}
+
+// 解析 "system=3,stats=7,..." 形式的内容版本头
+function parseContentVersions(header) {
+    const versions = {};
+    (header || '').split(',').forEach(part => {
+        const [name, version] = part.split('=');
+        if (name && version) versions[name.trim()] = version.trim();
+    });
+    return versions;
+}
+
+// ========== 实时推送（SSE） ==========
+function startPolling() {
+    if (!autoRefresh) {
+        autoRefresh = setInterval(refreshData, 30000);
+    }
+}
+
+function stopPolling() {
+    if (autoRefresh) {
+        clearInterval(autoRefresh);
+        autoRefresh = null;
+    }
+}
+
+function startStream() {
+    stopStream();
+
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    eventSource = new EventSource(`/api/stream?filter=${currentFilter}`);
+
+    eventSource.addEventListener('open', () => {
+        console.log('📡 实时推送已连接');
+        stopPolling();
+        // 断线期间可能错过事件，重连后全量同步一次
+        if (streamInterrupted) {
+            streamInterrupted = false;
+            refreshData();
+        }
+    });
+
+    eventSource.addEventListener('error', () => {
+        // 浏览器会自动重连；断线期间用轮询兜底，连接被关闭（如服务器不支持）则一直轮询
+        streamInterrupted = true;
+        startPolling();
+        if (eventSource && eventSource.readyState === EventSource.CLOSED) {
+            console.warn('⚠️  实时推送不可用，退回轮询');
+            eventSource = null;
+        }
+    });
+
+    eventSource.addEventListener('task', (e) => applyTaskEvent(JSON.parse(e.data)));
+
+    eventSource.addEventListener('stats', (e) => {
+        const event = JSON.parse(e.data);
+        if (event.filter === currentFilter) {
+            updateStats(event.stats);
+        }
+    });
+
+    eventSource.addEventListener('system', (e) => updateSystemStatus(JSON.parse(e.data)));
+}
+
+function stopStream() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    stopPolling();
+}
+
+// 把推送的任务新建/更新合并到当前列表
+function applyTaskEvent(event) {
+    const task = event.task;
+    const index = currentTasks.findIndex(t => t.id === task.id);
+
+    if (index >= 0) {
+        currentTasks[index] = task;
+    } else if (event.action === 'created') {
+        currentTasks.unshift(task);
+        currentTasks = currentTasks.slice(0, maxTasks);
+    } else {
+        return;
+    }
+
+    updateTasks(currentTasks);
+}
+
+window.dashboardStream = {
+    start: startStream,
+    stop: stopStream
+};
+
 // 更新当前时间
 function updateCurrentTime() {
     const now = new Date();
@@ -244,6 +395,9 @@ function updateTasks(tasks) {
     }).join('');
 
     console.log('✅ 任务渲染完成');
+
+    // 通知其他模块（如移动端快速筛选）列表已重新渲染
+    document.dispatchEvent(new CustomEvent('dashboard:tasks-rendered'));
 }
 
 // 更新互动列表（关键词云）
@@ -20,6 +20,24 @@ function initMobileFeatures() {
     initScrollToTop();
     initPullToRefresh();
     initTouchOptimizations();
+    initStreamVisibility();
+}
+
+// ========== 实时推送省电 ==========
+function initStreamVisibility() {
+    // 页面切到后台时断开实时推送，回到前台时全量刷新并重新连接
+    document.addEventListener('visibilitychange', () => {
+        if (!window.dashboardStream) return;
+
+        if (document.hidden) {
+            window.dashboardStream.stop();
+        } else {
+            if (typeof refreshData === 'function') {
+                refreshData();
+            }
+            window.dashboardStream.start();
+        }
+    });
 }
 
 // ========== 底部导航 ==========
@@ -128,6 +146,14 @@ function initQuickFilter() {
             filterTasks(filter);
         });
     });
+
+    // 任务列表被实时推送重新渲染后，保持当前的快速筛选
+    document.addEventListener('dashboard:tasks-rendered', () => {
+        const active = tasksCard.querySelector('.quick-filter-btn.active');
+        if (active) {
+            filterTasks(active.dataset.filter);
+        }
+    });
 }
 
 function filterTasks(filter) {